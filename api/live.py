@@ -0,0 +1,110 @@
+import itertools
+import json
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """One streaming client's bounded queue of serialized messages"""
+
+    def __init__(self, maxsize):
+        self.queue = queue.Queue(maxsize)
+        self.dropped = False
+
+    def drop(self):
+        """Disconnect a client that fell behind: discard its backlog and wake its reader"""
+        self.dropped = True
+        try:
+            while True:
+                self.queue.get_nowait()
+        except queue.Empty:
+            pass
+        self.queue.put_nowait(None)
+
+
+class LiveFeed:
+    """Broadcasts scheduler deltas to streaming clients once per tick
+
+    Deltas published between ticks are sent together as one message, which
+    is serialized once for every client. Each client has a queue of at most
+    ``client_queue_size`` messages; a client whose queue is full when a tick
+    is sent is dropped rather than slowing down the others, and is expected
+    to reconnect and fetch a fresh snapshot.
+    """
+
+    def __init__(self, tick=0.5, client_queue_size=32):
+        self.tick = tick
+        self.client_queue_size = client_queue_size
+        self._clients = set()
+        self._pending = []
+        self._lock = threading.Lock()
+        self._ticks = itertools.count(1)
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def subscribe(self):
+        subscription = Subscription(self.client_queue_size)
+        with self._lock:
+            self._clients.add(subscription)
+            self._start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._clients.discard(subscription)
+
+    def publish(self, delta):
+        """Queue a delta dict for the next tick"""
+        with self._lock:
+            self._pending.append(delta)
+            self._start()
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='live-feed', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._wakeup.wait(self.tick):
+            self.flush()
+
+    def close(self):
+        self._wakeup.set()
+
+    def flush(self):
+        """Send the deltas collected since the last tick as one message"""
+        with self._lock:
+            deltas, self._pending = self._pending, []
+            clients = list(self._clients)
+        if not deltas:
+            return
+        tick = next(self._ticks)
+        message = (tick, json.dumps({'tick': tick, 'deltas': deltas}, default=str))
+        for client in clients:
+            try:
+                client.queue.put_nowait(message)
+            except queue.Full:
+                logger.warning("Dropping live feed client that fell behind")
+                self.unsubscribe(client)
+                client.drop()
+
+    def stream(self, subscription, keepalive=15.0):
+        """Server-sent events for one subscription, ending when it is dropped"""
+        try:
+            yield 'retry: 2000\n\n'
+            while not subscription.dropped:
+                try:
+                    message = subscription.queue.get(timeout=keepalive)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                if message is None:
+                    break
+                tick, payload = message
+                yield f'id: {tick}\nevent: delta\ndata: {payload}\n\n'
+            yield 'event: dropped\ndata: {}\n\n'
+        finally:
+            self.unsubscribe(subscription)
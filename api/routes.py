@@ -1 +1,150 @@
-"# Flask API routes (Person E)" 
+# Flask API routes (Person E)
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from flask import Blueprint, Response, current_app, jsonify, request
+
+from api.service import RequestError, ServiceBusy, export_rankings
+from profiling import profiler
+
+api = Blueprint('api', __name__, url_prefix='/api')
+
+# Seconds a request waits for its ranking before answering 504
+RANKING_TIMEOUT = 60
+
+
+def _service():
+    return current_app.extensions['scheduling']
+
+
+def _minutes(value):
+    """Minutes since midnight from 'HH:MM' or a plain number of minutes"""
+    try:
+        if ':' in value:
+            hours, minutes = value.split(':', 1)
+            return int(hours) * 60 + int(minutes)
+        return int(value)
+    except ValueError:
+        raise RequestError(f"Expected a time as HH:MM or minutes, got {value!r}") from None
+
+
+def _selection():
+    """(station, time_window, num_trains) from the query string"""
+    station = request.args.get('station') or None
+    start, end = request.args.get('from'), request.args.get('to')
+    time_window = None
+    if start is not None or end is not None:
+        time_window = (_minutes(start) if start else 0, _minutes(end) if end else 48 * 60)
+    num_trains = request.args.get('num_trains', default=8, type=int)
+    return station, time_window, num_trains
+
+
+@api.errorhandler(ServiceBusy)
+def busy(error):
+    response = jsonify({'error': str(error)})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+
+@api.errorhandler(RequestError)
+def request_error(error):
+    return jsonify({'error': str(error)}), error.status
+
+
+@api.route('/health')
+def health():
+    return jsonify({'status': 'ok'})
+
+
+@api.route('/metrics')
+def metrics():
+    """Stage timings and counters as Prometheus text; empty unless SCHEDULER_PROFILE is set"""
+    return Response(profiler.prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+@api.route('/trace')
+def trace():
+    """Recent stage spans as Chrome trace JSON, for chrome://tracing or Perfetto"""
+    return jsonify(profiler.chrome_trace())
+
+
+@api.route('/trains')
+def trains():
+    """Prepared trains with predicted delays for a station and time window"""
+    station, time_window, num_trains = _selection()
+    return jsonify(_service().train_data(station, time_window, num_trains))
+
+
+@api.route('/scenarios')
+def scenarios():
+    """Top ranked scenarios for a station and time window"""
+    station, time_window, num_trains = _selection()
+    top = request.args.get('top', default=5, type=int)
+    future = _service().rankings(station, time_window, num_trains, top)
+    try:
+        result = future.result(timeout=RANKING_TIMEOUT)
+    except FutureTimeout:
+        return jsonify({'error': 'Scenario ranking timed out'}), 504
+    return jsonify(result)
+
+
+@api.route('/reports')
+def reports():
+    return jsonify({'reports': _service().reports()})
+
+
+@api.route('/reports/<name>')
+def report_top(name):
+    """Metadata and the top ``k`` scenarios of a saved report"""
+    reader = _service().report(name)
+    k = request.args.get('k', default=5, type=int)
+    return jsonify({
+        'metadata': reader.metadata,
+        'scenario_ids': reader.scenario_ids,
+        'scenario_rankings': export_rankings(reader.top(k))
+    })
+
+
+@api.route('/reports/<name>/scenarios/<scenario_id>')
+def report_scenario(name, scenario_id):
+    """One scenario of a saved report"""
+    reader = _service().report(name)
+    if scenario_id not in reader.scenario_ids:
+        raise RequestError(f"Scenario {scenario_id} is not in report {name}", 404)
+    return jsonify(export_rankings([reader.scenario(scenario_id)])[0])
+
+
+@api.route('/predict', methods=['POST'])
+def predict():
+    """Predicted delays for a JSON list of feature objects"""
+    records = request.get_json(force=True, silent=True)
+    if isinstance(records, dict):
+        records = [records]
+    return jsonify({'predicted_delays': _service().predict(records)})
+
+
+@api.route('/session')
+def session():
+    """Live session rankings and train positions; starts or switches the session for a selection"""
+    station, time_window, num_trains = _selection()
+    service = _service()
+    service.session(station, time_window, num_trains)
+    return jsonify(service.snapshot(top=request.args.get('top', default=10, type=int)))
+
+
+@api.route('/events', methods=['POST'])
+def events():
+    """Apply a train_delayed, platform_closed or train_cancelled event to the live session"""
+    event = request.get_json(force=True, silent=True)
+    return jsonify(_service().apply_event(event))
+
+
+@api.route('/stream')
+def stream():
+    """Server-sent events carrying the live session's deltas, batched per tick"""
+    feed = _service().feed
+    return Response(
+        feed.stream(feed.subscribe()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
@@ -0,0 +1,316 @@
+import logging
+import math
+import os
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend', 'optimization')))
+from scheduler import ControlStationSimulator, prepare_train_data, export_rankings, pd, warmup
+from result_cache import RankingCache
+from timetable import load_timetable
+from report import ReportReader
+from profiling import count
+from delay_predictor import FEATURE_COLUMNS, predict_delays
+
+from api.live import LiveFeed
+
+logger = logging.getLogger(__name__)
+
+BASE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_DATASET_PATH = os.path.join(BASE_PATH, 'final_dataset.csv')
+DEFAULT_MODEL_PATH = os.path.join(BASE_PATH, 'backend', 'ml', 'train_delay_model.pkl')
+DEFAULT_REPORT_DIR = os.path.join(BASE_PATH, 'control_station_output')
+
+# Delays of at least this many minutes raise an alert on the live feed
+ALERT_DELAY_MINUTES = 15
+
+
+# Fields each live event type must carry
+EVENT_FIELDS = {
+    'train_delayed': ('train_no', 'delay'),
+    'platform_closed': ('platform',),
+    'train_cancelled': ('train_no',),
+}
+
+# Model features that must be numbers in a prediction request
+NUMERIC_FEATURES = ('Arrival_Hour', 'Departure_Hour', 'Distance', 'IsHoliday')
+
+
+class ServiceBusy(Exception):
+    """Raised when every worker is busy and the pending queue is full"""
+
+
+class RequestError(Exception):
+    """Raised for a request the service cannot act on, with the HTTP ``status`` to answer"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _check_number(value, name):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise RequestError(f"{name} must be a finite number, got {value!r}")
+
+
+def _check_event(event, session):
+    """Reject an event the live session cannot apply, before anything changes"""
+    if not isinstance(event, dict):
+        raise RequestError("Expected a JSON event object")
+    kind = event.get('type')
+    if kind not in EVENT_FIELDS:
+        raise RequestError(f"Unknown event type {kind!r}; expected one of {', '.join(EVENT_FIELDS)}")
+    missing = [name for name in EVENT_FIELDS[kind] if name not in event]
+    if missing:
+        raise RequestError(f"{kind} event is missing {', '.join(missing)}")
+    if 'train_no' in event and event['train_no'] not in session.table['train_no'].tolist():
+        raise RequestError(f"Train {event['train_no']!r} is not in the live session", 404)
+    if kind == 'train_delayed':
+        _check_number(event['delay'], 'delay')
+        if event['delay'] < 0:
+            raise RequestError(f"delay must not be negative, got {event['delay']!r}")
+    elif kind == 'platform_closed':
+        if event['platform'] not in session.simulator.platforms:
+            raise RequestError(f"Platform {event['platform']!r} is not open", 404)
+        if len(session.simulator.platforms) == 1:
+            raise RequestError(f"Platform {event['platform']} is the last open platform", 409)
+    elif len(session.table) == 1:
+        raise RequestError("Cannot cancel the last train in the session", 409)
+
+
+def _check_features(records):
+    """Reject prediction input that is not a list of complete feature objects"""
+    if not isinstance(records, list) or not records:
+        raise RequestError("Expected a feature object or a non-empty list of them")
+    for i, record in enumerate(records):
+        if not isinstance(record, dict):
+            raise RequestError(f"Record {i} is not an object")
+        missing = [name for name in FEATURE_COLUMNS if name not in record]
+        if missing:
+            raise RequestError(f"Record {i} is missing {', '.join(missing)}")
+        for name in NUMERIC_FEATURES:
+            _check_number(record[name], f"Record {i} {name}")
+
+
+def _positions(view):
+    """{train_no: (schedule position, platform)} of a scenario"""
+    train_numbers = view.table['train_no'][view.order].tolist()
+    platforms = view.ordered('platform_no').tolist()
+    return {train_no: (position + 1, platform) for position, (train_no, platform) in enumerate(zip(train_numbers, platforms))}
+
+
+def _ranking_summary(ranking):
+    return {
+        'scenario_id': ranking['scenario'].scenario_id,
+        'scenario_name': ranking['scenario'].scenario_name,
+        'rank': ranking['rank'],
+        'overall_score': ranking['overall_score'],
+        'avg_delay': ranking['metrics']['avg_delay'],
+        'platform_conflicts': ranking['metrics']['platform_conflicts']
+    }
+
+
+def _alerts(event, best):
+    alerts = []
+    if event['type'] == 'train_delayed' and event['delay'] >= ALERT_DELAY_MINUTES:
+        alerts.append({'level': 'warning', 'train_no': event['train_no'],
+                       'message': f"Train {event['train_no']} delayed {event['delay']:.0f} min"})
+    elif event['type'] == 'platform_closed':
+        alerts.append({'level': 'critical', 'platform': event['platform'],
+                       'message': f"Platform {event['platform']} closed; {event['moved_trains']} trains moved"})
+    elif event['type'] == 'train_cancelled':
+        alerts.append({'level': 'info', 'train_no': event['train_no'],
+                       'message': f"Train {event['train_no']} cancelled"})
+    if best['metrics']['platform_conflicts']:
+        alerts.append({'level': 'warning',
+                       'message': f"Best plan {best['scenario'].scenario_id} has {best['metrics']['platform_conflicts']} platform conflicts"})
+    return alerts
+
+
+class SchedulingService:
+    """Warm, shared state behind the API: one model, one timetable, one worker pool
+
+    The delay model and the memory-mapped timetable are loaded once by
+    ``warm()``, and prepared train data is kept per selection. Ranking runs on
+    a pool of ``workers`` threads with at most ``max_pending`` computations
+    queued behind them; beyond that ``submit`` raises ServiceBusy instead of
+    letting requests pile up. The threads overlap waiting on I/O and on
+    other requests, not ranking itself: scenario scoring and search hold the
+    GIL, so CPU-bound throughput scales with server processes (gunicorn
+    workers), not with ``workers``. Requests with the same key while a computation
+    is running share its future instead of starting another one, and
+    finished rankings are kept in a RankingCache keyed by the content of the
+    prepared trains, so unchanged selections are answered without ranking.
+
+    One live PlanningSession takes events one at a time; each event's
+    changes are published to ``feed`` as a compact delta.
+    """
+
+    def __init__(self, dataset_path=DEFAULT_DATASET_PATH, model_path=DEFAULT_MODEL_PATH, workers=2, max_pending=8,
+                 solver_time_limit=2.0, local_search_budget=0.0, train_data_cache_size=32,
+                 report_dir=DEFAULT_REPORT_DIR, ranking_cache_size=32, ranking_cache_dir=None):
+        self.dataset_path = dataset_path
+        self.report_dir = report_dir
+        self.model_path = model_path
+        self.simulator = ControlStationSimulator(
+            solver_time_limit=solver_time_limit,
+            local_search_budget=local_search_budget
+        )
+        self.workers = workers
+        self.max_pending = max_pending
+        self.train_data_cache_size = train_data_cache_size
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scheduling')
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._inflight = {}
+        self._train_data = OrderedDict()
+        self.ranking_cache = RankingCache(maxsize=ranking_cache_size, cache_dir=ranking_cache_dir)
+        self._lock = threading.Lock()
+        self._warm = False
+        self._session = None
+        self._session_selection = None
+        self._session_lock = threading.RLock()
+        self.feed = LiveFeed()
+
+    def warm(self):
+        """Import the heavy dependencies, load the delay model and map the timetable cache, once per process"""
+        with self._lock:
+            if self._warm:
+                return
+            warmup(self.simulator, self.model_path)
+            load_timetable(self.dataset_path, num_trains=1)
+            self._warm = True
+        logger.info("Scheduling service warm")
+
+    def close(self):
+        self.feed.close()
+        self._executor.shutdown(wait=False)
+
+    def submit(self, key, fn, *args):
+        """Run ``fn(*args)`` on the pool, joining an identical computation already running"""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                count('requests_coalesced')
+                return future
+            if not self._slots.acquire(blocking=False):
+                count('requests_rejected')
+                raise ServiceBusy(f"{self.workers} workers busy and {self.max_pending} requests pending")
+            future = self._executor.submit(fn, *args)
+            self._inflight[key] = future
+        future.add_done_callback(lambda _: self._finish(key))
+        return future
+
+    def _finish(self, key):
+        with self._lock:
+            self._inflight.pop(key, None)
+        self._slots.release()
+
+    def train_data(self, station=None, time_window=None, num_trains=8):
+        """Prepared trains for a selection, computed once and kept in an LRU"""
+        self.warm()
+        key = (station, time_window, num_trains)
+        with self._lock:
+            if key in self._train_data:
+                count('train_data_cache_hits')
+                self._train_data.move_to_end(key)
+                return self._train_data[key]
+        df = load_timetable(self.dataset_path, num_trains=num_trains, time_window=time_window, station=station)
+        train_data = prepare_train_data(df, self.simulator.predictor)
+        with self._lock:
+            self._train_data[key] = train_data
+            while len(self._train_data) > self.train_data_cache_size:
+                self._train_data.popitem(last=False)
+        return train_data
+
+    def _rank(self, station, time_window, num_trains, top):
+        train_data = self.train_data(station, time_window, num_trains)
+        if not train_data:
+            return {'total_scenarios': 0, 'total_trains': 0, 'scenario_rankings': []}
+        scenario_rankings = self.simulator.rank_all(train_data, self.ranking_cache)
+        return {
+            'total_scenarios': len(scenario_rankings),
+            'total_trains': len(train_data),
+            'scenario_rankings': export_rankings(scenario_rankings[:top])
+        }
+
+    def rankings(self, station=None, time_window=None, num_trains=8, top=5):
+        """Future of the top-ranked scenarios for a selection, coalesced per selection"""
+        self.warm()
+        key = ('rankings', station, time_window, num_trains, top)
+        return self.submit(key, self._rank, station, time_window, num_trains, top)
+
+    def reports(self):
+        """Report file names in the output directory, newest first"""
+        if not os.path.isdir(self.report_dir):
+            return []
+        names = [name for name in os.listdir(self.report_dir) if name.endswith('.jsonl')]
+        return sorted(names, reverse=True)
+
+    def report(self, name):
+        """ReportReader for a report file in the output directory"""
+        if name != os.path.basename(name) or name not in self.reports():
+            raise RequestError(f"Report {name} not found", 404)
+        return ReportReader(os.path.join(self.report_dir, name))
+
+    def predict(self, records):
+        """Predicted delay for each feature dict (FEATURE_COLUMNS keys)"""
+        _check_features(records)
+        self.warm()
+        features = pd.DataFrame.from_records(records, columns=FEATURE_COLUMNS)
+        return predict_delays(self.simulator.predictor, features)
+
+    def session(self, station=None, time_window=None, num_trains=8, restart=False):
+        """The live PlanningSession, started for a selection on first use or when the selection changes"""
+        selection = (station, time_window, num_trains)
+        with self._session_lock:
+            if self._session is None or restart or selection != self._session_selection:
+                train_data = self.train_data(station, time_window, num_trains)
+                if not train_data:
+                    raise RequestError("No trains match this selection", 404)
+                self._session = self.simulator.start_session(train_data)
+                self._session_selection = selection
+            return self._session
+
+    def snapshot(self, top=10):
+        """Current live rankings, for clients (re)connecting to the feed"""
+        with self._session_lock:
+            session = self._session or self.session()
+            best = session.rankings[0]
+            return {
+                'rankings': [_ranking_summary(r) for r in session.rankings[:top]],
+                'positions': [
+                    {'train_no': train_no, 'order': position, 'platform': platform}
+                    for train_no, (position, platform) in _positions(best['scenario']).items()
+                ]
+            }
+
+    def apply_event(self, event, top=10):
+        """Apply an event to the live session and publish what changed"""
+        with self._session_lock:
+            session = self._session or self.session()
+            _check_event(event, session)
+            before = _positions(session.rankings[0]['scenario'])
+            diff = session.apply(event)
+            best = session.rankings[0]
+            after = _positions(best['scenario'])
+
+        positions = [
+            {'train_no': train_no, 'order': position, 'platform': platform}
+            for train_no, (position, platform) in after.items()
+            if before.get(train_no) != (position, platform)
+        ]
+        positions.extend({'train_no': train_no, 'order': None, 'platform': None}
+                         for train_no in before if train_no not in after)
+        delta = {
+            'event': diff['event'],
+            'best': diff['best'],
+            'rankings': [r for r in diff['changed'] if r['new_rank'] <= top],
+            'removed': diff['removed'],
+            'positions': positions,
+            'alerts': _alerts(diff['event'], best),
+            'elapsed_ms': diff['elapsed_ms']
+        }
+        self.feed.publish(delta)
+        return delta
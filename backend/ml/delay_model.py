@@ -0,0 +1,317 @@
+"""Hashed-feature linear delay model: training, incremental refits and the .npz artifact
+
+Run as a script to train on final_dataset.csv (or refit a saved model on new
+rows); scheduler.py loads the resulting .npz as its delay predictor.
+"""
+import argparse
+import hashlib
+import logging
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'optimization')))
+from lazy import lazy_import
+from timetable import DATASET_DTYPES, MISSING_ARRIVAL, MISSING_DEPARTURE, timetable_minutes
+
+from delay_predictor import FEATURE_COLUMNS, delay_features
+
+pd = lazy_import('pandas')
+
+logger = logging.getLogger(__name__)
+
+MODEL_FORMAT_VERSION = 1
+
+# Categorical inputs hashed into the weight vector, each a tuple of FEATURE_COLUMNS
+# (crossed when there are several); the distance bucket is added separately
+HASHED_FEATURES = (
+    ('Arrival_Hour',),
+    ('Departure_Hour',),
+    ('Source Station',),
+    ('Destination Station',),
+    ('Source Station', 'Destination Station'),
+    ('Train Type',),
+    ('Weather',),
+    ('IsHoliday',),
+    ('Congestion',),
+    ('Train Type', 'Arrival_Hour'),
+    ('Weather', 'Congestion'),
+)
+
+# Distances are also hashed in buckets of this many km
+DISTANCE_BUCKET_KM = 50
+
+_INTEGER_FEATURES = ('Arrival_Hour', 'Departure_Hour', 'IsHoliday')
+_TOKENS = HASHED_FEATURES + (('distance_bucket',),)
+
+# Residuals kept with the model for Monte Carlo robustness sampling
+MAX_RESIDUALS = 5000
+
+# Share of each fit's rows held out of training to measure those residuals on
+RESIDUAL_HOLDOUT = 0.1
+
+
+def training_features(df):
+    """Feature frame (FEATURE_COLUMNS) and delays from final_dataset.csv rows
+
+    The features prepare_train_data predicts from (see delay_features), but
+    for every timetable row rather than each train's first, and only rows
+    with a known delay.
+    """
+    arrival, departure, invalid = timetable_minutes(df)
+    features = delay_features(
+        df, np.where(invalid, MISSING_ARRIVAL, arrival), np.where(invalid, MISSING_DEPARTURE, departure)
+    )
+    delays = pd.to_numeric(df['Delay'], errors='coerce').to_numpy(dtype=float)
+    known = np.isfinite(delays)
+    return features[known].reset_index(drop=True), delays[known]
+
+
+def read_training_data(dataset_path, chunksize=200_000):
+    """training_features over a CSV, read in chunks with only the needed columns"""
+    dtypes = dict(DATASET_DTYPES, Delay='float64')
+    parts = []
+    reader = pd.read_csv(dataset_path, usecols=lambda column: column in dtypes, dtype=dtypes, chunksize=chunksize)
+    with reader:
+        for chunk in reader:
+            parts.append(training_features(chunk))
+    if not parts:
+        return pd.DataFrame(columns=FEATURE_COLUMNS), np.empty(0)
+    return pd.concat([f for f, _ in parts], ignore_index=True), np.concatenate([d for _, d in parts])
+
+
+class DelayModel:
+    """Linear delay model over hashed categorical features, trained by minibatch AdaGrad
+
+    Each row activates one weight per entry of HASHED_FEATURES plus a
+    distance bucket, found by hashing "column=value" tokens (BLAKE2b, so
+    slots are stable across processes and versions) into
+    ``n_features`` slots, and has one dense input, scaled log distance.
+    Hashing needs no vocabulary, so stations and train types never seen in
+    training simply share the bias, and ``partial_fit`` can keep learning
+    from new observations without the earlier data. Prediction and training
+    are numpy only, and the saved artifact is a single .npz of weights and
+    AdaGrad state.
+
+    Implements the predictor interface (``load_model``, ``predict_delay``,
+    ``predict_delays``) and keeps recent ``residuals`` (actual minus
+    predicted), which the robustness sampler uses. They are measured on rows
+    held out of training, since residuals on the training rows understate
+    the spread of real prediction errors.
+    """
+
+    def __init__(self, n_features=2 ** 16, learning_rate=0.5, l2=1e-6):
+        self.n_features = n_features
+        self.learning_rate = learning_rate
+        self.l2 = l2
+        self.reset()
+
+    def reset(self):
+        # token -> slot, so each distinct token is hashed once per process
+        self._slots = {}
+        self.weights = np.zeros(self.n_features)
+        self.dense_weight = 0.0
+        self.bias = 0.0
+        self._squared_gradients = np.zeros(self.n_features)
+        self._dense_squared_gradient = 0.0
+        self._bias_squared_gradient = 0.0
+        self.rows_seen = 0
+        self.residuals = np.empty(0)
+
+    def _slot(self, token):
+        slot = self._slots.get(token)
+        if slot is None:
+            digest = hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest()
+            slot = self._slots[token] = int.from_bytes(digest, 'little') % self.n_features
+        return slot
+
+    def _encode(self, features):
+        """(hashed slot of every active weight, rows x tokens; scaled log distance per row)"""
+        columns = {}
+        for name in FEATURE_COLUMNS:
+            values = features[name]
+            if name in _INTEGER_FEATURES:
+                values = pd.to_numeric(values, errors='coerce').fillna(-1).astype(np.int64)
+            columns[name] = values.astype(str).to_numpy(dtype=object)
+        distance = pd.to_numeric(features['Distance'], errors='coerce').fillna(50.0).to_numpy(dtype=float)
+        columns['distance_bucket'] = (distance // DISTANCE_BUCKET_KM).astype(np.int64).astype(str).astype(object)
+
+        slots = np.empty((len(distance), len(_TOKENS)), dtype=np.intp)
+        for i, names in enumerate(_TOKENS):
+            text = columns[names[0]]
+            for name in names[1:]:
+                text = text + '|' + columns[name]
+            # Each distinct token is hashed once
+            codes, uniques = pd.factorize(text)
+            prefix = '|'.join(names) + '='
+            slots[:, i] = np.array([self._slot(prefix + token) for token in uniques], dtype=np.intp)[codes]
+        return slots, np.log1p(np.maximum(distance, 0.0)) / 8.0
+
+    def _encode_record(self, input_data):
+        """_encode for a single feature dict, without building a frame"""
+        values = {
+            name: str(int(float(input_data[name]))) if name in _INTEGER_FEATURES else str(input_data[name])
+            for name in FEATURE_COLUMNS
+        }
+        distance = float(input_data['Distance'])
+        values['distance_bucket'] = str(int(distance // DISTANCE_BUCKET_KM))
+        slots = [self._slot('|'.join(names) + '=' + '|'.join(values[name] for name in names)) for names in _TOKENS]
+        return slots, math.log1p(max(distance, 0.0)) / 8.0
+
+    def _predict_encoded(self, slots, dense):
+        return self.weights[slots].sum(axis=1) + self.dense_weight * dense + self.bias
+
+    def predict(self, features):
+        """Predicted delays (numpy array) for a feature frame"""
+        if not len(features):
+            return np.empty(0)
+        return self._predict_encoded(*self._encode(features))
+
+    def predict_delays(self, features):
+        return np.maximum(self.predict(features), 0.0).tolist()
+
+    def predict_delay(self, input_data):
+        slots, dense = self._encode_record(input_data)
+        return max(float(self.weights[slots].sum()) + self.dense_weight * dense + self.bias, 0.0)
+
+    def partial_fit(self, features, delays, epochs=1, batch_size=1024, seed=0, holdout=RESIDUAL_HOLDOUT):
+        """Update the model on new observed delays without revisiting earlier data
+
+        A random ``holdout`` share of the rows is left out of training and
+        only used to measure the residuals kept for robustness sampling.
+        """
+        delays = np.asarray(delays, dtype=float)
+        if not len(delays):
+            return self
+        slots, dense = self._encode(features)
+        rng = np.random.default_rng(seed)
+        held_out = rng.random(len(delays)) < holdout
+        train = np.flatnonzero(~held_out)
+        if not self.rows_seen:
+            self.bias = float(delays[train].mean()) if len(train) else float(delays.mean())
+        tokens = slots.shape[1]
+        for _ in range(epochs):
+            for batch in np.array_split(rng.permutation(train), max(1, len(train) // batch_size)):
+                if not len(batch):
+                    continue
+                batch_slots, batch_dense = slots[batch], dense[batch]
+                error = (self._predict_encoded(batch_slots, batch_dense) - delays[batch]) / len(batch)
+                gradient = np.bincount(batch_slots.ravel(), weights=np.repeat(error, tokens), minlength=self.n_features)
+                touched = np.flatnonzero(gradient)
+                gradient = gradient[touched] + self.l2 * self.weights[touched]
+                self._squared_gradients[touched] += gradient ** 2
+                self.weights[touched] -= self.learning_rate * gradient / np.sqrt(self._squared_gradients[touched])
+
+                dense_gradient = float(error @ batch_dense)
+                self._dense_squared_gradient += dense_gradient ** 2
+                self.dense_weight -= self.learning_rate * dense_gradient / (np.sqrt(self._dense_squared_gradient) + 1e-12)
+                bias_gradient = float(error.sum())
+                self._bias_squared_gradient += bias_gradient ** 2
+                self.bias -= self.learning_rate * bias_gradient / (np.sqrt(self._bias_squared_gradient) + 1e-12)
+        self.rows_seen += len(train)
+
+        if held_out.any():
+            residuals = delays[held_out] - self._predict_encoded(slots[held_out], dense[held_out])
+            self.residuals = np.concatenate([self.residuals, residuals])[-MAX_RESIDUALS:]
+        return self
+
+    def fit(self, features, delays, epochs=5, batch_size=1024, seed=0, holdout=RESIDUAL_HOLDOUT):
+        """Train from scratch"""
+        self.reset()
+        return self.partial_fit(features, delays, epochs=epochs, batch_size=batch_size, seed=seed, holdout=holdout)
+
+    def save(self, path):
+        """Write the model as a compressed .npz; weights are stored as float32"""
+        with open(path, 'wb') as f:
+            np.savez_compressed(
+                f,
+                format_version=MODEL_FORMAT_VERSION,
+                n_features=self.n_features,
+                learning_rate=self.learning_rate,
+                l2=self.l2,
+                weights=self.weights.astype(np.float32),
+                squared_gradients=self._squared_gradients.astype(np.float32),
+                dense=np.array([self.dense_weight, self._dense_squared_gradient]),
+                bias=np.array([self.bias, self._bias_squared_gradient]),
+                rows_seen=self.rows_seen,
+                residuals=self.residuals.astype(np.float32)
+            )
+        return path
+
+    def load_model(self, path):
+        self._slots = {}
+        with np.load(path) as data:
+            if int(data['format_version']) != MODEL_FORMAT_VERSION:
+                raise ValueError(f"{path} is delay model format {int(data['format_version'])}, expected {MODEL_FORMAT_VERSION}")
+            self.n_features = int(data['n_features'])
+            self.learning_rate = float(data['learning_rate'])
+            self.l2 = float(data['l2'])
+            self.weights = data['weights'].astype(float)
+            self._squared_gradients = data['squared_gradients'].astype(float)
+            self.dense_weight, self._dense_squared_gradient = data['dense'].tolist()
+            self.bias, self._bias_squared_gradient = data['bias'].tolist()
+            self.rows_seen = int(data['rows_seen'])
+            self.residuals = data['residuals'].astype(float)
+        return self
+
+    @classmethod
+    def load(cls, path):
+        return cls().load_model(path)
+
+
+def _report(model, features, delays, label):
+    started = time.perf_counter()
+    predicted = model.predict(features)
+    batch_seconds = time.perf_counter() - started
+    sample = features.head(200).to_dict('records')
+    started = time.perf_counter()
+    for record in sample:
+        model.predict_delay(record)
+    single_seconds = (time.perf_counter() - started) / max(1, len(sample))
+    mae = float(np.abs(predicted - delays).mean()) if len(delays) else float('nan')
+    baseline = float(np.abs(delays - delays.mean()).mean()) if len(delays) else float('nan')
+    print(f"   {label} MAE: {mae:.2f} min (predicting the mean: {baseline:.2f} min) on {len(delays)} rows")
+    print(f"   Inference: {batch_seconds / max(1, len(delays)) * 1e6:.2f} us/row batched, {single_seconds * 1e6:.0f} us single row")
+
+
+def main():
+    base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+    parser = argparse.ArgumentParser(description='Train or incrementally refit the delay model')
+    parser.add_argument('--dataset', default=os.path.join(base_path, 'final_dataset.csv'),
+                        help='rows to train on (with --refit, the new observations)')
+    parser.add_argument('--model', default=os.path.join(base_path, 'backend', 'ml', 'delay_model.npz'))
+    parser.add_argument('--refit', action='store_true', help='continue training the saved model on --dataset')
+    parser.add_argument('--epochs', type=int, default=5)
+    parser.add_argument('--holdout', type=float, default=0.1, help='share of rows held out for evaluation')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    features, delays = read_training_data(args.dataset)
+    load_seconds = time.perf_counter() - started
+
+    held_out = np.random.default_rng(args.seed).random(len(delays)) < args.holdout
+    train_features, train_delays = features[~held_out], delays[~held_out]
+
+    started = time.perf_counter()
+    if args.refit:
+        model = DelayModel.load(args.model)
+        model.partial_fit(train_features, train_delays, epochs=args.epochs, seed=args.seed)
+    else:
+        model = DelayModel().fit(train_features, train_delays, epochs=args.epochs, seed=args.seed)
+    train_seconds = time.perf_counter() - started
+    model.save(args.model)
+
+    print(f"\n🧠 DELAY MODEL {'REFIT' if args.refit else 'TRAINED'}: {len(train_delays)} rows, {model.rows_seen} seen in total")
+    print(f"   Load + features: {load_seconds:.2f}s | Training: {train_seconds:.2f}s "
+          f"({len(train_delays) * args.epochs / max(train_seconds, 1e-9):,.0f} rows/s)")
+    _report(model, features[held_out], delays[held_out], 'Holdout')
+    print(f"   Saved {os.path.getsize(args.model) / 1024:.0f} KB to {args.model}")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
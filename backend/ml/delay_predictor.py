@@ -1 +1,252 @@
-"# Delay predictor module (Person B)" 
+# Delay predictor module (Person B)
+import hashlib
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DELAY = 5.0
+
+FEATURE_COLUMNS = [
+    'Arrival_Hour',
+    'Departure_Hour',
+    'Distance',
+    'Source Station',
+    'Source Station Name',
+    'Destination Station',
+    'Destination Station Name',
+    'Train Type',
+    'Weather',
+    'IsHoliday',
+    'Congestion',
+]
+
+
+def delay_features(df, arrival_minutes, departure_minutes):
+    """Model inputs (FEATURE_COLUMNS) for timetable rows, indexed like ``df``
+
+    ``df`` has the final_dataset.csv columns and the minute arrays are its
+    arrival and departure times as minutes since midnight, with unusable
+    times already replaced. Missing distances become 50 km, weather 'Clear',
+    holidays 0 and congestion '2'. Training and prediction both build their
+    features here so the model always sees the same inputs.
+    """
+    import pandas as pd  # Not at module level, to keep imports light for the CLI
+
+    return pd.DataFrame({
+        'Arrival_Hour': np.asarray(arrival_minutes) // 60,
+        'Departure_Hour': np.asarray(departure_minutes) // 60,
+        'Distance': pd.to_numeric(df['Distance'], errors='coerce').fillna(50.0).to_numpy(dtype=float),
+        'Source Station': df['Source Station'].astype(str).to_numpy(),
+        'Source Station Name': df['Source Station Name'].astype(str).to_numpy(),
+        'Destination Station': df['Destination Station'].astype(str).to_numpy(),
+        'Destination Station Name': df['Destination Station Name'].astype(str).to_numpy(),
+        'Train Type': df['Train Type'].astype(str).to_numpy(),
+        'Weather': df['Weather'].astype(object).where(df['Weather'].notna(), 'Clear').astype(str).to_numpy(),
+        'IsHoliday': df['IsHoliday'].fillna(0).astype(int).to_numpy(),
+        'Congestion': df['Congestion'].astype(object).where(df['Congestion'].notna(), '2').astype(str).to_numpy(),
+    }, index=df.index)
+
+
+def _as_delay(value):
+    delay = float(value)
+    if not math.isfinite(delay):
+        raise ValueError(f"non-finite prediction {value!r}")
+    return delay
+
+
+def _predict_rows(predictor, features):
+    """Predict each row of a feature frame; failed rows come back as None"""
+    labels = features.index.tolist()
+
+    batch = getattr(predictor, 'predict_delays', None)
+    if batch is not None:
+        try:
+            predictions = list(batch(features[FEATURE_COLUMNS]))
+            if len(predictions) != len(labels):
+                raise ValueError(f"expected {len(labels)} predictions, got {len(predictions)}")
+        except Exception as e:
+            logger.error(f"Batch delay prediction failed, predicting trains one by one: {e}")
+        else:
+            delays = []
+            for label, value in zip(labels, predictions):
+                try:
+                    delays.append(_as_delay(value))
+                except (TypeError, ValueError) as e:
+                    logger.error(f"Error predicting delay for train {label}: {e}")
+                    delays.append(None)
+            return delays
+
+    delays = []
+    for label, input_data in zip(labels, features[FEATURE_COLUMNS].to_dict('records')):
+        try:
+            delays.append(_as_delay(predictor.predict_delay(input_data)))
+        except Exception as e:
+            logger.error(f"Error predicting delay for train {label}: {e}")
+            delays.append(None)
+    return delays
+
+
+def predict_delays(predictor, features, default=DEFAULT_DELAY):
+    """Predict a delay for every row of a feature frame
+
+    ``features`` is a DataFrame with FEATURE_COLUMNS, indexed by train number.
+    Predictors that implement ``predict_delays(frame)`` are called once for the
+    whole frame. Otherwise, or if that batch call fails, each row goes through
+    ``predict_delay(dict)`` on its own. Any row whose prediction fails or is
+    not a finite number gets ``default``, as prepare_train_data always did.
+    """
+    return [default if delay is None else delay for delay in _predict_rows(predictor, features)]
+
+
+def model_fingerprint(model_path):
+    """Content hash identifying a model file, used to invalidate cached predictions"""
+    digest = hashlib.sha256()
+    try:
+        with open(model_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    except OSError:
+        return f"path:{os.path.abspath(model_path)}"
+    return digest.hexdigest()
+
+
+class CachedDelayPredictor:
+    """Memoizes a delay predictor on its (bucketed) input features
+
+    Trains with the same arrival hour, departure hour, distance bucket, route,
+    train type, weather, holiday flag and congestion share one prediction.
+    Recent keys live in an in-memory LRU of ``maxsize`` entries; with
+    ``cache_path`` they are also written to a SQLite file that survives
+    restarts. Both tiers are keyed by the model file's content hash, so
+    loading a different model invalidates everything predicted before.
+    """
+
+    def __init__(self, predictor, maxsize=4096, cache_path=None, distance_bucket=10.0, default=DEFAULT_DELAY):
+        self.predictor = predictor
+        self.maxsize = maxsize
+        self.distance_bucket = distance_bucket
+        self.default = default
+        self.model_version = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = None
+        if cache_path:
+            self._disk = sqlite3.connect(cache_path, check_same_thread=False)
+            self._disk.execute(
+                'CREATE TABLE IF NOT EXISTS predictions '
+                '(model_version TEXT, feature_key TEXT, delay REAL, PRIMARY KEY (model_version, feature_key))'
+            )
+
+    def load_model(self, model_path):
+        """Load the model into the wrapped predictor, dropping cached predictions if it changed"""
+        self.predictor.load_model(model_path)
+        version = model_fingerprint(model_path)
+        if version != self.model_version:
+            with self._lock:
+                self._memory.clear()
+                if self._disk is not None:
+                    with self._disk:
+                        self._disk.execute('DELETE FROM predictions WHERE model_version != ?', (version,))
+            if self.model_version is not None:
+                logger.info("Delay model changed; prediction cache invalidated")
+            self.model_version = version
+
+    def cache_key(self, input_data):
+        """Key that trains with interchangeable predictions share"""
+        return (
+            int(input_data['Arrival_Hour']),
+            int(input_data['Departure_Hour']),
+            int(float(input_data['Distance']) // self.distance_bucket),
+            str(input_data['Source Station']),
+            str(input_data['Destination Station']),
+            str(input_data['Train Type']),
+            str(input_data['Weather']),
+            int(input_data['IsHoliday']),
+            str(input_data['Congestion']),
+        )
+
+    def _lookup(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+            if self._disk is not None:
+                row = self._disk.execute(
+                    'SELECT delay FROM predictions WHERE model_version = ? AND feature_key = ?',
+                    (self.model_version, json.dumps(key))
+                ).fetchone()
+                if row is not None:
+                    self.disk_hits += 1
+                    self._remember(key, row[0])
+                    return row[0]
+            self.misses += 1
+            return None
+
+    def _remember(self, key, delay):
+        self._memory[key] = delay
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def _store(self, predictions):
+        with self._lock:
+            for key, delay in predictions.items():
+                self._remember(key, delay)
+            if self._disk is not None and predictions:
+                with self._disk:
+                    self._disk.executemany(
+                        'INSERT OR REPLACE INTO predictions VALUES (?, ?, ?)',
+                        [(self.model_version, json.dumps(key), delay) for key, delay in predictions.items()]
+                    )
+
+    def predict_delay(self, input_data):
+        """Predict one train's delay, serving repeated feature keys from the cache"""
+        key = self.cache_key(input_data)
+        delay = self._lookup(key)
+        if delay is None:
+            delay = _as_delay(self.predictor.predict_delay(input_data))
+            self._store({key: delay})
+        return delay
+
+    def predict_delays(self, features):
+        """Predict a feature frame, sending only distinct uncached keys to the model
+
+        Rows sharing a key are looked up, counted and predicted once.
+        """
+        keys = [self.cache_key(row) for row in features[FEATURE_COLUMNS].to_dict('records')]
+        first_positions = {}
+        for position, key in enumerate(keys):
+            first_positions.setdefault(key, position)
+        delays = {key: self._lookup(key) for key in first_positions}
+
+        missing = {key: position for key, position in first_positions.items() if delays[key] is None}
+        if missing:
+            predicted = _predict_rows(self.predictor, features.iloc[list(missing.values())])
+            computed = {key: delay for key, delay in zip(missing, predicted) if delay is not None}
+            self._store(computed)
+            delays.update({key: computed.get(key, self.default) for key in missing})
+        return [delays[key] for key in keys]
+
+    def stats(self):
+        """Hit/miss counters for sizing the cache"""
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            'size': len(self._memory),
+            'maxsize': self.maxsize,
+        }
@@ -0,0 +1,64 @@
+import importlib
+import importlib.util
+import sys
+
+# Every LazyModule created, by (name, submodules), so preloading can import them all at once
+_REGISTRY = {}
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access
+
+    ``submodules`` are imported along with the package, for packages such as
+    pyarrow whose ``ipc`` is not imported by the package itself.
+    """
+
+    def __init__(self, name, submodules=()):
+        self.__dict__.update(_name=name, _submodules=tuple(submodules), _module=None)
+
+    def _load(self):
+        module = importlib.import_module(self._name)
+        for submodule in self._submodules:
+            importlib.import_module(f'{self._name}.{submodule}')
+        self.__dict__['_module'] = module
+        return module
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._module or self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._module or self._load(), attr, value)
+
+    def __repr__(self):
+        return f"<lazy module {self._name!r}{'' if self.loaded else ' (not loaded)'}>"
+
+
+def lazy_import(name, submodules=(), optional=False):
+    """Module ``name`` imported on first use
+
+    Returns the module itself if it is already imported. With ``optional``,
+    returns None when the package is not installed, as the ``try: import``
+    fallbacks did; only the top-level package is looked up to decide that,
+    so checking costs no import.
+    """
+    if name in sys.modules and all(f'{name}.{submodule}' in sys.modules for submodule in submodules):
+        return sys.modules[name]
+    key = (name, tuple(submodules))
+    if key in _REGISTRY:
+        return _REGISTRY[key]
+    if optional and importlib.util.find_spec(name.partition('.')[0]) is None:
+        return None
+    _REGISTRY[key] = LazyModule(name, submodules)
+    return _REGISTRY[key]
+
+
+def load_all():
+    """Import every lazily imported module now; returns their names"""
+    for module in _REGISTRY.values():
+        if not module.loaded:
+            module._load()
+    return [name for name, _ in _REGISTRY]
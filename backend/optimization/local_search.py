@@ -0,0 +1,231 @@
+import logging
+import math
+import random
+import time
+
+import numpy as np
+
+from occupancy import PlatformOccupancy
+from profiling import profiled
+from scenarios import ScenarioView
+from solver import DEFAULT_PLATFORMS
+
+logger = logging.getLogger(__name__)
+
+# Largest number of positions an insert move shifts a train, which keeps the
+# express position update bounded regardless of schedule length
+MAX_SHIFT = 16
+
+# Annealing temperature in overall_score points, cooled geometrically over the budget
+START_TEMPERATURE = 2.0
+END_TEMPERATURE = 0.01
+
+# overall_score is flat wherever its penalties are clamped (e.g. from about
+# twenty conflicts up), so moves are accepted on the score minus a small pull
+# toward fewer conflicts and earlier express trains
+CONFLICT_PULL = 0.05
+POSITION_PULL = 0.005
+
+# Moves a seeded search makes per second of budget, about what one core manages
+MOVES_PER_SECOND = 150000
+
+
+def _overall_score(avg_delay, platform_conflicts, express_avg_position):
+    """calculate_overall_score from the three terms a schedule move can change"""
+    satisfaction = max(0, 100 - min(100, avg_delay * 2) - platform_conflicts * 5)
+    efficiency = max(0, 100 - avg_delay - platform_conflicts * 3)
+    return (
+        satisfaction * 0.4 +
+        efficiency * 0.3 +
+        (100 - min(50, platform_conflicts * 10)) * 0.2 +
+        (100 - min(50, express_avg_position * 5)) * 0.1
+    )
+
+
+class _SearchState:
+    """Mutable order and platforms of one seed schedule with running metric totals
+
+    Delays are fixed by the seed, so average delay never changes. The sum of
+    express positions is updated from the moved trains alone and the conflict
+    count by PlatformOccupancy.move, so scoring a move never walks the whole
+    schedule.
+    """
+
+    def __init__(self, view):
+        table = view.table
+        self.order = view.order.tolist()
+        self.express = (table['priority'] == 1).tolist()
+        self.express_count = sum(self.express)
+        self.position_sum = sum(position + 1 for position, row in enumerate(self.order) if self.express[row])
+        delays = view.column('predicted_delay')
+        self.avg_delay = float(np.sum(delays)) / len(self.order)
+        self.occupancy = PlatformOccupancy.from_table(table, delays=delays, platforms=view.column('platform_no'))
+        self.movable = [row for row, active in enumerate(self.occupancy.active) if active]
+
+    def evaluate(self, position_sum=None, conflicts=None):
+        """``(overall_score, energy)`` of the current state with optional replacement totals"""
+        position_sum = self.position_sum if position_sum is None else position_sum
+        conflicts = self.occupancy.conflicts if conflicts is None else conflicts
+        avg_position = position_sum / self.express_count if self.express_count else 0
+        score = _overall_score(self.avg_delay, conflicts, avg_position)
+        return score, score - CONFLICT_PULL * conflicts - POSITION_PULL * avg_position
+
+    def swap_delta(self, i, j):
+        """Change in the express position sum from swapping positions i and j"""
+        return (j - i) * (self.express[self.order[i]] - self.express[self.order[j]])
+
+    def swap(self, i, j):
+        self.order[i], self.order[j] = self.order[j], self.order[i]
+
+    def insert_delta(self, i, j):
+        """Change in the express position sum from moving the train at i to position j"""
+        moved = self.express[self.order[i]]
+        if j > i:
+            shifted = sum(self.express[row] for row in self.order[i + 1:j + 1])
+            return moved * (j - i) - shifted
+        shifted = sum(self.express[row] for row in self.order[j:i])
+        return shifted - moved * (i - j)
+
+    def insert(self, i, j):
+        self.order.insert(j, self.order.pop(i))
+
+
+def local_search(view, time_budget=1.0, platforms=DEFAULT_PLATFORMS, rng=None, max_moves=None):
+    """Simulated annealing over one schedule's order and platforms
+
+    Each step proposes swapping two trains, moving one train up to MAX_SHIFT
+    positions, or putting one train on another platform, and accepts it by
+    the Metropolis rule on overall_score (see CONFLICT_PULL). Runs until
+    ``time_budget`` seconds have passed, or with ``max_moves`` until that
+    many moves were proposed, and returns ``(order, platforms, score)`` of
+    the best schedule seen, which is the seed itself if nothing beat it. A
+    move budget and a seeded ``rng`` give the same result on every run.
+    """
+    rng = rng or random.Random()
+    state = _SearchState(view)
+    num_trains = len(state.order)
+    score, current = state.evaluate()
+    best = (score, current)
+    best_order, best_platforms = list(state.order), list(state.occupancy.platforms)
+    if num_trains < 2 and not state.movable:
+        return best_order, best_platforms, score
+
+    started = time.perf_counter()
+    deadline = started + time_budget
+    cooling = math.log(END_TEMPERATURE / START_TEMPERATURE)
+    temperature = START_TEMPERATURE
+    iterations = 0
+
+    while True:
+        if iterations % 64 == 0:
+            if max_moves is None:
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                progress = (now - started) / time_budget
+            else:
+                if iterations >= max_moves:
+                    break
+                progress = iterations / max_moves
+            temperature = START_TEMPERATURE * math.exp(cooling * progress)
+        iterations += 1
+
+        move = rng.random()
+        if state.movable and (move < 1 / 3 or num_trains < 2):
+            row = rng.choice(state.movable)
+            previous = state.occupancy.platforms[row]
+            platform = rng.choice(platforms)
+            if platform == previous:
+                continue
+            state.occupancy.move(row, platform)
+            score, candidate = state.evaluate()
+            if candidate >= current or rng.random() < math.exp((candidate - current) / temperature):
+                current = candidate
+            else:
+                state.occupancy.move(row, previous)
+                continue
+        elif move < 2 / 3:
+            i, j = rng.sample(range(num_trains), 2)
+            delta = state.swap_delta(i, j)
+            score, candidate = state.evaluate(position_sum=state.position_sum + delta)
+            if candidate >= current or rng.random() < math.exp((candidate - current) / temperature):
+                state.swap(i, j)
+                state.position_sum += delta
+                current = candidate
+            else:
+                continue
+        else:
+            i = rng.randrange(num_trains)
+            j = min(num_trains - 1, max(0, i + rng.randint(-MAX_SHIFT, MAX_SHIFT)))
+            if i == j:
+                continue
+            delta = state.insert_delta(i, j)
+            score, candidate = state.evaluate(position_sum=state.position_sum + delta)
+            if candidate >= current or rng.random() < math.exp((candidate - current) / temperature):
+                state.insert(i, j)
+                state.position_sum += delta
+                current = candidate
+            else:
+                continue
+
+        if (score, current) > best:
+            best = (score, current)
+            best_order, best_platforms = list(state.order), list(state.occupancy.platforms)
+
+    logger.debug(f"Local search from {view.scenario_id}: {iterations} moves, best score {best[0]:.2f}")
+    return best_order, best_platforms, best[0]
+
+
+def _improved_view(seed, order, platforms):
+    """ScenarioView with the seed's overlay and the searched order and platforms
+
+    Delay fields carry over as they are, since the search never changes a
+    delay. Platform fields are rebuilt from the searched platforms, the
+    builders' own reassignment labels are dropped, and ``forced_first`` is
+    kept only if that train is still first.
+    """
+    table = seed.table
+    overlay = {
+        name: dict(changes) for name, changes in seed.overlay.items()
+        if name not in ('alternative_platform', 'platform_reassigned')
+    }
+    if 'forced_first' in overlay:
+        overlay['forced_first'] = {row: flag for row, flag in overlay['forced_first'].items() if row == order[0]}
+    for name in ('platform_no', 'original_platform', 'platform_changed'):
+        overlay[name] = {}
+    for row, (current, assigned) in enumerate(zip(table['platform_no'].tolist(), platforms)):
+        if assigned != current:
+            overlay['platform_no'][row] = assigned
+            overlay['original_platform'][row] = current
+            overlay['platform_changed'][row] = True
+    return ScenarioView(
+        table, order,
+        scenario_id=f'{seed.scenario_id}_LOCAL_SEARCH',
+        scenario_name=f'{seed.scenario_name} (Local Search)',
+        description=f'{seed.description}, refined by swapping, shifting and re-platforming trains',
+        use_case=seed.use_case,
+        overlay=overlay
+    )
+
+
+@profiled('local_search')
+def improve_schedules(scenario_rankings, top_k=3, time_budget=2.0, platforms=DEFAULT_PLATFORMS, seed=None):
+    """Refine the top-k ranked ScenarioViews with local search
+
+    ``time_budget`` seconds are split evenly between the seeds. With a
+    ``seed`` the budget is counted in moves instead (MOVES_PER_SECOND per
+    second), so the same rankings are always refined the same way. Returns
+    new ScenarioViews for the seeds that were improved, ready to be ranked
+    with the rest; seeds that could not be beaten are left out.
+    """
+    rng = random.Random(seed)
+    seeds = [r for r in scenario_rankings if isinstance(r['scenario'], ScenarioView)][:top_k]
+    max_moves = None if seed is None or not seeds else int(time_budget * MOVES_PER_SECOND / len(seeds))
+    improved = []
+    for ranking in seeds:
+        view = ranking['scenario']
+        order, assigned, score = local_search(view, time_budget / len(seeds), platforms, rng, max_moves)
+        if score > ranking['overall_score'] + 1e-9:
+            logger.info(f"Local search improved {view.scenario_id} from {ranking['overall_score']:.2f} to {score:.2f}")
+            improved.append(_improved_view(view, order, assigned))
+    return improved
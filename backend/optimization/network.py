@@ -0,0 +1,384 @@
+import argparse
+import copy
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from parallel import _context, default_workers
+from profiling import count, profiled, stage
+from scheduler import ControlStationSimulator, prepare_train_data, rank_scenarios, export_rankings
+from solver import DEFAULT_PLATFORMS
+from timetable import load_timetable
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(__file__), 'network.json')
+
+# Running speed used to place a train's arrival at its destination when a
+# section does not set its own
+DEFAULT_SPEED_KMH = 60.0
+
+# Share of a section's running time that is timetable padding a late train can make up
+DEFAULT_RECOVERY_RATE = 0.05
+
+# Tracks per direction of a section, and the minutes a train entering a track
+# keeps the next one off it
+DEFAULT_TRACKS = 1
+DEFAULT_HEADWAY_MINUTES = 5
+
+# Scenarios that make no sense on a track section: every train in a section
+# shares its one route, so ROUTE_SPACED would hold each successive train
+# another 10 minutes; the section's tracks and headway already space them
+SECTION_EXCLUDED_SCENARIOS = frozenset({'ROUTE_SPACED'})
+
+# Set in each worker by _init_worker
+_WORKER_SIMULATOR = None
+
+
+class NetworkConfig:
+    """Stations, their platforms and the track sections between them
+
+    Loaded from JSON of the form::
+
+        {
+          "default_platforms": [1, 2, 3, 4, 5, 6],
+          "speed_kmh": 60,
+          "recovery_rate": 0.05,
+          "tracks": 1,
+          "headway_minutes": 5,
+          "stations": {"NDLS": {"platforms": [1, 2, ..., 16]}, ...},
+          "sections": {"NDLS-BCT": {"speed_kmh": 90, "recovery_minutes": 20, "tracks": 2}, ...}
+        }
+
+    Stations and sections that are not listed use the defaults. Sections are
+    keyed "SOURCE-DESTINATION" by station code and apply in that direction.
+    """
+
+    def __init__(self, stations=None, sections=None, default_platforms=DEFAULT_PLATFORMS,
+                 speed_kmh=DEFAULT_SPEED_KMH, recovery_rate=DEFAULT_RECOVERY_RATE,
+                 tracks=DEFAULT_TRACKS, headway_minutes=DEFAULT_HEADWAY_MINUTES):
+        self.stations = stations or {}
+        self.sections = sections or {}
+        self.default_platforms = tuple(default_platforms)
+        self.speed_kmh = speed_kmh
+        self.recovery_rate = recovery_rate
+        self.default_tracks = tracks
+        self.default_headway_minutes = headway_minutes
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding='utf-8') as f:
+            config = json.load(f)
+        return cls(
+            stations=config.get('stations'),
+            sections=config.get('sections'),
+            default_platforms=config.get('default_platforms', DEFAULT_PLATFORMS),
+            speed_kmh=config.get('speed_kmh', DEFAULT_SPEED_KMH),
+            recovery_rate=config.get('recovery_rate', DEFAULT_RECOVERY_RATE),
+            tracks=config.get('tracks', DEFAULT_TRACKS),
+            headway_minutes=config.get('headway_minutes', DEFAULT_HEADWAY_MINUTES)
+        )
+
+    def _section(self, source, destination):
+        return self.sections.get(f'{source}-{destination}', {})
+
+    def platforms(self, station):
+        return tuple(self.stations.get(station, {}).get('platforms', self.default_platforms))
+
+    def tracks(self, source, destination):
+        """Track numbers of the section from ``source`` to ``destination``"""
+        return tuple(range(1, self._section(source, destination).get('tracks', self.default_tracks) + 1))
+
+    def headway_minutes(self, source, destination):
+        return max(1, int(self._section(source, destination).get('headway_minutes', self.default_headway_minutes)))
+
+    def running_minutes(self, source, destination, distance):
+        """Scheduled minutes between leaving ``source`` and reaching ``destination``"""
+        speed = self._section(source, destination).get('speed_kmh', self.speed_kmh)
+        return max(1, int(round(distance / speed * 60)))
+
+    def recovery_minutes(self, source, destination, running_minutes):
+        """Minutes of delay a train can make up on the section"""
+        return self._section(source, destination).get('recovery_minutes', running_minutes * self.recovery_rate)
+
+
+def station_codes(df):
+    """{train_no: (source code, destination code)} from each train's first timetable row"""
+    first = df.groupby('Train No')[['Source Station', 'Destination Station']].first()
+    return {
+        train_no: (str(source), str(destination))
+        for train_no, source, destination in zip(first.index.tolist(), first['Source Station'], first['Destination Station'])
+    }
+
+
+def _minutes(train, kind):
+    return train[f'scheduled_{kind}_hour'] * 60 + train[f'scheduled_{kind}_minute']
+
+
+def _timed(train, start, end, **fields):
+    """Copy of a train dict occupying ``[start, end)`` minutes"""
+    arrival_hour, arrival_minute = divmod(start, 60)
+    departure_hour, departure_minute = divmod(end, 60)
+    return dict(
+        train,
+        scheduled_arrival_hour=arrival_hour,
+        scheduled_arrival_minute=arrival_minute,
+        scheduled_departure_hour=departure_hour,
+        scheduled_departure_minute=departure_minute,
+        **fields
+    )
+
+
+def assign_platforms(records, platforms):
+    """Give every record that is not an 'origin' train the platform it overlaps fewest trains on
+
+    Origin trains keep their timetabled platform. Destination and section
+    copies have no timetabled platform of their own there, so they are
+    placed in arrival order around the origin trains and each other, on the
+    lowest-numbered platform among the least occupied.
+    """
+    busy = {p: [] for p in platforms}
+    copies = []
+    for train in records:
+        if train['network_role'] != 'origin':
+            copies.append(train)
+        elif train['platform_no'] in busy:
+            busy[train['platform_no']].append((_minutes(train, 'arrival'), _minutes(train, 'departure')))
+
+    def overlapping(p, start, end):
+        return sum(1 for begin, finish in busy[p] if begin < end and start < finish)
+
+    for train in sorted(copies, key=lambda train: _minutes(train, 'arrival')):
+        start, end = _minutes(train, 'arrival'), _minutes(train, 'departure')
+        train['platform_no'] = min(platforms, key=lambda p: (overlapping(p, start, end), p))
+        busy[train['platform_no']].append((start, end))
+
+
+def partition_trains(train_data, codes, config):
+    """Split prepared trains into per-station and per-section partitions
+
+    Every train is scheduled at its source station, at its timetabled times.
+    A train bound elsewhere also takes its section, which it enters at its
+    source departure and holds for the section's headway on one of its
+    tracks, and then its destination, which it reaches after the section's
+    running time with the same dwell. Returns ``{station: [train dict, ...]}``
+    and ``{(source, destination): [train dict, ...]}``, where each dict
+    carries ``network_role`` ('origin', 'section' or 'terminating') and a
+    platform (or track) of its own partition. Also returns ``{train_no:
+    (source, destination, running minutes)}`` for the trains that cross a
+    boundary.
+    """
+    stations = {}
+    sections = {}
+    crossings = {}
+    for train in train_data:
+        source, destination = codes[train['train_no']]
+        stations.setdefault(source, []).append(dict(train, network_role='origin'))
+        if destination == source:
+            continue
+        running = config.running_minutes(source, destination, train['distance'])
+        arrival, departure = _minutes(train, 'arrival'), _minutes(train, 'departure')
+        sections.setdefault((source, destination), []).append(_timed(
+            train, departure, departure + config.headway_minutes(source, destination), network_role='section'
+        ))
+        stations.setdefault(destination, []).append(_timed(
+            train, arrival + running, departure + running, network_role='terminating'
+        ))
+        crossings[train['train_no']] = (source, destination, running)
+
+    for station, records in stations.items():
+        assign_platforms(records, config.platforms(station))
+    for (source, destination), records in sections.items():
+        assign_platforms(records, config.tracks(source, destination))
+    return stations, sections, crossings
+
+
+def _init_worker(simulator):
+    global _WORKER_SIMULATOR
+    _WORKER_SIMULATOR = simulator
+
+
+def _schedule_partition(task):
+    """Generate and rank one station's or section's scenarios; returns its best plan's delays and top rankings"""
+    name, records, platforms, top = task
+    simulator = copy.copy(_WORKER_SIMULATOR)
+    simulator.platforms = platforms
+    scenarios = simulator.generate_all_scenarios(records)
+    if isinstance(name, tuple):
+        scenarios = [view for view in scenarios if view.scenario_id not in SECTION_EXCLUDED_SCENARIOS]
+    scenario_rankings = rank_scenarios(scenarios)
+    best = scenario_rankings[0]['scenario']
+    delays = best.column('predicted_delay').tolist()
+    roles = best.table['network_role'].tolist()
+    return {
+        'name': name,
+        'total_scenarios': len(scenarios),
+        'best': best.scenario_id,
+        # Delay of each train in the best plan, by role, for boundary reconciliation
+        'delays': {(train_no, role): delay for train_no, role, delay in zip(best.table['train_no'].tolist(), roles, delays)},
+        'scenario_rankings': export_rankings(scenario_rankings[:top])
+    }
+
+
+class NetworkScheduler:
+    """Schedules every station and track section of a network and reconciles delays between them
+
+    The timetable is split into stations and sections (see partition_trains).
+    Each partition's scenarios are generated and ranked on its own platforms
+    or tracks, with up to ``workers`` partitions in parallel. A section's
+    trains enter it with the delay they leave their source with in that
+    station's best plan, and may be held there for a track. They reach their
+    destination with their delay on leaving the section, less what they
+    recover on it. Delays travel one partition further each round: partitions
+    whose incoming delays moved by more than ``tolerance`` minutes are
+    rescheduled, for up to ``max_rounds`` rounds, until the boundaries agree.
+    """
+
+    def __init__(self, simulator, config=None, workers=None, max_rounds=10, tolerance=0.5, top=5):
+        self.simulator = simulator
+        self.config = config or NetworkConfig()
+        self.workers = workers or default_workers()
+        self.max_rounds = max_rounds
+        self.tolerance = tolerance
+        self.top = top
+
+    def _schedule(self, partitions, resources, names):
+        tasks = [(name, partitions[name], resources[name], self.top) for name in names]
+        if self.workers <= 1 or len(tasks) <= 1:
+            _init_worker(self._worker_simulator())
+            return list(map(_schedule_partition, tasks))
+        with ProcessPoolExecutor(
+            max_workers=min(self.workers, len(tasks)),
+            mp_context=_context(),
+            initializer=_init_worker,
+            initargs=(self._worker_simulator(),)
+        ) as executor:
+            return list(executor.map(_schedule_partition, tasks))
+
+    def _worker_simulator(self):
+        # Predictions are already in the train data, and partitions are the unit of parallelism
+        simulator = copy.copy(self.simulator)
+        simulator.predictor = None
+        simulator.workers = 1
+        return simulator
+
+    def _update(self, partitions, positions, name, train_no, delay, dirty):
+        """Set a train's incoming delay in a partition, marking it dirty if it moved"""
+        record = partitions[name][positions[(train_no, name)]]
+        if abs(record['predicted_delay'] - delay) > self.tolerance:
+            record['predicted_delay'] = delay
+            dirty.add(name)
+
+    @profiled('network')
+    def schedule(self, train_data, codes):
+        """Schedule every station and section; ``codes`` is station_codes() of the timetable the trains came from"""
+        stations, sections, crossings = partition_trains(train_data, codes, self.config)
+        partitions = {**stations, **sections}
+        resources = {station: self.config.platforms(station) for station in stations}
+        resources.update({section: self.config.tracks(*section) for section in sections})
+        # Index of each train that enters a partition from another one
+        positions = {
+            (train['train_no'], name): i
+            for name, records in partitions.items()
+            for i, train in enumerate(records) if train['network_role'] != 'origin'
+        }
+
+        results = {}
+        boundary = {}
+        pending = list(partitions)
+        rounds = 0
+        while pending and rounds < self.max_rounds:
+            rounds += 1
+            with stage('network_round', partitions=len(pending)):
+                for result in self._schedule(partitions, resources, pending):
+                    results[result['name']] = result
+            count('network_partitions_scheduled', len(pending))
+
+            dirty = set()
+            for train_no, (source, destination, running) in crossings.items():
+                section = (source, destination)
+                departure_delay = results[source]['delays'][(train_no, 'origin')]
+                section_delay = results[section]['delays'][(train_no, 'section')]
+                recovery = self.config.recovery_minutes(source, destination, running)
+                arrival_delay = max(0.0, section_delay - recovery)
+                self._update(partitions, positions, section, train_no, departure_delay, dirty)
+                self._update(partitions, positions, destination, train_no, arrival_delay, dirty)
+                boundary[train_no] = {
+                    'train_no': train_no,
+                    'source': source,
+                    'destination': destination,
+                    'running_minutes': running,
+                    'departure_delay': departure_delay,
+                    'section_hold': max(0.0, section_delay - departure_delay),
+                    'arrival_delay': arrival_delay
+                }
+            pending = [name for name in partitions if name in dirty]
+            logger.info(f"Network round {rounds}: {len(pending)} partitions with changed incoming delays")
+
+        if pending:
+            logger.warning(f"Boundary delays still moving at {len(pending)} partitions after {rounds} rounds")
+
+        def summary(name, **fields):
+            return dict(
+                fields,
+                total_trains=len(partitions[name]),
+                total_scenarios=results[name]['total_scenarios'],
+                best=results[name]['best'],
+                scenario_rankings=results[name]['scenario_rankings']
+            )
+        return {
+            'rounds': rounds,
+            'converged': not pending,
+            'stations': {
+                station: summary(station, platforms=list(resources[station]))
+                for station in sorted(stations)
+            },
+            'sections': {
+                f'{source}-{destination}': summary((source, destination), tracks=len(resources[(source, destination)]))
+                for source, destination in sorted(sections)
+            },
+            'boundary': list(boundary.values())
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Network-wide scheduling across every station in the timetable')
+    base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+    parser.add_argument('--dataset', default=os.path.join(base_path, 'final_dataset.csv'))
+    parser.add_argument('--model', default=os.path.join(base_path, 'backend', 'ml', 'train_delay_model.pkl'))
+    parser.add_argument('--config', default=DEFAULT_CONFIG_PATH)
+    parser.add_argument('--num-trains', type=int, default=None, help='trains to read from the timetable (default all)')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--solver-time-limit', type=float, default=2.0)
+    parser.add_argument('--output-dir', default=os.path.join(base_path, 'control_station_output'))
+    args = parser.parse_args()
+
+    config = NetworkConfig.from_file(args.config) if os.path.exists(args.config) else NetworkConfig()
+    simulator = ControlStationSimulator(solver_time_limit=args.solver_time_limit, local_search_budget=0)
+    simulator.load_predictor(args.model)
+
+    df = load_timetable(args.dataset, num_trains=args.num_trains)
+    train_data = prepare_train_data(df, simulator.predictor)
+    network = NetworkScheduler(simulator, config, workers=args.workers).schedule(train_data, station_codes(df))
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    report_path = os.path.join(args.output_dir, f"network_schedule_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(dict(network, total_trains=len(train_data)), f, indent=2, default=str)
+
+    print(f"\n🌐 NETWORK SCHEDULE: {len(train_data)} trains across {len(network['stations'])} stations "
+          f"and {len(network['sections'])} sections "
+          f"({network['rounds']} rounds, {'converged' if network['converged'] else 'NOT converged'})")
+    for station, plan in network['stations'].items():
+        best = plan['scenario_rankings'][0]
+        print(f"   {station:<8} {plan['total_trains']:>5} trains | best {plan['best']:<22} | "
+              f"Avg Delay {best['metrics']['avg_delay']:.1f}min | Conflicts {best['metrics']['platform_conflicts']}")
+    held = [crossing['section_hold'] for crossing in network['boundary'] if crossing['section_hold'] > 0]
+    print(f"   Sections: {len(held)} trains held for a track, {sum(held):.0f}min in total")
+    print(f"\n📁 NETWORK SCHEDULE SAVED TO: {report_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+import weakref
+from bisect import bisect_left, bisect_right, insort
+
+import numpy as np
+
+_TABLE_INDEXES = weakref.WeakKeyDictionary()
+
+
+class PlatformOccupancy:
+    """Per-platform interval index of when each train occupies its platform
+
+    A train occupies ``[start, end)`` where start is scheduled arrival plus
+    predicted delay and end is start plus the scheduled dwell. Two trains
+    conflict when they are on the same platform and their intervals overlap.
+    Trains whose timetable times could not be parsed are left out.
+    Each platform keeps its starts and ends in sorted lists, so counting the
+    trains overlapping one interval is two binary searches: every train that
+    starts before it ends, minus those that ended before it started. Building
+    the index is O(N log N); moving one train updates the conflict count in
+    O(log N) searches.
+    """
+
+    def __init__(self, starts, ends, platforms, active=None):
+        self.starts = np.asarray(starts, dtype=float).tolist()
+        self.ends = np.asarray(ends, dtype=float).tolist()
+        self.platforms = np.asarray(platforms).tolist()
+        self.arrivals = None
+        self.dwells = None
+        # Rows without a usable occupancy interval never conflict
+        self.active = [True] * len(self.starts) if active is None else np.asarray(active, dtype=bool).tolist()
+        self._index = {}
+        for row, platform in enumerate(self.platforms):
+            if self.active[row]:
+                starts_list, ends_list = self._index.setdefault(platform, ([], []))
+                starts_list.append(self.starts[row])
+                ends_list.append(self.ends[row])
+        for starts_list, ends_list in self._index.values():
+            starts_list.sort()
+            ends_list.sort()
+
+        overlapping = sum(self.overlaps(row) for row in range(len(self.starts)) if self.active[row])
+        self.conflicts = overlapping // 2
+
+    @classmethod
+    def from_table(cls, table, delays=None, platforms=None):
+        """Build an index from a TrainTable, optionally with replacement delays or platforms"""
+        delays = table['predicted_delay'] if delays is None else delays
+        platforms = table['platform_no'] if platforms is None else platforms
+        arrivals = table.arrival_minutes
+        dwells = table.dwell_minutes
+        starts = arrivals + np.asarray(delays, dtype=float)
+        active = table['time_valid'] if 'time_valid' in table else None
+        index = cls(starts, starts + dwells, platforms, active)
+        index.arrivals = arrivals.tolist()
+        index.dwells = dwells.tolist()
+        return index
+
+    @classmethod
+    def for_table(cls, table):
+        """Shared index over a table's own delays and platforms, built once per table
+
+        Scenarios are scored against it with ``conflicts_for`` which moves the
+        scenario's changed trains and then restores the index, so it must not
+        be used from several threads at once.
+        """
+        index = _TABLE_INDEXES.get(table)
+        if index is None:
+            index = _TABLE_INDEXES[table] = cls.from_table(table)
+        return index
+
+    @classmethod
+    def carry_over(cls, old_table, new_table):
+        """Hand ``old_table``'s shared index to ``new_table`` with the same rows
+
+        For a table derived by changing a few delays or platforms: the caller
+        moves those trains in the index first, which is much cheaper than
+        rebuilding it. ``old_table`` builds a fresh index if it is used again.
+        """
+        index = _TABLE_INDEXES.pop(old_table, None)
+        if index is None:
+            return cls.for_table(new_table)
+        _TABLE_INDEXES[new_table] = index
+        return index
+
+    def overlaps(self, row):
+        """Number of other trains whose occupancy overlaps this train's on its platform"""
+        if not self.active[row]:
+            return 0
+        starts_list, ends_list = self._index[self.platforms[row]]
+        start, end = self.starts[row], self.ends[row]
+        # Trains starting before we end, minus trains that ended before we started, minus ourselves
+        return bisect_left(starts_list, end) - bisect_right(ends_list, start) - 1
+
+    def _remove(self, row):
+        starts_list, ends_list = self._index[self.platforms[row]]
+        del starts_list[bisect_left(starts_list, self.starts[row])]
+        del ends_list[bisect_left(ends_list, self.ends[row])]
+
+    def _insert(self, row):
+        starts_list, ends_list = self._index.setdefault(self.platforms[row], ([], []))
+        insort(starts_list, self.starts[row])
+        insort(ends_list, self.ends[row])
+
+    def move(self, row, platform=None, start=None, end=None):
+        """Move one train to a new platform and/or interval; returns the change in conflicts"""
+        before = self.conflicts
+        if self.active[row]:
+            self.conflicts -= self.overlaps(row)
+            self._remove(row)
+        if platform is not None:
+            self.platforms[row] = platform
+        if start is not None:
+            self.starts[row] = start
+        if end is not None:
+            self.ends[row] = end
+        if self.active[row]:
+            self._insert(row)
+            self.conflicts += self.overlaps(row)
+        return self.conflicts - before
+
+    def conflicts_for(self, moves):
+        """Conflict count with ``{row: (platform, start, end)}`` applied, leaving the index unchanged"""
+        undo = []
+        for row, (platform, start, end) in moves.items():
+            undo.append((row, self.platforms[row], self.starts[row], self.ends[row]))
+            self.move(row, platform, start, end)
+        conflicts = self.conflicts
+        for row, platform, start, end in reversed(undo):
+            self.move(row, platform, start, end)
+        return conflicts
+
+    def conflicts_for_view(self, view):
+        """Conflict count of a ScenarioView over the table this index was built from"""
+        platform_changes = view.overlay.get('platform_no') or {}
+        delay_changes = view.overlay.get('predicted_delay') or {}
+        moves = {}
+        for row in set(platform_changes) | set(delay_changes):
+            platform = platform_changes.get(row, self.platforms[row])
+            if row in delay_changes:
+                start = self.arrivals[row] + float(delay_changes[row])
+                end = start + self.dwells[row]
+            else:
+                start, end = self.starts[row], self.ends[row]
+            moves[row] = (platform, start, end)
+        return self.conflicts_for(moves)
+
+
+def schedule_conflicts(schedule):
+    """Count overlapping platform occupancies in a list of train dicts"""
+    arrivals = np.array([t['scheduled_arrival_hour'] * 60 + t['scheduled_arrival_minute'] for t in schedule], dtype=float)
+    departures = np.array([t['scheduled_departure_hour'] * 60 + t['scheduled_departure_minute'] for t in schedule], dtype=float)
+    starts = arrivals + np.array([t['predicted_delay'] for t in schedule], dtype=float)
+    dwells = np.maximum((departures - arrivals) % 1440, 1)
+    active = [t.get('time_valid', True) for t in schedule]
+    return PlatformOccupancy(starts, starts + dwells, [t['platform_no'] for t in schedule], active).conflicts
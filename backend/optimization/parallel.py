@@ -0,0 +1,92 @@
+import copy
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from scoring import score_scenarios, scenario_matrices
+
+# Set in each worker by _init_worker; with the fork start method the table is
+# inherited from the parent instead of being pickled
+_WORKER_TABLE = None
+_WORKER_SIMULATOR = None
+
+
+def default_workers():
+    """Worker count used when parallelism is requested without a number"""
+    return os.cpu_count() or 1
+
+
+def _context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('fork' if 'fork' in methods else None)
+
+
+def _init_worker(table, simulator):
+    global _WORKER_TABLE, _WORKER_SIMULATOR
+    _WORKER_TABLE = table
+    _WORKER_SIMULATOR = simulator
+
+
+def _build(task):
+    method_name, args = task
+    built = getattr(_WORKER_SIMULATOR, method_name)(_WORKER_TABLE, *args)
+    return built if isinstance(built, list) else [built]
+
+
+def _score(views):
+    for view in views:
+        view.attach(_WORKER_TABLE)
+    return score_scenarios(*scenario_matrices(views))
+
+
+def chunk_evenly(items, chunks):
+    """Split a sequence into at most ``chunks`` contiguous, order-preserving pieces"""
+    return [piece.tolist() for piece in np.array_split(np.asarray(items), max(1, min(chunks, len(items))))]
+
+
+class ScenarioExecutor:
+    """Process pool sharing one TrainTable with every worker
+
+    Workers receive the table (and a predictor-less copy of the simulator)
+    once, at start-up; under the fork start method they inherit it without
+    pickling. Tasks carry only builder names and row ranges, and views come
+    back without their table, so per-task traffic is the order and overlay
+    arrays. Results are returned in submission order.
+    """
+
+    def __init__(self, table, simulator=None, workers=None):
+        self.table = table
+        worker_simulator = None
+        if simulator is not None:
+            worker_simulator = copy.copy(simulator)
+            worker_simulator.predictor = None
+        self.workers = workers or default_workers()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=_context(),
+            initializer=_init_worker,
+            initargs=(table, worker_simulator)
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._executor.shutdown()
+
+    def build(self, tasks):
+        """Run ``(method_name, args)`` scenario builders and return their views in task order"""
+        views = []
+        for built in self._executor.map(_build, tasks):
+            for view in built:
+                view.attach(self.table)
+                views.append(view)
+        return views
+
+    def score(self, views):
+        """score_scenarios over views split across the workers, merged back in order"""
+        pieces = chunk_evenly(range(len(views)), self.workers)
+        results = list(self._executor.map(_score, [[views[i] for i in piece] for piece in pieces]))
+        return {name: np.concatenate([result[name] for result in results]) for name in results[0]}
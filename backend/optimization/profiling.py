@@ -0,0 +1,239 @@
+import functools
+import json
+import os
+import re
+import threading
+import time
+import tracemalloc
+from collections import defaultdict, deque
+
+# SCHEDULER_PROFILE=1 turns on stage timers and counters; =memory also tracks allocations
+PROFILE_ENV = 'SCHEDULER_PROFILE'
+
+# Spans kept for the Chrome trace; older ones are dropped first
+MAX_SPANS = 100_000
+
+
+class _NullStage:
+    """Context manager handed out while profiling is off"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ('profiler', 'name', 'args', 'start', 'memory')
+
+    def __init__(self, profiler, name, args):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.memory = self.profiler._enter_memory() if self.profiler.memory else None
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter_ns()
+        peak = self.profiler._exit_memory(self.memory) if self.memory is not None else None
+        self.profiler._record(self.name, self.start, end - self.start, peak, self.args)
+        return False
+
+
+class Profiler:
+    """Stage timers, counters and allocation peaks for the scheduling pipeline
+
+    While ``enabled`` is false, ``stage()`` returns a shared no-op context
+    manager and ``count()`` returns immediately, so instrumented code pays one
+    attribute check. When enabled, every stage records a span (name, thread,
+    start, duration and, with ``memory``, its tracemalloc peak above the
+    allocations live when it started) and adds to per-stage totals. Totals
+    and counters export as Prometheus text, spans as Chrome trace JSON.
+
+    Allocation peaks come from the process-wide tracemalloc counters, so they
+    are exact for nested stages on one thread and approximate when stages on
+    several threads overlap.
+    """
+
+    def __init__(self, enabled=False, memory=False, max_spans=MAX_SPANS):
+        self.enabled = False
+        self.memory = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._spans = deque(maxlen=max_spans)
+        self.reset()
+        if enabled:
+            self.enable(memory)
+
+    @classmethod
+    def from_env(cls, environ=os.environ):
+        value = environ.get(PROFILE_ENV, '').strip().lower()
+        return cls(enabled=value not in ('', '0', 'false', 'off', 'no'), memory=value == 'memory')
+
+    def enable(self, memory=False):
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.memory = memory
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        if self.memory:
+            self.memory = False
+            tracemalloc.stop()
+
+    def reset(self):
+        """Forget every span, total and counter"""
+        with self._lock:
+            self._spans.clear()
+            self._totals = defaultdict(lambda: [0, 0, 0, None])  # calls, total ns, max ns, max peak bytes
+            self._counters = defaultdict(float)
+            self._origin = time.perf_counter_ns()
+
+    def stage(self, name, **args):
+        """Context manager timing one pipeline stage; ``args`` are shown in the trace"""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name, args)
+
+    def count(self, name, value=1):
+        """Add ``value`` to a counter"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] += value
+
+    def profiled(self, name):
+        """Decorator timing every call of a function as stage ``name``"""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with _Stage(self, name, {}):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _enter_memory(self):
+        # Each open stage on this thread is [current bytes at entry, peak bytes seen];
+        # the peak counter is reset per stage, so fold it into the open ones first
+        stack = self._local.__dict__.setdefault('memory', [])
+        current, peak = tracemalloc.get_traced_memory()
+        for frame in stack:
+            frame[1] = max(frame[1], peak)
+        tracemalloc.reset_peak()
+        frame = [current, current]
+        stack.append(frame)
+        return frame
+
+    def _exit_memory(self, frame):
+        stack = self._local.memory
+        _, peak = tracemalloc.get_traced_memory()
+        frame[1] = max(frame[1], peak)
+        stack.remove(frame)
+        if stack:
+            stack[-1][1] = max(stack[-1][1], frame[1])
+        return frame[1] - frame[0]
+
+    def _record(self, name, start, duration, peak, args):
+        span = (name, threading.get_ident(), start, duration, peak, args)
+        with self._lock:
+            self._spans.append(span)
+            totals = self._totals[name]
+            totals[0] += 1
+            totals[1] += duration
+            totals[2] = max(totals[2], duration)
+            if peak is not None:
+                totals[3] = peak if totals[3] is None else max(totals[3], peak)
+
+    def summary(self):
+        """{'stages': {name: {calls, seconds, max_seconds, peak_bytes}}, 'counters': {...}}"""
+        with self._lock:
+            stages = {
+                name: {
+                    'calls': calls,
+                    'seconds': total / 1e9,
+                    'max_seconds': longest / 1e9,
+                    'peak_bytes': peak
+                }
+                for name, (calls, total, longest, peak) in self._totals.items()
+            }
+            return {'stages': stages, 'counters': dict(self._counters)}
+
+    def prometheus(self, prefix='scheduler'):
+        """Totals and counters in the Prometheus text exposition format"""
+        summary = self.summary()
+        lines = [
+            f'# HELP {prefix}_stage_seconds Time spent in each pipeline stage',
+            f'# TYPE {prefix}_stage_seconds summary'
+        ]
+        for name, stats in sorted(summary['stages'].items()):
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {stats["calls"]}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {stats["seconds"]:.9f}')
+        lines += [
+            f'# HELP {prefix}_stage_max_seconds Longest single call of each pipeline stage',
+            f'# TYPE {prefix}_stage_max_seconds gauge'
+        ]
+        for name, stats in sorted(summary['stages'].items()):
+            lines.append(f'{prefix}_stage_max_seconds{{stage="{name}"}} {stats["max_seconds"]:.9f}')
+        peaks = {name: stats['peak_bytes'] for name, stats in summary['stages'].items() if stats['peak_bytes'] is not None}
+        if peaks:
+            lines += [
+                f'# HELP {prefix}_stage_peak_bytes Largest allocation peak of each pipeline stage',
+                f'# TYPE {prefix}_stage_peak_bytes gauge'
+            ]
+            for name, peak in sorted(peaks.items()):
+                lines.append(f'{prefix}_stage_peak_bytes{{stage="{name}"}} {peak}')
+        for name, value in sorted(summary['counters'].items()):
+            metric = f'{prefix}_{re.sub(r"[^a-zA-Z0-9_]", "_", name)}_total'
+            lines += [f'# TYPE {metric} counter', f'{metric} {value:g}']
+        return '\n'.join(lines) + '\n'
+
+    def chrome_trace(self):
+        """Spans as Chrome trace events (chrome://tracing, Perfetto)"""
+        pid = os.getpid()
+        with self._lock:
+            spans = list(self._spans)
+            counters = dict(self._counters)
+            origin = self._origin
+        events = []
+        for name, thread, start, duration, peak, args in spans:
+            args = dict(args)
+            if peak is not None:
+                args['peak_bytes'] = peak
+            events.append({
+                'name': name, 'cat': 'scheduler', 'ph': 'X', 'pid': pid, 'tid': thread,
+                'ts': (start - origin) / 1000, 'dur': duration / 1000, 'args': args
+            })
+        if counters:
+            end = max(((start + duration - origin) / 1000 for _, _, start, duration, _, _ in spans), default=0)
+            events.append({'name': 'counters', 'ph': 'C', 'pid': pid, 'tid': 0, 'ts': end, 'args': counters})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write(self, directory, basename='profile'):
+        """Write ``{basename}.prom`` and ``{basename}.trace.json``; returns their paths"""
+        os.makedirs(directory, exist_ok=True)
+        metrics_path = os.path.join(directory, f'{basename}.prom')
+        trace_path = os.path.join(directory, f'{basename}.trace.json')
+        with open(metrics_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus())
+        with open(trace_path, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f, default=str)
+        return metrics_path, trace_path
+
+
+# The process-wide profiler, configured from SCHEDULER_PROFILE at import
+profiler = Profiler.from_env()
+stage = profiler.stage
+count = profiler.count
+profiled = profiler.profiled
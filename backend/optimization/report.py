@@ -0,0 +1,181 @@
+import json
+import os
+
+from profiling import profiled
+from scenarios import TrainTable, ScenarioView
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+REPORT_FORMAT = 'control-station-report'
+REPORT_VERSION = 1
+
+# The last line of a report is the byte offset of its index line, zero-padded
+# to a fixed width so a reader can seek straight to it
+OFFSET_WIDTH = 20
+
+
+def _dumps(value):
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY, default=str)
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def _loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _encode_overlay(overlay):
+    return {name: {'rows': list(changes.keys()), 'values': list(changes.values())} for name, changes in overlay.items()}
+
+
+def _decode_overlay(encoded):
+    return {name: dict(zip(changes['rows'], changes['values'])) for name, changes in encoded.items()}
+
+
+class ReportWriter:
+    """Streams a control station report to disk as JSON lines
+
+    The file holds a header line with the metadata, the train table once as
+    columns, then one line per ranked scenario with only its order and
+    overlay, so the size grows as scenarios + trains instead of scenarios x
+    trains. Closing the writer appends an index of every scenario line's
+    byte range and a fixed-width pointer to that index, which ReportReader
+    uses to read single scenarios without loading the rest.
+    """
+
+    def __init__(self, path, metadata=None):
+        self.path = path
+        self._file = open(path, 'wb')
+        self._table = None
+        self._table_range = None
+        self._scenarios = []
+        self._write({'format': REPORT_FORMAT, 'version': REPORT_VERSION, 'metadata': metadata or {}})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _write(self, value):
+        offset = self._file.tell()
+        line = _dumps(value) + b'\n'
+        self._file.write(line)
+        return offset, len(line)
+
+    def write_table(self, table):
+        """Write the shared train table; called once, before its scenarios"""
+        if self._table is not None:
+            raise ValueError("Report already has a train table")
+        self._table = table
+        self._table_range = self._write({
+            'fields': list(table.fields),
+            'columns': {name: table[name].tolist() for name in table.fields}
+        })
+
+    def write_ranking(self, ranking):
+        """Write one ranking entry from rank_scenarios"""
+        scenario = ranking['scenario']
+        entry = {name: value for name, value in ranking.items() if name != 'scenario'}
+        if isinstance(scenario, ScenarioView):
+            if self._table is None:
+                self.write_table(scenario.table)
+            if scenario.table is not self._table:
+                scenario = scenario.to_dict()
+        if isinstance(scenario, ScenarioView):
+            entry.update({name: getattr(scenario, name) for name in ScenarioView.META_FIELDS})
+            entry['order'] = scenario.order.tolist()
+            entry['overlay'] = _encode_overlay(scenario.overlay)
+        else:
+            # Scenarios over another table are stored whole
+            entry.update(scenario)
+        offset, length = self._write(entry)
+        self._scenarios.append((entry['scenario_id'], offset, length))
+
+    def close(self):
+        if self._file.closed:
+            return
+        index_offset, _ = self._write({'table': self._table_range, 'scenarios': self._scenarios})
+        self._file.write(str(index_offset).zfill(OFFSET_WIDTH).encode('ascii') + b'\n')
+        self._file.close()
+
+
+@profiled('report')
+def write_report(path, scenario_rankings, metadata=None):
+    """Write rankings from rank_scenarios as a report, one scenario at a time"""
+    with ReportWriter(path, metadata) as writer:
+        for ranking in scenario_rankings:
+            writer.write_ranking(ranking)
+    return path
+
+
+class ReportReader:
+    """Random access to a report written by ReportWriter
+
+    Opening a report reads only its header and index. ``top(k)`` and
+    ``scenario(scenario_id)`` read the train table once and then just the
+    requested scenario lines, returning ranking entries whose ``scenario`` is
+    a ScenarioView, as rank_scenarios does.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            header = _loads(f.readline())
+            if header.get('format') != REPORT_FORMAT:
+                raise ValueError(f"{path} is not a control station report")
+            f.seek(-(OFFSET_WIDTH + 1), os.SEEK_END)
+            f.seek(int(f.read(OFFSET_WIDTH)))
+            index = _loads(f.readline())
+        self.metadata = header['metadata']
+        self._table_range = index['table']
+        self._index = [tuple(item) for item in index['scenarios']]
+        self._positions = {scenario_id: i for i, (scenario_id, _, _) in enumerate(self._index)}
+        self._table = None
+
+    def __len__(self):
+        return len(self._index)
+
+    @property
+    def scenario_ids(self):
+        """Scenario ids in rank order"""
+        return [scenario_id for scenario_id, _, _ in self._index]
+
+    def _read(self, offset, length):
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return _loads(f.read(length))
+
+    def table(self):
+        """The report's train table (read once)"""
+        if self._table is None and self._table_range is not None:
+            data = self._read(*self._table_range)
+            self._table = TrainTable(data['columns'], data['fields'])
+        return self._table
+
+    def ranking(self, position):
+        """Ranking entry at a rank-order position"""
+        _, offset, length = self._index[position]
+        entry = self._read(offset, length)
+        if 'order' in entry:
+            view = ScenarioView(
+                self.table(), entry.pop('order'),
+                overlay=_decode_overlay(entry.pop('overlay')),
+                **{name: entry.pop(name) for name in ScenarioView.META_FIELDS}
+            )
+        else:
+            view = {name: entry.pop(name) for name in ScenarioView.META_FIELDS + ('schedule',)}
+        return dict(entry, scenario=view)
+
+    def top(self, k=5):
+        """The k best-ranked scenarios"""
+        return [self.ranking(i) for i in range(min(k, len(self)))]
+
+    def scenario(self, scenario_id):
+        """Ranking entry for one scenario id"""
+        if scenario_id not in self._positions:
+            raise KeyError(f"Scenario {scenario_id} is not in this report")
+        return self.ranking(self._positions[scenario_id])
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from profiling import count
+from report import ReportReader, write_report
+from scenarios import TrainTable
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever scenario generation or scoring changes what a given input ranks to
+RANKING_VERSION = 2
+
+
+def table_digest(table):
+    """SHA-256 of a train table's fields and column contents"""
+    digest = hashlib.sha256()
+    for name in table.fields:
+        column = table[name]
+        digest.update(name.encode('utf-8'))
+        digest.update(str(column.dtype).encode('ascii'))
+        if column.dtype.kind == 'O':
+            digest.update(json.dumps(column.tolist(), default=str).encode('utf-8'))
+        else:
+            digest.update(column.tobytes())
+    return digest.hexdigest()
+
+
+def ranking_key(train_data, config, model_version=None):
+    """Content address of a ranking: the prepared trains, the scenario configuration and the model version"""
+    digest = hashlib.sha256()
+    digest.update(table_digest(TrainTable.from_records(train_data)).encode('ascii'))
+    digest.update(json.dumps({'version': RANKING_VERSION, 'config': config, 'model': model_version},
+                             sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class RankingCache:
+    """Ranked scenarios by content address, in memory and optionally on disk
+
+    The memory tier holds the ``maxsize`` most recently used rankings. With
+    ``cache_dir``, rankings are also written there as reports (see
+    report.py), and the least recently used files are deleted once there are
+    more than ``max_disk_entries`` of them or they take more than
+    ``max_disk_bytes``. A disk hit is read back through ReportReader and
+    promoted to memory. ``get`` returns shallow copies of the ranking entries,
+    so callers may add to them without changing what is cached.
+    """
+
+    def __init__(self, maxsize=32, cache_dir=None, max_disk_entries=256, max_disk_bytes=256 * 2 ** 20):
+        self.maxsize = maxsize
+        self.cache_dir = cache_dir
+        self.max_disk_entries = max_disk_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.jsonl')
+
+    def get(self, key):
+        """Cached rankings for ``key``, or None"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                count('ranking_cache_hits')
+                return [dict(ranking) for ranking in self._memory[key]]
+        if self.cache_dir and os.path.exists(self._path(key)):
+            try:
+                reader = ReportReader(self._path(key))
+                scenario_rankings = reader.top(len(reader))
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Discarding unreadable cached ranking {key}: {e}")
+                self._remove(self._path(key))
+            else:
+                os.utime(self._path(key))
+                with self._lock:
+                    self.disk_hits += 1
+                    self._remember(key, scenario_rankings)
+                count('ranking_cache_disk_hits')
+                return [dict(ranking) for ranking in scenario_rankings]
+        with self._lock:
+            self.misses += 1
+        count('ranking_cache_misses')
+        return None
+
+    def put(self, key, scenario_rankings):
+        """Cache rankings from rank_scenarios under ``key``"""
+        scenario_rankings = [dict(ranking) for ranking in scenario_rankings]
+        with self._lock:
+            self._remember(key, scenario_rankings)
+        if self.cache_dir:
+            tmp_path = f'{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp'
+            try:
+                write_report(tmp_path, scenario_rankings, {'cache_key': key})
+                os.replace(tmp_path, self._path(key))
+            except OSError as e:
+                logger.warning(f"Could not write cached ranking {key}: {e}")
+                self._remove(tmp_path)
+            else:
+                self._evict_disk()
+
+    def get_or_compute(self, key, compute):
+        """Cached rankings for ``key``, computing and caching them with ``compute()`` on a miss"""
+        scenario_rankings = self.get(key)
+        if scenario_rankings is None:
+            scenario_rankings = compute()
+            self.put(key, scenario_rankings)
+        return scenario_rankings
+
+    def _remember(self, key, scenario_rankings):
+        self._memory[key] = scenario_rankings
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _evict_disk(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.jsonl'):
+                try:
+                    stat = os.stat(os.path.join(self.cache_dir, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        while entries and (len(entries) > self.max_disk_entries or total > self.max_disk_bytes):
+            _, size, name = entries.pop(0)
+            self._remove(os.path.join(self.cache_dir, name))
+            total -= size
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self.cache_dir:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.jsonl'):
+                    self._remove(os.path.join(self.cache_dir, name))
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            'size': len(self._memory),
+            'maxsize': self.maxsize
+        }
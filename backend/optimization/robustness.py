@@ -0,0 +1,130 @@
+import numpy as np
+
+from profiling import profiled
+from scoring import overall_scores
+
+# Cap on (samples x trains x trains) comparisons held at once per platform
+CLASH_CELLS = 8_000_000
+
+
+def model_residuals(predictor):
+    """Residuals (actual minus predicted delay) of a predictor, if it keeps them
+
+    Looks through a CachedDelayPredictor to the model it wraps; returns None
+    when no residuals are available.
+    """
+    while predictor is not None:
+        residuals = getattr(predictor, 'residuals', None)
+        if residuals is not None and len(residuals):
+            return np.asarray(residuals, dtype=float)
+        predictor = getattr(predictor, 'predictor', None)
+    return None
+
+
+def sample_perturbations(num_trains, samples=1000, residuals=None, sd=5.0, seed=0):
+    """(samples x trains) minutes added to each predicted delay
+
+    Draws from ``residuals`` with replacement when given, otherwise from a
+    normal distribution with standard deviation ``sd``.
+    """
+    rng = np.random.default_rng(np.random.SeedSequence(seed))
+    if residuals is not None:
+        return rng.choice(np.asarray(residuals, dtype=float), size=(samples, num_trains))
+    return rng.normal(0.0, sd, size=(samples, num_trains))
+
+
+def sampled_conflicts(starts, ends, platforms, active):
+    """Platform conflict count of every sample
+
+    ``starts`` and ``ends`` are (samples x trains) occupancy intervals. Two
+    active trains on one platform conflict when their intervals overlap, as
+    in PlatformOccupancy.
+    """
+    conflicts = np.zeros(len(starts), dtype=np.int64)
+    for platform in np.unique(platforms[active]):
+        rows = np.flatnonzero(active & (platforms == platform))
+        if len(rows) < 2:
+            continue
+        chunk = max(1, CLASH_CELLS // (len(rows) * len(rows)))
+        for first in range(0, len(starts), chunk):
+            s, e = starts[first:first + chunk, rows], ends[first:first + chunk, rows]
+            overlap = (s[:, :, None] < e[:, None, :]) & (s[:, None, :] < e[:, :, None])
+            # Each train overlaps itself; every other pair is counted twice
+            conflicts[first:first + chunk] += (np.count_nonzero(overlap, axis=(1, 2)) - len(rows)) // 2
+    return conflicts
+
+
+def robustness_scores(views, samples=1000, residuals=None, sd=5.0, seed=0, perturbations=None):
+    """Score ScenarioViews over one table against sampled delay perturbations
+
+    Every scenario is scored on the same (samples x trains) perturbation
+    matrix, with perturbed delays clipped at zero. Average delay and platform
+    conflicts do not depend on train order, so they are computed once per
+    distinct platform and delay assignment and shared by the scenarios that
+    only reorder trains. Returns per-scenario arrays ``mean_score``,
+    ``p10_score`` (the score 90% of samples beat), ``mean_delay``,
+    ``p90_delay`` (average delay exceeded by 10% of samples) and
+    ``clash_probability`` (share of samples with any platform conflict).
+    """
+    table = views[0].table
+    num_trains = len(table)
+    if perturbations is None:
+        perturbations = sample_perturbations(num_trains, samples, residuals, sd, seed)
+    arrivals = table.arrival_minutes.astype(float)
+    dwells = table.dwell_minutes.astype(float)
+    active = table['time_valid'].astype(bool) if 'time_valid' in table else np.ones(num_trains, dtype=bool)
+    express = table['priority'] == 1
+
+    sampled = {}
+    result = {name: np.empty(len(views)) for name in (
+        'mean_score', 'p10_score', 'mean_delay', 'p90_delay', 'clash_probability'
+    )}
+    for i, view in enumerate(views):
+        key = tuple(
+            frozenset((view.overlay.get(name) or {}).items()) for name in ('platform_no', 'predicted_delay')
+        )
+        if key not in sampled:
+            delays = np.maximum(0.0, np.asarray(view.column('predicted_delay'), dtype=float) + perturbations)
+            starts = arrivals + delays
+            conflicts = sampled_conflicts(starts, starts + dwells, np.asarray(view.column('platform_no')), active)
+            sampled[key] = (delays.mean(axis=1), conflicts)
+        avg_delay, conflicts = sampled[key]
+
+        positions = np.flatnonzero(express[view.order]) + 1
+        express_avg_position = positions.mean() if len(positions) else 0
+        _, _, scores = overall_scores(avg_delay, conflicts, express_avg_position)
+
+        result['mean_score'][i] = scores.mean()
+        result['p10_score'][i] = np.percentile(scores, 10)
+        result['mean_delay'][i] = avg_delay.mean()
+        result['p90_delay'][i] = np.percentile(avg_delay, 90)
+        result['clash_probability'][i] = np.count_nonzero(conflicts) / len(conflicts)
+    return result
+
+
+@profiled('robustness')
+def add_robustness(scenario_rankings, samples=1000, residuals=None, sd=5.0, seed=0, rerank=False):
+    """Attach a ``robustness`` dict to each ranking over a ScenarioView
+
+    With ``rerank`` the rankings are re-sorted by mean sampled score, so a
+    plan that only scores well on the point estimate drops behind one that
+    holds up under perturbed delays.
+    """
+    by_table = {}
+    for ranking in scenario_rankings:
+        table = getattr(ranking['scenario'], 'table', None)
+        if table is not None:
+            by_table.setdefault(id(table), []).append(ranking)
+
+    for rankings in by_table.values():
+        scores = robustness_scores([r['scenario'] for r in rankings], samples, residuals, sd, seed)
+        for j, ranking in enumerate(rankings):
+            ranking['robustness'] = {name: values[j].item() for name, values in scores.items()}
+
+    if rerank:
+        scenario_rankings.sort(
+            key=lambda r: r['robustness']['mean_score'] if 'robustness' in r else r['overall_score'], reverse=True
+        )
+        for i, ranking in enumerate(scenario_rankings):
+            ranking['rank'] = i + 1
+    return scenario_rankings
@@ -0,0 +1,161 @@
+import bisect
+import copy
+import logging
+import time
+
+import numpy as np
+
+from profiling import count, profiled
+from scenarios import TrainTable
+from scheduler import rank_scenarios
+
+logger = logging.getLogger(__name__)
+
+
+def _arrival_minute(train):
+    return train['scheduled_arrival_hour'] * 60 + train['scheduled_arrival_minute']
+
+
+def _departure_minute(train):
+    return train['scheduled_departure_hour'] * 60 + train['scheduled_departure_minute']
+
+
+def _pinned(view, table, frozen):
+    """The view with its first ``frozen`` rows kept in place: first in the order, on their committed platforms"""
+    order = np.concatenate([np.arange(frozen), view.order[view.order >= frozen]])
+    overlay = {
+        name: {row: value for row, value in changes.items() if row >= frozen}
+        for name, changes in view.overlay.items()
+    }
+    return view.rebase(table, order=order, overlay=overlay)
+
+
+class RollingHorizonScheduler:
+    """Continuous scheduling over a sliding window of the day's trains
+
+    Trains are kept sorted by scheduled arrival minute and can be added at any
+    time. Each ``advance(now)`` schedules only the trains arriving before
+    ``now + horizon`` that are not yet committed, found by bisection, together
+    with the committed trains still at the station. Scenarios are generated
+    and ranked for that window alone, so a cycle costs the same whether the
+    day has a hundred trains or ten thousand.
+
+    Trains the best plan starts before ``now + freeze`` are committed: from
+    then on they keep their position (ahead of every uncommitted train),
+    platform and delay in every scenario, and leave the window once they have
+    departed. The solver sees them through the table's ``committed`` column as
+    fixed platform occupancy and schedules the other trains around them.
+    """
+
+    def __init__(self, simulator, horizon=90, freeze=15):
+        if freeze > horizon:
+            raise ValueError("The freeze point must lie inside the horizon")
+        self.simulator = copy.copy(simulator)
+        self.horizon = horizon
+        self.freeze = freeze
+        self.now = None
+        self._arrivals = []
+        self._trains = []
+        # Trains before this index are all committed or departed
+        self._next = 0
+        # Committed trains still at the station, in commit order: {train_no: train dict}
+        self.committed = {}
+        # Minute each train was committed at, kept after it departs
+        self._committed_at = {}
+        self.departed = []
+
+    def __len__(self):
+        return len(self._trains)
+
+    def add_trains(self, train_data):
+        """Stream in prepared trains (prepare_train_data dicts); trains already known are ignored"""
+        known = {train['train_no'] for train in self._trains}
+        added = 0
+        for train in train_data:
+            if train['train_no'] in known:
+                continue
+            arrival = _arrival_minute(train)
+            index = bisect.bisect_right(self._arrivals, arrival)
+            self._arrivals.insert(index, arrival)
+            self._trains.insert(index, dict(train, committed=False))
+            known.add(train['train_no'])
+            self._next = min(self._next, index)
+            added += 1
+        return added
+
+    def _retire(self, now):
+        """Drop committed trains whose (delayed) departure is before ``now``"""
+        for train_no, train in list(self.committed.items()):
+            if _departure_minute(train) + train['predicted_delay'] < now:
+                del self.committed[train_no]
+                self.departed.append(dict(train, committed_at=self._committed_at[train_no]))
+
+    def window(self, now):
+        """Committed trains still at the station, then the uncommitted trains arriving before ``now + horizon``"""
+        while self._next < len(self._trains) and self._trains[self._next]['train_no'] in self._committed_at:
+            self._next += 1
+        end = bisect.bisect_left(self._arrivals, now + self.horizon, lo=self._next)
+        free = [train for train in self._trains[self._next:end] if train['train_no'] not in self._committed_at]
+        return list(self.committed.values()), free
+
+    @profiled('rolling_cycle')
+    def advance(self, now):
+        """Re-plan the window at minute ``now`` and commit the trains starting before the freeze point"""
+        started = time.perf_counter()
+        self.now = now
+        self._retire(now)
+        frozen, free = self.window(now)
+        if not free:
+            return {'now': now, 'window': len(frozen), 'committed': 0, 'best': None, 'plan': [], 'elapsed_ms': 0.0}
+
+        table = TrainTable.from_records(frozen + free)
+        scenarios = [_pinned(view, table, len(frozen)) for view in self.simulator.generate_all_scenarios(table)]
+        best_ranking = rank_scenarios(scenarios)[0]
+        best = best_ranking['scenario']
+
+        train_numbers = table['train_no'].tolist()
+        platforms = best.column('platform_no').tolist()
+        delays = best.column('predicted_delay').tolist()
+        starts = (table.arrival_minutes + np.asarray(delays)).tolist()
+        plan = []
+        newly_committed = 0
+        for position, row in enumerate(best.order.tolist()):
+            committed = row < len(frozen)
+            if not committed and starts[row] < now + self.freeze:
+                train = dict(table.records()[row], platform_no=platforms[row], predicted_delay=delays[row], committed=True)
+                self.committed[train_numbers[row]] = train
+                self._committed_at[train_numbers[row]] = now
+                committed = True
+                newly_committed += 1
+            plan.append({
+                'train_no': train_numbers[row],
+                'order': position + 1,
+                'platform': platforms[row],
+                'predicted_delay': delays[row],
+                'start_minute': starts[row],
+                'committed': committed
+            })
+
+        count('rolling_cycles')
+        count('rolling_trains_committed', newly_committed)
+        result = {
+            'now': now,
+            'window': len(table),
+            'committed': newly_committed,
+            'best': best.scenario_id,
+            'metrics': best_ranking['metrics'],
+            'plan': plan,
+            'elapsed_ms': (time.perf_counter() - started) * 1000
+        }
+        logger.info(
+            f"Rolling cycle at minute {now}: {len(table)} trains in window, "
+            f"{newly_committed} committed, best {best.scenario_id} in {result['elapsed_ms']:.1f}ms"
+        )
+        return result
+
+    def run(self, start=0, end=1440, step=15):
+        """Advance through ``[start, end)`` every ``step`` minutes, yielding each cycle's result"""
+        if step > self.freeze:
+            raise ValueError("A step longer than the freeze point would let trains start before they are committed")
+        for now in range(start, end, step):
+            yield self.advance(now)
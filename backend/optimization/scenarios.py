@@ -0,0 +1,176 @@
+import numpy as np
+
+
+def _freeze(values):
+    """Return a read-only numpy array for a column"""
+    column = np.asarray(values)
+    if column.dtype.kind in 'US':
+        column = column.astype(object)
+    column.flags.writeable = False
+    return column
+
+
+class TrainTable:
+    """Immutable columnar table of prepared trains shared by every scenario"""
+
+    def __init__(self, columns, fields=None):
+        self.fields = tuple(fields if fields is not None else columns.keys())
+        self._columns = {name: _freeze(columns[name]) for name in self.fields}
+        lengths = {len(column) for column in self._columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns have mismatched lengths: {sorted(lengths)}")
+        self._length = lengths.pop() if lengths else 0
+        self._records = None
+
+    @classmethod
+    def from_records(cls, train_data):
+        """Build a table from the list of train dicts produced by prepare_train_data"""
+        if isinstance(train_data, TrainTable):
+            return train_data
+        fields = []
+        for train in train_data:
+            for key in train:
+                if key not in fields:
+                    fields.append(key)
+        columns = {name: [train.get(name) for train in train_data] for name in fields}
+        return cls(columns, fields)
+
+    def __len__(self):
+        return self._length
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def __getitem__(self, name):
+        return self._columns[name]
+
+    def column(self, name):
+        """Return a read-only column by field name"""
+        return self._columns[name]
+
+    def replace(self, name, changes):
+        """New table with ``{row: value}`` applied to one field, sharing every other column"""
+        column = self._columns[name].copy()
+        column[list(changes.keys())] = list(changes.values())
+        return TrainTable(dict(self._columns, **{name: column}), self.fields)
+
+    def take(self, rows):
+        """New table holding only ``rows``, in that order"""
+        rows = np.asarray(rows, dtype=np.intp)
+        return TrainTable({name: column[rows] for name, column in self._columns.items()}, self.fields)
+
+    @property
+    def arrival_minutes(self):
+        """Scheduled arrival as minutes since midnight"""
+        return self['scheduled_arrival_hour'] * 60 + self['scheduled_arrival_minute']
+
+    @property
+    def departure_minutes(self):
+        """Scheduled departure as minutes since midnight"""
+        return self['scheduled_departure_hour'] * 60 + self['scheduled_departure_minute']
+
+    @property
+    def dwell_minutes(self):
+        """Minutes between scheduled arrival and departure, at least one"""
+        return np.maximum((self.departure_minutes - self.arrival_minutes) % 1440, 1)
+
+    def records(self):
+        """Materialize the table as a list of train dicts (cached)"""
+        if self._records is None:
+            values = [self._columns[name].tolist() for name in self.fields]
+            self._records = [dict(zip(self.fields, row)) for row in zip(*values)]
+        return self._records
+
+
+class ScenarioView:
+    """A scenario as an ordering over a shared TrainTable plus a sparse overlay of changed fields
+
+    ``order`` holds table row indices in schedule order. ``overlay`` maps a field
+    name to ``{row: value}`` for the rows the scenario changes, e.g. platform
+    reassignments or added route spacing. Train dicts are only built by
+    ``schedule()``/``to_dict()`` when a report is exported.
+    """
+
+    META_FIELDS = ('scenario_id', 'scenario_name', 'description', 'use_case')
+
+    def __init__(self, table, order, scenario_id, scenario_name, description, use_case, overlay=None):
+        self.table = table
+        self.order = np.asarray(order, dtype=np.intp)
+        self.order.flags.writeable = False
+        self.overlay = overlay or {}
+        self.scenario_id = scenario_id
+        self.scenario_name = scenario_name
+        self.description = description
+        self.use_case = use_case
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getstate__(self):
+        # Views cross process boundaries without the shared table; see attach()
+        state = self.__dict__.copy()
+        state['table'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.order.flags.writeable = False
+
+    def rebase(self, table, order=None, overlay=None):
+        """Copy of the view over another table with the same rows, optionally with a new order or overlay"""
+        return ScenarioView(
+            table, self.order if order is None else order,
+            scenario_id=self.scenario_id,
+            scenario_name=self.scenario_name,
+            description=self.description,
+            use_case=self.use_case,
+            overlay=self.overlay if overlay is None else overlay
+        )
+
+    def attach(self, table):
+        """Re-attach the shared table after the view was unpickled"""
+        self.table = table
+        return self
+
+    def __getitem__(self, key):
+        if key == 'schedule':
+            return self.schedule()
+        if key in self.META_FIELDS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def column(self, name):
+        """Return a field indexed by table row with this scenario's overlay applied"""
+        changes = self.overlay.get(name)
+        if not changes:
+            return self.table[name]
+        column = self.table[name].copy()
+        column[list(changes.keys())] = list(changes.values())
+        return column
+
+    def ordered(self, name):
+        """Return a field in schedule order with this scenario's overlay applied"""
+        return self.column(name)[self.order]
+
+    def schedule(self):
+        """Materialize the schedule as a list of train dicts with their 'order'"""
+        records = self.table.records()
+        schedule = []
+        for position, row in enumerate(self.order.tolist()):
+            train = dict(records[row])
+            for name, changes in self.overlay.items():
+                if row in changes:
+                    train[name] = changes[row]
+            train['order'] = position + 1
+            schedule.append(train)
+        return schedule
+
+    def to_dict(self):
+        """Export the scenario in the dict shape used by control station reports"""
+        return {
+            'scenario_id': self.scenario_id,
+            'scenario_name': self.scenario_name,
+            'description': self.description,
+            'schedule': self.schedule(),
+            'use_case': self.use_case
+        }
@@ -1,354 +1,485 @@
+import gc
 import os
 import sys
-import json
-import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime
 import logging
-from itertools import permutations
-import copy
 from collections import defaultdict
 import random
+import numpy as np
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'ml')))
-from use_model import RailwayDelayPredictor
+# For callers passing rank_scenarios a simulator.StationSimulator; not imported here
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'simulation')))
+from delay_predictor import delay_features, predict_delays, CachedDelayPredictor
+from lazy import lazy_import, load_all
+from scenarios import TrainTable, ScenarioView
+from scoring import score_scenarios, scenario_matrices, metrics_at
+from solver import DEFAULT_PLATFORMS, solve_schedule
+from local_search import improve_schedules
+from session import PlanningSession
+from robustness import add_robustness, model_residuals
+from report import write_report
+from result_cache import RankingCache, ranking_key
+from occupancy import PlatformOccupancy, schedule_conflicts
+from profiling import profiler, profiled, stage, count
+from parallel import ScenarioExecutor, chunk_evenly
+from timetable import MISSING_ARRIVAL, MISSING_DEPARTURE, parse_time, load_data, load_timetable, timetable_minutes
+
+pd = lazy_import('pandas')
+
+__all__ = [
+    'ControlStationSimulator', 'calculate_scenario_performance', 'calculate_overall_score', 'rank_scenarios',
+    'export_rankings', 'prepare_train_data', 'warmup',
+    # Defined here before they moved to timetable.py
+    'load_data', 'parse_time',
+]
 
 class ControlStationSimulator:
-    def __init__(self):
+    def __init__(self, solver_time_limit=5.0, prediction_cache_size=4096, prediction_cache_path=None, workers=1,
+                 local_search_budget=2.0, platforms=DEFAULT_PLATFORMS, seed=0):
         self.predictor = None
+        self.platforms = tuple(platforms)
+        # Seeds every stochastic scenario builder, the solver and local search, so the
+        # same trains always give the same rankings; None trades that for wall-clock budgets
+        self.seed = seed
+        self.solver_time_limit = solver_time_limit
+        self.local_search_budget = local_search_budget
+        self.workers = workers
+        self.prediction_cache_size = prediction_cache_size
+        self.prediction_cache_path = prediction_cache_path
         
     def load_predictor(self, model_path):
-        """Load the ML predictor model"""
-        self.predictor = RailwayDelayPredictor()
+        """Load the ML predictor model
+
+        A ``.npz`` path is a DelayModel trained by backend/ml/delay_model.py;
+        anything else is the pickled model use_model.RailwayDelayPredictor
+        loads. The predictor is wrapped in a CachedDelayPredictor that is kept
+        across reloads, so replanning reuses earlier predictions until the
+        model file itself changes.
+        """
+        if self.predictor is None:
+            # The trained model's code is only needed once a model is loaded
+            if model_path.endswith('.npz'):
+                from delay_model import DelayModel as model_class
+            else:
+                from use_model import RailwayDelayPredictor as model_class
+            self.predictor = CachedDelayPredictor(
+                model_class(),
+                maxsize=self.prediction_cache_size,
+                cache_path=self.prediction_cache_path
+            )
         self.predictor.load_model(model_path)
         
+    @profiled('generate')
     def generate_all_scenarios(self, train_data):
-        """Generate all possible scheduling scenarios for control station"""
+        """Generate all possible scheduling scenarios for control station
+
+        Scenarios are ScenarioView objects sharing one TrainTable; call
+        ``to_dict()`` on a scenario to get the exported dict shape. With
+        ``workers`` > 1 the builders run in a process pool; the output order
+        is the same as the serial one.
+        """
         logger.info("Generating all possible scheduling scenarios...")
         
+        table = TrainTable.from_records(train_data)
+        if self.workers > 1:
+            return self._generate_in_pool(table)
+        
         scenarios = []
         
         # Scenario 1: Default Schedule (Original Timetable Order)
-        scenarios.append(self._create_default_schedule(train_data))
+        scenarios.append(self._create_default_schedule(table))
         
         # Scenario 2: ML Optimized Schedule
-        scenarios.append(self._create_optimized_schedule(train_data))
+        scenarios.append(self._create_optimized_schedule(table))
         
         # Scenario 3: Priority-Based Schedules
-        scenarios.extend(self._create_priority_schedules(train_data))
+        scenarios.extend(self._create_priority_schedules(table))
         
         # Scenario 4: Delay-Based Schedules
-        scenarios.extend(self._create_delay_schedules(train_data))
+        scenarios.extend(self._create_delay_schedules(table))
         
         # Scenario 5: Platform-Based Schedules
-        scenarios.extend(self._create_platform_schedules(train_data))
+        scenarios.extend(self._create_platform_schedules(table))
         
         # Scenario 6: Custom Order Scenarios (What-if specific train goes first)
-        scenarios.extend(self._create_custom_order_scenarios(train_data))
+        scenarios.extend(self._create_custom_order_scenarios(table))
         
         # Scenario 7: Alternative Routing Scenarios
-        scenarios.extend(self._create_alternative_routing_scenarios(train_data))
+        scenarios.extend(self._create_alternative_routing_scenarios(table))
+        
+        # Scenario 8: Solver Optimized Schedule (order and platforms jointly)
+        if self.solver_time_limit:
+            scenarios.append(self._create_solver_schedule(table))
         
         logger.info(f"Generated {len(scenarios)} total scenarios for control station")
+        count('scenarios_generated', len(scenarios))
         return scenarios
     
-    def _create_default_schedule(self, train_data):
-        """Original timetable order"""
-        schedule = copy.deepcopy(train_data)
-        schedule.sort(key=lambda x: x['scheduled_arrival_hour'] * 60 + x['scheduled_arrival_minute'])
-        
-        for i, train in enumerate(schedule):
-            train['order'] = i + 1
-            
+    def scenario_config(self):
+        """Settings that decide which scenarios are generated and how they rank"""
         return {
-            'scenario_id': 'DEFAULT',
-            'scenario_name': 'Default Timetable Order',
-            'description': 'Original scheduled order based on arrival times',
-            'schedule': schedule,
-            'use_case': 'Normal operations, no disruptions'
+            'platforms': list(self.platforms),
+            'solver_time_limit': self.solver_time_limit,
+            'local_search_budget': self.local_search_budget,
+            'seed': self.seed
         }
     
-    def _create_optimized_schedule(self, train_data):
+    def rank_all(self, train_data, cache=None):
+        """Generate, rank and refine every scenario for the trains
+
+        With a RankingCache, the rankings are looked up by a hash of the
+        prepared trains, scenario_config() and the model version, and only
+        computed on a miss.
+        """
+        def compute():
+            scenarios = self.generate_all_scenarios(train_data)
+            scenario_rankings = rank_scenarios(scenarios)
+            # Refine the best scenarios with local search and rank them alongside the rest
+            if self.local_search_budget:
+                improved = improve_schedules(
+                    scenario_rankings, time_budget=self.local_search_budget, platforms=self.platforms, seed=self.seed
+                )
+                if improved:
+                    scenarios.extend(improved)
+                    scenario_rankings = rank_scenarios(scenarios)
+            return scenario_rankings
+        
+        if cache is None:
+            return compute()
+        key = ranking_key(train_data, self.scenario_config(), getattr(self.predictor, 'model_version', None))
+        return cache.get_or_compute(key, compute)
+    
+    def start_session(self, train_data):
+        """Build every scenario into a PlanningSession that replans one event at a time"""
+        return PlanningSession(self, train_data)
+    
+    def _generate_in_pool(self, table):
+        """generate_all_scenarios with independent builders spread over a process pool"""
+        tasks = [
+            ('_create_default_schedule', ()),
+            ('_create_optimized_schedule', ()),
+            ('_create_priority_schedules', ()),
+            ('_create_delay_schedules', ()),
+            ('_create_platform_schedules', ()),
+        ]
+        # One "goes first" task per worker-sized slice of trains
+        for rows in chunk_evenly(range(len(table)), self.workers):
+            tasks.append(('_create_custom_order_scenarios', (rows,)))
+        tasks.append(('_create_alternative_routing_scenarios', ()))
+        if self.solver_time_limit:
+            tasks.append(('_create_solver_schedule', ()))
+        
+        with ScenarioExecutor(table, self, self.workers) as executor:
+            scenarios = executor.build(tasks)
+        
+        logger.info(f"Generated {len(scenarios)} total scenarios for control station using {self.workers} workers")
+        count('scenarios_generated', len(scenarios))
+        return scenarios
+    
+    def _create_default_schedule(self, table):
+        """Original timetable order"""
+        order = np.argsort(table.arrival_minutes, kind='stable')
+        
+        return ScenarioView(
+            table, order,
+            scenario_id='DEFAULT',
+            scenario_name='Default Timetable Order',
+            description='Original scheduled order based on arrival times',
+            use_case='Normal operations, no disruptions'
+        )
+    
+    def _create_optimized_schedule(self, table):
         """ML-optimized schedule"""
-        schedule = copy.deepcopy(train_data)
-        schedule.sort(key=lambda x: (
-            x['priority'],
-            x['predicted_delay'], 
-            -x['distance'],
-            x['scheduled_arrival_hour'] * 60 + x['scheduled_arrival_minute']
+        # np.lexsort sorts by the last key first
+        order = np.lexsort((
+            table.arrival_minutes,
+            -table['distance'],
+            table['predicted_delay'],
+            table['priority']
         ))
         
-        for i, train in enumerate(schedule):
-            train['order'] = i + 1
-            
-        return {
-            'scenario_id': 'ML_OPTIMIZED',
-            'scenario_name': 'ML Optimized Schedule',
-            'description': 'AI-optimized based on priority, delay prediction, and distance',
-            'schedule': schedule,
-            'use_case': 'Optimal performance under normal conditions'
-        }
+        return ScenarioView(
+            table, order,
+            scenario_id='ML_OPTIMIZED',
+            scenario_name='ML Optimized Schedule',
+            description='AI-optimized based on priority, delay prediction, and distance',
+            use_case='Optimal performance under normal conditions'
+        )
     
-    def _create_priority_schedules(self, train_data):
+    def _create_priority_schedules(self, table):
         """Different priority-based scenarios"""
         scenarios = []
+        priority = table['priority']
+        delay = table['predicted_delay']
         
-        # Express trains first
-        schedule1 = copy.deepcopy(train_data)
-        express_trains = [t for t in schedule1 if t['priority'] == 1]
-        other_trains = [t for t in schedule1 if t['priority'] != 1]
-        combined = express_trains + sorted(other_trains, key=lambda x: x['predicted_delay'])
+        def first_then_by_delay(first_priority):
+            first = np.flatnonzero(priority == first_priority)
+            others = np.flatnonzero(priority != first_priority)
+            others = others[np.argsort(delay[others], kind='stable')]
+            return np.concatenate([first, others])
         
-        for i, train in enumerate(combined):
-            train['order'] = i + 1
-            
-        scenarios.append({
-            'scenario_id': 'EXPRESS_FIRST',
-            'scenario_name': 'Express Trains Priority',
-            'description': 'All express trains scheduled first, then others by delay',
-            'schedule': combined,
-            'use_case': 'When express train punctuality is critical'
-        })
+        # Express trains first
+        scenarios.append(ScenarioView(
+            table, first_then_by_delay(1),
+            scenario_id='EXPRESS_FIRST',
+            scenario_name='Express Trains Priority',
+            description='All express trains scheduled first, then others by delay',
+            use_case='When express train punctuality is critical'
+        ))
         
         # Local trains first
-        schedule2 = copy.deepcopy(train_data)
-        local_trains = [t for t in schedule2 if t['priority'] == 3]
-        other_trains = [t for t in schedule2 if t['priority'] != 3]
-        combined = local_trains + sorted(other_trains, key=lambda x: x['predicted_delay'])
-        
-        for i, train in enumerate(combined):
-            train['order'] = i + 1
-            
-        scenarios.append({
-            'scenario_id': 'LOCAL_FIRST',
-            'scenario_name': 'Local Trains Priority',
-            'description': 'Local trains scheduled first to clear local traffic',
-            'schedule': combined,
-            'use_case': 'During peak hours to manage local commuter traffic'
-        })
+        scenarios.append(ScenarioView(
+            table, first_then_by_delay(3),
+            scenario_id='LOCAL_FIRST',
+            scenario_name='Local Trains Priority',
+            description='Local trains scheduled first to clear local traffic',
+            use_case='During peak hours to manage local commuter traffic'
+        ))
         
         return scenarios
     
-    def _create_delay_schedules(self, train_data):
+    def _create_delay_schedules(self, table):
         """Delay-based scheduling scenarios"""
         scenarios = []
+        delay = table['predicted_delay']
         
         # Minimum delay first
-        schedule1 = copy.deepcopy(train_data)
-        schedule1.sort(key=lambda x: x['predicted_delay'])
-        for i, train in enumerate(schedule1):
-            train['order'] = i + 1
-            
-        scenarios.append({
-            'scenario_id': 'MIN_DELAY_FIRST',
-            'scenario_name': 'Minimum Delay First',
-            'description': 'Trains with lowest predicted delays scheduled first',
-            'schedule': schedule1,
-            'use_case': 'When overall punctuality is the main concern'
-        })
+        scenarios.append(ScenarioView(
+            table, np.argsort(delay, kind='stable'),
+            scenario_id='MIN_DELAY_FIRST',
+            scenario_name='Minimum Delay First',
+            description='Trains with lowest predicted delays scheduled first',
+            use_case='When overall punctuality is the main concern'
+        ))
         
         # Maximum delay first
-        schedule2 = copy.deepcopy(train_data)
-        schedule2.sort(key=lambda x: -x['predicted_delay'])
-        for i, train in enumerate(schedule2):
-            train['order'] = i + 1
-            
-        scenarios.append({
-            'scenario_id': 'MAX_DELAY_FIRST',
-            'scenario_name': 'Maximum Delay First',
-            'description': 'Trains with highest delays scheduled first to clear backlog',
-            'schedule': schedule2,
-            'use_case': 'When clearing delayed trains is priority'
-        })
+        scenarios.append(ScenarioView(
+            table, np.argsort(-delay, kind='stable'),
+            scenario_id='MAX_DELAY_FIRST',
+            scenario_name='Maximum Delay First',
+            description='Trains with highest delays scheduled first to clear backlog',
+            use_case='When clearing delayed trains is priority'
+        ))
         
         return scenarios
     
-    def _create_platform_schedules(self, train_data):
+    def _create_platform_schedules(self, table):
         """Platform-based scheduling scenarios"""
         scenarios = []
+        platforms = table['platform_no']
+        delay = table['predicted_delay']
         
         # Group by platform
-        schedule1 = copy.deepcopy(train_data)
-        schedule1.sort(key=lambda x: (x['platform_no'], x['predicted_delay']))
-        for i, train in enumerate(schedule1):
-            train['order'] = i + 1
-            
-        scenarios.append({
-            'scenario_id': 'PLATFORM_GROUPED',
-            'scenario_name': 'Platform Grouped Schedule',
-            'description': 'Trains grouped by platform to minimize conflicts',
-            'schedule': schedule1,
-            'use_case': 'When platform conflicts are causing major delays'
-        })
+        scenarios.append(ScenarioView(
+            table, np.lexsort((delay, platforms)),
+            scenario_id='PLATFORM_GROUPED',
+            scenario_name='Platform Grouped Schedule',
+            description='Trains grouped by platform to minimize conflicts',
+            use_case='When platform conflicts are causing major delays'
+        ))
         
         # Platform load balancing
-        schedule2 = copy.deepcopy(train_data)
         platform_counts = defaultdict(int)
-        for train in schedule2:
-            platform_counts[train['platform_no']] += 1
+        for platform in platforms.tolist():
+            platform_counts[platform] += 1
         
         # Distribute trains more evenly across platforms
-        available_platforms = list(range(1, 7))  # Platforms 1-6
-        for train in schedule2:
-            current_platform = train['platform_no']
+        available_platforms = list(self.platforms)
+        original_platform, new_platform, platform_changed = {}, {}, {}
+        for row, current_platform in enumerate(platforms.tolist()):
             # Find less crowded platform
             min_platform = min(available_platforms, key=lambda p: platform_counts.get(p, 0))
             if platform_counts[min_platform] < platform_counts[current_platform] - 1:
-                train['original_platform'] = current_platform
-                train['platform_no'] = min_platform
-                train['platform_changed'] = True
+                original_platform[row] = current_platform
+                new_platform[row] = min_platform
+                platform_changed[row] = True
                 platform_counts[current_platform] -= 1
                 platform_counts[min_platform] += 1
         
-        schedule2.sort(key=lambda x: x['predicted_delay'])
-        for i, train in enumerate(schedule2):
-            train['order'] = i + 1
-            
-        scenarios.append({
-            'scenario_id': 'PLATFORM_BALANCED',
-            'scenario_name': 'Platform Load Balanced',
-            'description': 'Trains redistributed across platforms for load balancing',
-            'schedule': schedule2,
-            'use_case': 'When certain platforms are overcrowded'
-        })
+        scenarios.append(ScenarioView(
+            table, np.argsort(delay, kind='stable'),
+            scenario_id='PLATFORM_BALANCED',
+            scenario_name='Platform Load Balanced',
+            description='Trains redistributed across platforms for load balancing',
+            use_case='When certain platforms are overcrowded',
+            overlay={
+                'original_platform': original_platform,
+                'platform_no': new_platform,
+                'platform_changed': platform_changed
+            }
+        ))
         
         return scenarios
     
-    def _create_custom_order_scenarios(self, train_data):
-        """Custom order scenarios - what if specific train goes first"""
+    def _create_custom_order_scenarios(self, table, rows=None):
+        """Custom order scenarios - what if specific train goes first
+
+        ``rows`` limits the scenarios to those table rows going first.
+        """
         scenarios = []
         
+        # Remaining trains are sorted by delay; a stable sort of all trains with
+        # the target removed gives the same order, so sort once and reuse it
+        by_delay = np.argsort(table['predicted_delay'], kind='stable')
+        
+        train_numbers = table['train_no'].tolist()
+        train_names = table['train_name'].tolist()
+        
         # What if each train goes first
-        for target_train in train_data:
-            schedule = copy.deepcopy(train_data)
+        for row in (range(len(table)) if rows is None else rows):
+            train_no, train_name = train_numbers[row], train_names[row]
+            order = np.concatenate([[row], by_delay[by_delay != row]])
             
-            # Move target train to first position
-            target_train_copy = None
-            remaining_trains = []
-            
-            for train in schedule:
-                if train['train_no'] == target_train['train_no']:
-                    target_train_copy = train
-                else:
-                    remaining_trains.append(train)
-            
-            # Sort remaining trains by delay
-            remaining_trains.sort(key=lambda x: x['predicted_delay'])
-            
-            # Combine: target train first, then others
-            final_schedule = [target_train_copy] + remaining_trains
-            
-            for i, train in enumerate(final_schedule):
-                train['order'] = i + 1
-                if i == 0:
-                    train['forced_first'] = True
-            
-            scenarios.append({
-                'scenario_id': f'TRAIN_{target_train["train_no"]}_FIRST',
-                'scenario_name': f'Train {target_train["train_no"]} Goes First',
-                'description': f'What if Train {target_train["train_no"]} ({target_train["train_name"]}) is prioritized first',
-                'schedule': final_schedule,
-                'use_case': f'Emergency priority for Train {target_train["train_no"]} or specific operational needs'
-            })
+            scenarios.append(ScenarioView(
+                table, order,
+                scenario_id=f'TRAIN_{train_no}_FIRST',
+                scenario_name=f'Train {train_no} Goes First',
+                description=f'What if Train {train_no} ({train_name}) is prioritized first',
+                use_case=f'Emergency priority for Train {train_no} or specific operational needs',
+                overlay={'forced_first': {row: True}}
+            ))
         
         return scenarios
     
-    def _create_alternative_routing_scenarios(self, train_data):
+    def _create_alternative_routing_scenarios(self, table):
         """Alternative routing scenarios"""
         scenarios = []
+        delay = table['predicted_delay']
         
         # Same track conflict resolution
-        schedule1 = copy.deepcopy(train_data)
-        
         # Identify trains that might use same track (same route)
         route_groups = defaultdict(list)
-        for train in schedule1:
-            route_key = f"{train['source']}-{train['destination']}"
-            route_groups[route_key].append(train)
+        for row, (source, destination) in enumerate(zip(table['source'].tolist(), table['destination'].tolist())):
+            route_key = f"{source}-{destination}"
+            route_groups[route_key].append(row)
         
         # For routes with multiple trains, spread them out
-        for route, trains in route_groups.items():
-            if len(trains) > 1:
+        time_spacing_added, spaced_delay, route_spacing_applied = {}, {}, {}
+        for route, rows in route_groups.items():
+            if len(rows) > 1:
                 # Sort by predicted delay
-                trains.sort(key=lambda x: x['predicted_delay'])
+                rows.sort(key=lambda row: delay[row])
                 
                 # Add time spacing between trains on same route
-                for i, train in enumerate(trains):
+                for i, row in enumerate(rows):
                     if i > 0:
-                        train['time_spacing_added'] = i * 10  # 10 min spacing
-                        train['predicted_delay'] += train['time_spacing_added']
-                        train['route_spacing_applied'] = True
-        
-        schedule1.sort(key=lambda x: x['predicted_delay'])
-        for i, train in enumerate(schedule1):
-            train['order'] = i + 1
-            
-        scenarios.append({
-            'scenario_id': 'ROUTE_SPACED',
-            'scenario_name': 'Same Route Trains Spaced',
-            'description': 'Trains on same routes spaced out to avoid track conflicts',
-            'schedule': schedule1,
-            'use_case': 'When same-route trains are causing track congestion'
-        })
+                        time_spacing_added[row] = i * 10  # 10 min spacing
+                        spaced_delay[row] = float(delay[row]) + time_spacing_added[row]
+                        route_spacing_applied[row] = True
+        
+        spaced_delays = delay.copy()
+        spaced_delays[list(spaced_delay)] = list(spaced_delay.values())
+        scenarios.append(ScenarioView(
+            table, np.argsort(spaced_delays, kind='stable'),
+            scenario_id='ROUTE_SPACED',
+            scenario_name='Same Route Trains Spaced',
+            description='Trains on same routes spaced out to avoid track conflicts',
+            use_case='When same-route trains are causing track congestion',
+            overlay={
+                'time_spacing_added': time_spacing_added,
+                'predicted_delay': spaced_delay,
+                'route_spacing_applied': route_spacing_applied
+            }
+        ))
         
         # Alternative platform assignment
-        schedule2 = copy.deepcopy(train_data)
-        for train in schedule2:
+        rng = random.Random(self.seed)
+        alternative_platform, original_platform, platform_reassigned = {}, {}, {}
+        for row, platform in enumerate(table['platform_no'].tolist()):
             # Simulate alternative platform assignment
-            original_platform = train['platform_no']
-            alternative_platforms = [p for p in range(1, 7) if p != original_platform]
+            alternative_platforms = [p for p in self.platforms if p != platform]
             if alternative_platforms:
-                train['alternative_platform'] = random.choice(alternative_platforms)
-                train['platform_no'] = train['alternative_platform']
-                train['original_platform'] = original_platform
-                train['platform_reassigned'] = True
-        
-        schedule2.sort(key=lambda x: (x['platform_no'], x['predicted_delay']))
-        for i, train in enumerate(schedule2):
-            train['order'] = i + 1
-            
-        scenarios.append({
-            'scenario_id': 'ALTERNATIVE_PLATFORMS',
-            'scenario_name': 'Alternative Platform Assignment',
-            'description': 'Trains reassigned to alternative platforms',
-            'schedule': schedule2,
-            'use_case': 'When original platforms have maintenance or issues'
-        })
+                alternative_platform[row] = rng.choice(alternative_platforms)
+                original_platform[row] = platform
+                platform_reassigned[row] = True
+        
+        reassigned_platforms = table['platform_no'].copy()
+        reassigned_platforms[list(alternative_platform)] = list(alternative_platform.values())
+        scenarios.append(ScenarioView(
+            table, np.lexsort((delay, reassigned_platforms)),
+            scenario_id='ALTERNATIVE_PLATFORMS',
+            scenario_name='Alternative Platform Assignment',
+            description='Trains reassigned to alternative platforms',
+            use_case='When original platforms have maintenance or issues',
+            overlay={
+                'alternative_platform': alternative_platform,
+                'platform_no': alternative_platform,
+                'original_platform': original_platform,
+                'platform_reassigned': platform_reassigned
+            }
+        ))
         
         return scenarios
+    
+    @profiled('solve')
+    def _create_solver_schedule(self, table):
+        """CP-SAT schedule minimizing weighted delay under platform occupancy constraints"""
+        result = solve_schedule(table, platforms=self.platforms, time_limit=self.solver_time_limit, seed=self.seed)
+        
+        original_platform, new_platform, platform_changed = {}, {}, {}
+        for row, (current, assigned) in enumerate(zip(table['platform_no'].tolist(), result.platforms.tolist())):
+            if assigned != current:
+                original_platform[row] = current
+                new_platform[row] = assigned
+                platform_changed[row] = True
+        
+        hold_minutes, held_delay = {}, {}
+        for row, (delay, hold) in enumerate(zip(table['predicted_delay'].tolist(), result.holds.tolist())):
+            if hold > 0:
+                hold_minutes[row] = hold
+                held_delay[row] = delay + hold
+        
+        return ScenarioView(
+            table, result.order,
+            scenario_id='SOLVER_OPTIMIZED',
+            scenario_name='Solver Optimized Schedule',
+            description=f'Order and platforms assigned jointly to minimize weighted delay without platform overlaps ({result.status})',
+            use_case='When platform occupancy conflicts must be resolved exactly',
+            overlay={
+                'original_platform': original_platform,
+                'platform_no': new_platform,
+                'platform_changed': platform_changed,
+                'hold_minutes': hold_minutes,
+                'predicted_delay': held_delay
+            }
+        )
 
 def calculate_scenario_performance(schedule):
-    """Calculate comprehensive performance metrics for each scenario"""
+    """Calculate comprehensive performance metrics for each scenario
+
+    ``schedule`` is either a list of train dicts or a ScenarioView.
+    """
+    if isinstance(schedule, ScenarioView):
+        delays = schedule.ordered('predicted_delay').tolist()
+        conflicts = PlatformOccupancy.for_table(schedule.table).conflicts_for_view(schedule)
+        express_positions = (np.flatnonzero(schedule.ordered('priority') == 1) + 1).tolist()
+    else:
+        delays = [train['predicted_delay'] for train in schedule]
+        conflicts = schedule_conflicts(schedule)
+        express_positions = [train['order'] for train in schedule if train['priority'] == 1]
+    
     metrics = {
-        'total_trains': len(schedule),
-        'total_delay': sum(train['predicted_delay'] for train in schedule),
-        'avg_delay': sum(train['predicted_delay'] for train in schedule) / len(schedule),
-        'max_delay': max(train['predicted_delay'] for train in schedule),
-        'min_delay': min(train['predicted_delay'] for train in schedule),
+        'total_trains': len(delays),
+        'total_delay': sum(delays),
+        'avg_delay': sum(delays) / len(delays),
+        'max_delay': max(delays),
+        'min_delay': min(delays),
         'platform_conflicts': 0,
         'express_trains_avg_position': 0,
         'passenger_satisfaction_score': 0,
         'efficiency_score': 0
     }
     
-    # Platform conflict analysis
-    platform_usage = defaultdict(list)
-    for train in schedule:
-        platform_usage[train['platform_no']].append(train)
-    
-    conflicts = 0
-    for platform, trains in platform_usage.items():
-        if len(trains) > 1:
-            conflicts += len(trains) - 1  # Each additional train on same platform is a potential conflict
-    
+    # Platform conflict analysis: pairs of trains whose platform occupancy overlaps
     metrics['platform_conflicts'] = conflicts
     
     # Express train positioning
-    express_trains = [t for t in schedule if t['priority'] == 1]
-    if express_trains:
-        avg_pos = sum(t['order'] for t in express_trains) / len(express_trains)
+    if express_positions:
+        avg_pos = sum(express_positions) / len(express_positions)
         metrics['express_trains_avg_position'] = avg_pos
     
     # Passenger satisfaction (higher is better)
@@ -361,21 +492,50 @@ def calculate_scenario_performance(schedule):
     
     return metrics
 
-def rank_scenarios(scenarios):
-    """Rank scenarios by overall performance"""
-    scenario_rankings = []
+def calculate_overall_score(metrics):
+    """Weighted overall score used to rank scenarios"""
+    return (
+        metrics['passenger_satisfaction_score'] * 0.4 +
+        metrics['efficiency_score'] * 0.3 +
+        (100 - min(50, metrics['platform_conflicts'] * 10)) * 0.2 +
+        (100 - min(50, metrics['express_trains_avg_position'] * 5)) * 0.1
+    )
+
+@profiled('rank')
+def rank_scenarios(scenarios, workers=1, station=None):
+    """Rank scenarios by overall performance
+
+    ScenarioViews sharing a train table are scored together in one vectorized
+    pass, split across a process pool when ``workers`` > 1; dict scenarios
+    fall back to calculate_scenario_performance. With a StationSimulator as
+    ``station``, views are scored on the mean realized delays of its batch
+    replay, knock-on waits included, instead of the predicted delays.
+    """
+    scored = [None] * len(scenarios)
     
-    for scenario in scenarios:
-        metrics = calculate_scenario_performance(scenario['schedule'])
-        
-        # Calculate overall score
-        overall_score = (
-            metrics['passenger_satisfaction_score'] * 0.4 +
-            metrics['efficiency_score'] * 0.3 +
-            (100 - min(50, metrics['platform_conflicts'] * 10)) * 0.2 +
-            (100 - min(50, metrics['express_trains_avg_position'] * 5)) * 0.1
-        )
-        
+    batches = defaultdict(list)
+    for i, scenario in enumerate(scenarios):
+        if isinstance(scenario, ScenarioView):
+            batches[id(scenario.table)].append(i)
+        else:
+            metrics = calculate_scenario_performance(scenario['schedule'])
+            scored[i] = (metrics, calculate_overall_score(metrics))
+    
+    for indices in batches.values():
+        views = [scenarios[i] for i in indices]
+        if station is not None:
+            orders, _, priorities, conflicts = scenario_matrices(views)
+            scores = score_scenarios(orders, station.batch(views)['realized_delay'], priorities, conflicts)
+        elif workers > 1 and len(views) > 1:
+            with ScenarioExecutor(views[0].table, workers=workers) as executor:
+                scores = executor.score(views)
+        else:
+            scores = score_scenarios(*scenario_matrices(views))
+        for j, i in enumerate(indices):
+            scored[i] = (metrics_at(scores, j), scores['overall_score'][j].item())
+    
+    scenario_rankings = []
+    for scenario, (metrics, overall_score) in zip(scenarios, scored):
         scenario_rankings.append({
             'scenario': scenario,
             'metrics': metrics,
@@ -383,6 +543,8 @@ def rank_scenarios(scenarios):
             'rank': 0  # Will be assigned after sorting
         })
     
+    count('scenarios_ranked', len(scenario_rankings))
+    
     # Sort by overall score (descending)
     scenario_rankings.sort(key=lambda x: x['overall_score'], reverse=True)
     
@@ -392,105 +554,111 @@ def rank_scenarios(scenarios):
     
     return scenario_rankings
 
-# [Keep your existing functions: load_data, parse_time, prepare_train_data]
+def export_rankings(scenario_rankings):
+    """Convert rankings over ScenarioViews into the dict shape written to reports"""
+    exported = []
+    for ranking in scenario_rankings:
+        scenario = ranking['scenario']
+        if isinstance(scenario, ScenarioView):
+            ranking = dict(ranking, scenario=scenario.to_dict())
+        exported.append(ranking)
+    return exported
 
-def load_data(dataset_path, num_trains=8):
-    """Load dataset and extract subset of trains"""
-    df = pd.read_csv(dataset_path)
-    logger.info(f"Total rows in dataset: {len(df)}")
+@profiled('prepare')
+def prepare_train_data(df, predictor):
+    """Prepare train data with predicted delays for optimization
+
+    Builds one feature frame from the first row of each train and predicts
+    every delay with a single batch call where the predictor supports it.
+    """
+    first = df.groupby('Train No').first()
+    train_numbers = first.index.tolist()
     
-    unique_trains = df['Train No'].unique()[:num_trains]
-    subset_df = df[df['Train No'].isin(unique_trains)].copy()
+    if 'Arrival Minute' in first.columns:
+        # Times already normalized by the timetable cache
+        arrival_minutes = first['Arrival Minute'].to_numpy(dtype=np.int64)
+        departure_minutes = first['Departure Minute'].to_numpy(dtype=np.int64)
+        time_invalid = (arrival_minutes < 0) | (departure_minutes < 0)
+    else:
+        arrival_minutes, departure_minutes, time_invalid = timetable_minutes(first)
     
-    logger.info(f"Selected {len(subset_df)} rows for {len(unique_trains)} trains")
-    return subset_df
-
-def parse_time(time_str):
-    """Parse time in either 'HH:MM', 'HHMM', or 'H:MM' format"""
-    time_str = str(time_str).strip()
-    
-    if ':' in time_str:
-        parts = time_str.split(':')
-        hour = int(parts[0]) if parts[0] else 0
-        minute = int(parts[1]) if len(parts) > 1 and parts[1] else 0
+    if time_invalid.any():
+        bad_trains = [train_no for train_no, invalid in zip(train_numbers, time_invalid) if invalid]
+        logger.warning(
+            f"Unparseable arrival/departure time for {len(bad_trains)} trains {bad_trains[:10]}; "
+            f"flagged time_valid=False and excluded from platform conflict checks"
+        )
+        arrival_minutes = np.where(time_invalid, MISSING_ARRIVAL, arrival_minutes)
+        departure_minutes = np.where(time_invalid, MISSING_DEPARTURE, departure_minutes)
+    
+    # The model sees clock hours; the schedule rolls overnight departures into the next day
+    features = delay_features(first, arrival_minutes, departure_minutes)
+    departure_minutes = np.where(departure_minutes < arrival_minutes, departure_minutes + 1440, departure_minutes)
+    
+    cache_before = predictor.stats() if profiler.enabled and hasattr(predictor, 'stats') else None
+    with stage('predict', trains=len(features)):
+        delays = predict_delays(predictor, features)
+    count('predictions', len(features))
+    if cache_before is not None:
+        cache_after = predictor.stats()
+        count('prediction_cache_hits', cache_after['hits'] + cache_after['disk_hits'] - cache_before['hits'] - cache_before['disk_hits'])
+        count('prediction_cache_misses', cache_after['misses'] - cache_before['misses'])
+    
+    train_types = first['Train Type'].astype(str).str.upper()
+    priorities = np.where(
+        train_types.str.contains('EXPRESS', regex=False) | train_types.str.contains('SUPERFAST', regex=False), 1,
+        np.where(train_types.str.contains('PASSENGER', regex=False) | train_types.str.contains('LOCAL', regex=False), 3, 2)
+    )
+    
+    if 'Train Name' in first.columns:
+        train_names = first['Train Name'].astype(str).tolist()
     else:
-        if len(time_str) == 3:
-            time_str = '0' + time_str
-        time_str = time_str.zfill(4)
-        hour = int(time_str[:2]) if len(time_str) >= 2 else 0
-        minute = int(time_str[2:4]) if len(time_str) >= 4 else 0
+        train_names = [f"Train {train_no}" for train_no in train_numbers]
     
-    return hour, minute
-
-def prepare_train_data(df, predictor):
-    """Prepare train data with predicted delays for optimization"""
-    train_data = []
-    grouped = df.groupby('Train No')
+    platforms = first['Platform No'].fillna(1).astype(int).tolist()
     
-    for train_no, group in grouped:
-        row = group.iloc[0]
-
-        arrival_time = str(row['Arrival time']) if pd.notna(row['Arrival time']) else '12:00'
-        departure_time = str(row['Departure Time']) if pd.notna(row['Departure Time']) else '13:00'
-        
-        try:
-            arrival_hour, arrival_minutes = parse_time(arrival_time)
-            departure_hour, departure_minutes = parse_time(departure_time)
-        except (ValueError, IndexError) as e:
-            logger.warning(f"Error parsing time for train {train_no}: {e}. Using defaults.")
-            arrival_hour, arrival_minutes = 12, 0
-            departure_hour, departure_minutes = 13, 0
-
-        input_data = {
-            'Arrival_Hour': arrival_hour,
-            'Departure_Hour': departure_hour,
-            'Distance': float(row['Distance']) if pd.notna(row['Distance']) else 50.0,
-            'Source Station': str(row['Source Station']),
-            'Source Station Name': str(row['Source Station Name']),
-            'Destination Station': str(row['Destination Station']),
-            'Destination Station Name': str(row['Destination Station Name']),
-            'Train Type': str(row['Train Type']),
-            'Weather': str(row['Weather']) if pd.notna(row['Weather']) else 'Clear',
-            'IsHoliday': int(row['IsHoliday']) if pd.notna(row['IsHoliday']) else 0,
-            'Congestion': str(row['Congestion']) if pd.notna(row['Congestion']) else '2',
-        }
-
-        try:
-            delay = predictor.predict_delay(input_data)
-        except Exception as e:
-            logger.error(f"Error predicting delay for train {train_no}: {e}")
-            delay = 5.0
-
-        train_type = str(row['Train Type']).upper()
-        if 'EXPRESS' in train_type or 'SUPERFAST' in train_type:
-            priority = 1
-        elif 'PASSENGER' in train_type or 'LOCAL' in train_type:
-            priority = 3
-        else:
-            priority = 2
-
-        train_name = str(row['Train Name']) if 'Train Name' in row else f"Train {train_no}"
-
+    arrival_times = [divmod(minutes, 60) for minutes in arrival_minutes.tolist()]
+    departure_times = [divmod(minutes, 60) for minutes in departure_minutes.tolist()]
+    time_invalid = time_invalid.tolist()
+    
+    train_data = []
+    for i, train_no in enumerate(train_numbers):
         train_data.append({
             'train_no': train_no,
-            'train_name': train_name,
-            'train_type': train_type,
-            'scheduled_arrival_hour': arrival_hour,
-            'scheduled_arrival_minute': arrival_minutes,
-            'scheduled_departure_hour': departure_hour,
-            'scheduled_departure_minute': departure_minutes,
-            'platform_no': int(row['Platform No']) if pd.notna(row['Platform No']) else 1,
-            'priority': priority,
-            'predicted_delay': float(delay),
-            'source': str(row['Source Station Name']),
-            'destination': str(row['Destination Station Name']),
-            'distance': float(row['Distance']) if pd.notna(row['Distance']) else 50.0,
-            'weather': str(row['Weather']) if pd.notna(row['Weather']) else 'Clear'
+            'train_name': train_names[i],
+            'train_type': train_types.iat[i],
+            'scheduled_arrival_hour': arrival_times[i][0],
+            'scheduled_arrival_minute': arrival_times[i][1],
+            'scheduled_departure_hour': departure_times[i][0],
+            'scheduled_departure_minute': departure_times[i][1],
+            'platform_no': platforms[i],
+            'priority': int(priorities[i]),
+            'predicted_delay': float(delays[i]),
+            'source': features['Source Station Name'].iat[i],
+            'destination': features['Destination Station Name'].iat[i],
+            'distance': float(features['Distance'].iat[i]),
+            'weather': features['Weather'].iat[i],
+            'time_valid': not time_invalid[i]
         })
 
     logger.info(f"Prepared data for {len(train_data)} trains with predicted delays")
     return train_data
 
+def warmup(simulator=None, model_path=None):
+    """Import the lazily loaded dependencies and load the model ahead of the first request
+
+    Call it in the parent before forking workers (gunicorn --preload, the
+    scenario process pool) so every child shares the imported modules and the
+    unpickled model copy-on-write. gc.freeze() moves everything loaded so far
+    out of the collector's reach, so collections in the children do not
+    touch, and thereby copy, those pages.
+    """
+    modules = load_all()
+    if simulator is not None and model_path is not None:
+        simulator.load_predictor(model_path)
+    gc.freeze()
+    logger.info(f"Preloaded {', '.join(modules)}")
+
 def main():
     logger.info("Starting Control Station Decision Support System...")
     
@@ -509,31 +677,28 @@ def main():
         simulator.load_predictor(model_path)
         
         # Load and prepare data
-        df = load_data(dataset_path, num_trains=6)  # Using 6 trains for manageable scenarios
+        df = load_timetable(dataset_path, num_trains=6)  # Using 6 trains for manageable scenarios
         train_data = prepare_train_data(df, simulator.predictor)
+        logger.info(f"Prediction cache: {simulator.predictor.stats()}")
         
-        # Generate all possible scenarios
-        all_scenarios = simulator.generate_all_scenarios(train_data)
+        # Generate, rank and refine all possible scenarios, reusing the last run's if nothing changed
+        ranking_cache = RankingCache(cache_dir=os.path.join(output_dir, 'ranking_cache'))
+        scenario_rankings = simulator.rank_all(train_data, ranking_cache)
         
-        # Rank scenarios by performance
-        scenario_rankings = rank_scenarios(all_scenarios)
+        # Monte Carlo robustness of every scenario under perturbed delays
+        add_robustness(scenario_rankings, residuals=model_residuals(simulator.predictor))
         
         # Create control station report
-        control_station_report = {
-            "metadata": {
-                "generation_timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "total_scenarios": len(all_scenarios),
-                "total_trains": len(train_data),
-                "system": "Control Station Decision Support System"
-            },
-            "scenario_rankings": scenario_rankings,
-            "train_data": train_data
+        metadata = {
+            "generation_timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "total_scenarios": len(scenario_rankings),
+            "total_trains": len(train_data),
+            "system": "Control Station Decision Support System"
         }
         
-        # Save detailed report
-        report_path = os.path.join(output_dir, f'control_station_scenarios_{timestamp}.json')
-        with open(report_path, 'w', encoding='utf-8') as f:
-            json.dump(control_station_report, f, indent=2, ensure_ascii=False, default=str)
+        # Save detailed report: the train table once, then one line per ranked scenario
+        report_path = os.path.join(output_dir, f'control_station_scenarios_{timestamp}.jsonl')
+        write_report(report_path, scenario_rankings, metadata)
         
         # Display Control Station Dashboard
         print("\n" + "="*130)
@@ -541,7 +706,7 @@ def main():
         print("="*130)
         
         print(f"\n📊 SCENARIO ANALYSIS COMPLETE")
-        print(f"   Total Scenarios Generated: {len(all_scenarios)}")
+        print(f"   Total Scenarios Generated: {len(scenario_rankings)}")
         print(f"   Trains to Schedule: {len(train_data)}")
         print(f"   Analysis Time: {datetime.now().strftime('%H:%M:%S')}")
         
@@ -559,6 +724,9 @@ def main():
             print(f"   Description: {scenario['description']}")
             print(f"   Use Case: {scenario['use_case']}")
             print(f"   Performance: Avg Delay {metrics['avg_delay']:.1f}min | Conflicts {metrics['platform_conflicts']} | Score {score:.1f}")
+            if 'robustness' in ranking:
+                robustness = ranking['robustness']
+                print(f"   Robustness: Mean Score {robustness['mean_score']:.1f} | P90 Avg Delay {robustness['p90_delay']:.1f}min | Clash Risk {robustness['clash_probability']:.0%}")
             print("   Trains in schedule:")
             for train in scenario['schedule']:
                 train_name = train.get('train_name', 'Unknown')
@@ -586,6 +754,9 @@ def main():
         print(f"   4. MONITORING: Track performance and adjust if needed")
         
         print(f"\n📁 DETAILED SCENARIOS SAVED TO: {report_path}")
+        if profiler.enabled:
+            metrics_path, trace_path = profiler.write(output_dir, f'profile_{timestamp}')
+            print(f"📈 PROFILE SAVED TO: {metrics_path} and {trace_path}")
         print("="*130)
         
     except Exception as e:
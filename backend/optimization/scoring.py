@@ -0,0 +1,109 @@
+import numpy as np
+
+from occupancy import PlatformOccupancy
+
+METRIC_FIELDS = (
+    'total_trains',
+    'total_delay',
+    'avg_delay',
+    'max_delay',
+    'min_delay',
+    'platform_conflicts',
+    'express_trains_avg_position',
+    'passenger_satisfaction_score',
+    'efficiency_score'
+)
+
+
+def overall_scores(avg_delay, platform_conflicts, express_avg_position):
+    """Satisfaction, efficiency and overall score arrays from the three schedule terms"""
+    delay_penalty = np.minimum(100, avg_delay * 2)
+    conflict_penalty = platform_conflicts * 5
+    satisfaction = np.maximum(0, 100 - delay_penalty - conflict_penalty)
+    efficiency = np.maximum(0, 100 - avg_delay - platform_conflicts * 3)
+
+    overall_score = (
+        satisfaction * 0.4 +
+        efficiency * 0.3 +
+        (100 - np.minimum(50, platform_conflicts * 10)) * 0.2 +
+        (100 - np.minimum(50, express_avg_position * 5)) * 0.1
+    )
+    return satisfaction, efficiency, overall_score
+
+
+def score_scenarios(orders, delays, priorities, conflicts):
+    """Score a batch of schedules in one vectorized pass
+
+    ``orders`` is a (scenarios x trains) matrix of table row indices in schedule
+    order. ``delays`` and ``priorities`` are indexed by table row, either per
+    scenario (scenarios x trains) or shared (trains,). ``conflicts`` holds each
+    scenario's count of overlapping platform occupancies. Returns a dict of
+    per-scenario metric arrays plus ``overall_score``, computed with the same
+    operations as calculate_scenario_performance so the results match exactly.
+    """
+    orders = np.atleast_2d(np.asarray(orders, dtype=np.intp))
+    num_scenarios, num_trains = orders.shape
+    delays = np.broadcast_to(np.asarray(delays, dtype=float), orders.shape)
+    priorities = np.broadcast_to(np.asarray(priorities), orders.shape)
+
+    ordered_delays = np.take_along_axis(delays, orders, axis=1)
+    ordered_priorities = np.take_along_axis(priorities, orders, axis=1)
+
+    # cumsum accumulates left to right, matching Python's sum() over the schedule
+    total_delay = np.cumsum(ordered_delays, axis=1)[:, -1]
+    avg_delay = total_delay / num_trains
+
+    platform_conflicts = np.broadcast_to(np.asarray(conflicts, dtype=np.int64), (num_scenarios,))
+
+    express = ordered_priorities == 1
+    express_count = np.count_nonzero(express, axis=1)
+    position_sum = (express * np.arange(1, num_trains + 1)).sum(axis=1)
+    express_avg_position = np.divide(
+        position_sum, express_count,
+        out=np.zeros(num_scenarios), where=express_count > 0
+    )
+
+    satisfaction, efficiency, overall_score = overall_scores(avg_delay, platform_conflicts, express_avg_position)
+
+    return {
+        'total_trains': np.full(num_scenarios, num_trains),
+        'total_delay': total_delay,
+        'avg_delay': avg_delay,
+        'max_delay': ordered_delays.max(axis=1),
+        'min_delay': ordered_delays.min(axis=1),
+        'platform_conflicts': platform_conflicts,
+        'express_trains_avg_position': express_avg_position,
+        'passenger_satisfaction_score': satisfaction,
+        'efficiency_score': efficiency,
+        'overall_score': overall_score
+    }
+
+
+def scenario_matrices(views):
+    """Stack ScenarioViews over one TrainTable into score_scenarios arguments
+
+    Conflicts come from the table's shared PlatformOccupancy index, adjusted
+    for each view's changed platforms and delays rather than rebuilt.
+    """
+    table = views[0].table
+    occupancy = PlatformOccupancy.for_table(table)
+    orders = np.stack([view.order for view in views])
+    delays = np.tile(np.asarray(table['predicted_delay'], dtype=float), (len(views), 1))
+    conflicts = np.empty(len(views), dtype=np.int64)
+    for i, view in enumerate(views):
+        changes = view.overlay.get('predicted_delay')
+        if changes:
+            delays[i, list(changes.keys())] = list(changes.values())
+        conflicts[i] = occupancy.conflicts_for_view(view)
+    return orders, delays, table['priority'], conflicts
+
+
+def metrics_at(scores, index):
+    """Extract one scenario's metrics from score_scenarios output as plain Python values"""
+    metrics = {}
+    for name in METRIC_FIELDS:
+        value = scores[name][index].item()
+        if name == 'express_trains_avg_position' and value == 0:
+            value = 0
+        metrics[name] = value
+    return metrics
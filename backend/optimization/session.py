@@ -0,0 +1,254 @@
+import copy
+import logging
+import time
+
+import numpy as np
+
+from occupancy import PlatformOccupancy
+from profiling import count, profiled
+from scenarios import TrainTable
+from scoring import score_scenarios, scenario_matrices, metrics_at
+
+logger = logging.getLogger(__name__)
+
+# Scenario builders in generate_all_scenarios order, with the table fields
+# their orders and overlays are computed from. A builder is re-run only when
+# one of its fields changes; cancelling a train re-runs all of them.
+BUILDER_INPUTS = (
+    ('_create_default_schedule', frozenset()),
+    ('_create_optimized_schedule', frozenset({'predicted_delay'})),
+    ('_create_priority_schedules', frozenset({'predicted_delay'})),
+    ('_create_delay_schedules', frozenset({'predicted_delay'})),
+    ('_create_platform_schedules', frozenset({'predicted_delay', 'platform_no'})),
+    ('_create_custom_order_scenarios', frozenset({'predicted_delay'})),
+    ('_create_alternative_routing_scenarios', frozenset({'predicted_delay', 'platform_no'})),
+)
+
+# Overlay fields that put a train on another platform
+PLATFORM_OVERLAY_FIELDS = ('platform_no', 'original_platform', 'platform_changed', 'alternative_platform', 'platform_reassigned')
+
+
+class PlanningSession:
+    """Long-lived scenario set that is updated by one event at a time
+
+    Holds the prepared TrainTable, every scenario and its metrics. Events
+    (``delay_train``, ``close_platform``, ``cancel_train``) derive a new table
+    that shares the unchanged columns, re-run only the builders whose inputs
+    changed, carry the shared platform occupancy index over by moving the
+    affected trains, and rescore only the scenarios whose terms changed.
+    Each event returns the ranking diff.
+
+    The solver schedule is not re-solved on every event: its order, platforms
+    and holds are kept and adjusted to the event, and ``reoptimize()`` runs
+    the solver again on demand.
+    """
+
+    def __init__(self, simulator, train_data):
+        self.simulator = copy.copy(simulator)
+        self.table = TrainTable.from_records(train_data)
+        self._built = {}
+        for method_name, _ in BUILDER_INPUTS:
+            self._built[method_name] = self._build(method_name, self.table)
+        self._plans = []
+        if self.simulator.solver_time_limit:
+            self._plans.append(self.simulator._create_solver_schedule(self.table))
+        self.results = {}
+        self._score(self.scenarios)
+        self.rankings = self._rank()
+
+    @property
+    def scenarios(self):
+        """Every scenario, in generate_all_scenarios order"""
+        views = [view for method_name, _ in BUILDER_INPUTS for view in self._built[method_name]]
+        return views + self._plans
+
+    def _row(self, train_no):
+        rows = np.flatnonzero(self.table['train_no'] == train_no)
+        if not len(rows):
+            raise KeyError(f"Train {train_no} is not in this session")
+        return int(rows[0])
+
+    def _build(self, method_name, table):
+        # Builders are seeded by the simulator, so a rebuild draws what the first build drew
+        built = getattr(self.simulator, method_name)(table)
+        return built if isinstance(built, list) else [built]
+
+    def _score(self, views):
+        if not views:
+            return
+        scores = score_scenarios(*scenario_matrices(views))
+        for j, view in enumerate(views):
+            self.results[view.scenario_id] = (metrics_at(scores, j), scores['overall_score'][j].item())
+
+    def _rank(self):
+        scenarios = self.scenarios
+        results = [self.results[view.scenario_id] for view in scenarios]
+        # Stable sort over generate_all_scenarios order, as rank_scenarios does
+        ordered = sorted(range(len(scenarios)), key=lambda i: results[i][1], reverse=True)
+        return [
+            {'scenario': scenarios[i], 'metrics': results[i][0], 'overall_score': results[i][1], 'rank': rank + 1}
+            for rank, i in enumerate(ordered)
+        ]
+
+    def _update(self, table, changed_fields, plans, affected, started, event):
+        """Swap in the new table, rebuild and rescore, and return the ranking diff"""
+        rebuilt = []
+        for method_name, inputs in BUILDER_INPUTS:
+            if changed_fields is None or inputs & changed_fields:
+                self._built[method_name] = self._build(method_name, table)
+                rebuilt.extend(self._built[method_name])
+            else:
+                self._built[method_name] = [view.rebase(table) for view in self._built[method_name]]
+        self._plans = plans
+        self.table = table
+
+        rescored = rebuilt + [view for view in self.scenarios if view.scenario_id in affected]
+        live = {view.scenario_id for view in self.scenarios}
+        self.results = {scenario_id: result for scenario_id, result in self.results.items() if scenario_id in live}
+        self._score(list({view.scenario_id: view for view in rescored}.values()))
+
+        previous = self.rankings
+        self.rankings = self._rank()
+        diff = self.diff(previous, self.rankings)
+        diff['event'] = event
+        diff['rescored'] = len(set(view.scenario_id for view in rescored))
+        diff['elapsed_ms'] = (time.perf_counter() - started) * 1000
+        count('session_events')
+        count('scenarios_rescored', diff['rescored'])
+        logger.info(f"Replanned {event['type']} in {diff['elapsed_ms']:.1f}ms; best is {diff['best']}")
+        return diff
+
+    @staticmethod
+    def diff(previous, current):
+        """Scenarios whose rank or score changed between two rankings"""
+        before = {r['scenario'].scenario_id: r for r in previous}
+        after = {r['scenario'].scenario_id: r for r in current}
+        changed = []
+        for scenario_id, ranking in after.items():
+            old = before.get(scenario_id)
+            if old is None or old['rank'] != ranking['rank'] or old['overall_score'] != ranking['overall_score']:
+                changed.append({
+                    'scenario_id': scenario_id,
+                    'old_rank': old['rank'] if old else None,
+                    'new_rank': ranking['rank'],
+                    'old_score': old['overall_score'] if old else None,
+                    'new_score': ranking['overall_score']
+                })
+        changed.sort(key=lambda change: change['new_rank'])
+        return {
+            'best': current[0]['scenario'].scenario_id if current else None,
+            'changed': changed,
+            'removed': [scenario_id for scenario_id in before if scenario_id not in after]
+        }
+
+    def delay_train(self, train_no, delay):
+        """Set a train's predicted delay in minutes"""
+        started = time.perf_counter()
+        row = self._row(train_no)
+        shift = float(delay) - float(self.table['predicted_delay'][row])
+
+        index = PlatformOccupancy.for_table(self.table)
+        start = index.arrivals[row] + float(delay)
+        index.move(row, start=start, end=start + index.dwells[row])
+        table = self.table.replace('predicted_delay', {row: float(delay)})
+        PlatformOccupancy.carry_over(self.table, table)
+
+        # Plans keep their holds and spacing on top of the new delay
+        plans = []
+        for view in self._plans:
+            overlay = view.overlay
+            if row in (overlay.get('predicted_delay') or {}):
+                overlay = dict(overlay, predicted_delay=dict(overlay['predicted_delay']))
+                overlay['predicted_delay'][row] += shift
+            plans.append(view.rebase(table, overlay=overlay))
+
+        # Every scenario's total delay includes this train
+        affected = {view.scenario_id for view in self.scenarios}
+        event = {'type': 'train_delayed', 'train_no': train_no, 'delay': float(delay)}
+        return self._update(table, {'predicted_delay'}, plans, affected, started, event)
+
+    def close_platform(self, platform):
+        """Take a platform out of service, moving its trains to the open platform with fewest overlaps"""
+        started = time.perf_counter()
+        open_platforms = tuple(p for p in self.simulator.platforms if p != platform)
+        if not open_platforms:
+            raise ValueError(f"Cannot close platform {platform}: no other platform is open")
+        self.simulator.platforms = open_platforms
+
+        index = PlatformOccupancy.for_table(self.table)
+        moved = {}
+        for row in np.flatnonzero(self.table['platform_no'] == platform).tolist():
+            overlaps = {}
+            for candidate in open_platforms:
+                index.move(row, candidate)
+                overlaps[candidate] = index.overlaps(row)
+            moved[row] = min(open_platforms, key=lambda p: (overlaps[p], p))
+            index.move(row, moved[row])
+        table = self.table.replace('platform_no', moved) if moved else self.table
+        PlatformOccupancy.carry_over(self.table, table)
+
+        # Plans drop the closed platform, falling back to each train's new platform
+        plans, affected = [], set()
+        for view in self._plans:
+            platform_changes = view.overlay.get('platform_no') or {}
+            closed_rows = {row for row, p in platform_changes.items() if p == platform}
+            overlay = view.overlay
+            if closed_rows:
+                overlay = {
+                    name: ({row: value for row, value in changes.items() if row not in closed_rows}
+                           if name in PLATFORM_OVERLAY_FIELDS else changes)
+                    for name, changes in overlay.items()
+                }
+            if closed_rows or any(row not in platform_changes for row in moved):
+                affected.add(view.scenario_id)
+            plans.append(view.rebase(table, overlay=overlay))
+        for method_name, _ in BUILDER_INPUTS:
+            for view in self._built[method_name]:
+                platform_changes = view.overlay.get('platform_no') or {}
+                if any(row not in platform_changes for row in moved):
+                    affected.add(view.scenario_id)
+
+        event = {'type': 'platform_closed', 'platform': platform, 'moved_trains': len(moved)}
+        return self._update(table, {'platform_no'}, plans, affected, started, event)
+
+    def cancel_train(self, train_no):
+        """Remove a train from every scenario"""
+        started = time.perf_counter()
+        cancelled = self._row(train_no)
+        if len(self.table) == 1:
+            raise ValueError("Cannot cancel the last train in the session")
+        keep = np.flatnonzero(np.arange(len(self.table)) != cancelled)
+        table = self.table.take(keep)
+
+        # Old row -> new row; rows after the cancelled one shift down by one
+        plans = []
+        for view in self._plans:
+            order = view.order[view.order != cancelled]
+            order = order - (order > cancelled)
+            overlay = {
+                name: {row - (row > cancelled): value for row, value in changes.items() if row != cancelled}
+                for name, changes in view.overlay.items()
+            }
+            plans.append(view.rebase(table, order=order, overlay=overlay))
+
+        event = {'type': 'train_cancelled', 'train_no': train_no}
+        return self._update(table, None, plans, {view.scenario_id for view in plans}, started, event)
+
+    def reoptimize(self):
+        """Re-run the solver on the current table and replace its schedule"""
+        started = time.perf_counter()
+        plans = [self.simulator._create_solver_schedule(self.table)] if self.simulator.solver_time_limit else []
+        event = {'type': 'reoptimized'}
+        return self._update(self.table, set(), plans, {view.scenario_id for view in plans}, started, event)
+
+    @profiled('session_event')
+    def apply(self, event):
+        """Apply an event dict: ``train_delayed``, ``platform_closed`` or ``train_cancelled``"""
+        kind = event.get('type')
+        if kind == 'train_delayed':
+            return self.delay_train(event['train_no'], event['delay'])
+        if kind == 'platform_closed':
+            return self.close_platform(event['platform'])
+        if kind == 'train_cancelled':
+            return self.cancel_train(event['train_no'])
+        raise ValueError(f"Unknown event type: {kind!r}")
@@ -0,0 +1,249 @@
+import logging
+import math
+import time
+
+import numpy as np
+
+from lazy import lazy_import
+
+# Optional dependency, imported on the first solve
+cp_model = lazy_import('ortools.sat.python.cp_model', optional=True)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PLATFORMS = tuple(range(1, 7))  # Platforms 1-6
+
+# Minutes of hold weighted by train priority: express 3, mail 2, local 1
+PRIORITY_WEIGHTS = {1: 3, 2: 2, 3: 1}
+
+# Units of CP-SAT deterministic time a seeded solve gets per second of time
+# limit. On one core 0.5 units take about three seconds on 250 trains (and
+# presolve most of that), so the deterministic budget normally runs out
+# before the wall-clock limit and the result stays reproducible
+DETERMINISTIC_UNITS_PER_SECOND = 0.1
+
+
+class SolverResult:
+    """Order, platform and hold assignment for every table row"""
+
+    def __init__(self, order, platforms, holds, status, objective, solve_time):
+        self.order = order
+        self.platforms = platforms
+        self.holds = holds
+        self.status = status
+        self.objective = objective
+        self.solve_time = solve_time
+
+
+def _problem(table):
+    """Earliest start, occupied minutes and weight per train in integer minutes
+
+    Fractional predicted delays are widened to whole minutes on both ends so
+    that the real occupancy always lies inside the solver's interval.
+    """
+    delays = np.asarray(table['predicted_delay'], dtype=float)
+    arrival = table.arrival_minutes.astype(np.int64)
+    earliest = arrival + np.floor(delays).astype(np.int64)
+    dwell = table.dwell_minutes.astype(np.int64) + (delays != np.floor(delays))
+    weights = np.array([PRIORITY_WEIGHTS.get(p, 2) for p in table['priority'].tolist()], dtype=np.int64)
+    return earliest, dwell, weights
+
+
+def _timed_rows(table):
+    """Rows with usable timetable times; the others keep their platform and are never held"""
+    if 'time_valid' in table:
+        return table['time_valid'].astype(bool)
+    return np.ones(len(table), dtype=bool)
+
+
+def _fixed_rows(table):
+    """Rows already committed to a start and platform (see rolling.py); they are placed, never moved"""
+    if 'committed' in table:
+        return table['committed'].astype(bool) & _timed_rows(table)
+    return np.zeros(len(table), dtype=bool)
+
+
+def _blocked(table, earliest, dwell, platforms):
+    """Minutes each platform is taken by committed trains, as sorted, merged (start, end) pairs"""
+    original = table['platform_no'].tolist()
+    intervals = {p: [] for p in platforms}
+    for row in np.flatnonzero(_fixed_rows(table)).tolist():
+        if original[row] in intervals:
+            intervals[original[row]].append((int(earliest[row]), int(earliest[row] + dwell[row])))
+    blocked = {}
+    for p, pairs in intervals.items():
+        merged = []
+        for begin, end in sorted(pairs):
+            if merged and begin < merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((begin, end))
+        blocked[p] = merged
+    return blocked
+
+
+def _order_by_start(starts, table):
+    """Schedule order: by start minute, then priority, then table order"""
+    return np.lexsort((table['priority'], starts))
+
+
+def _objective(weights, holds, assigned, original, platform_change_penalty):
+    """Weighted hold minutes plus the penalty for every train moved off its platform"""
+    changes = int(np.count_nonzero(assigned != np.asarray(original)))
+    return int((weights * holds).sum()) + platform_change_penalty * changes
+
+
+def greedy_schedule(table, platforms=DEFAULT_PLATFORMS, platform_change_penalty=1):
+    """List-scheduling heuristic: each train takes the platform that frees up first
+
+    Trains are taken by earliest start (then priority) and keep their own
+    platform on ties, so the result is always conflict-free and is used both
+    as the solver's starting incumbent and as its fallback. Committed trains
+    stay at their start on their platform, and the others are fitted around
+    them.
+    """
+    started = time.perf_counter()
+    earliest, dwell, weights = _problem(table)
+    original = table['platform_no'].tolist()
+    free_at = {p: -math.inf for p in platforms}
+    assigned = np.array(original, dtype=np.int64)
+    starts = earliest.copy()
+    timed = _timed_rows(table)
+    fixed = _fixed_rows(table)
+
+    blocked = _blocked(table, earliest, dwell, platforms)
+
+    def first_free(row, p):
+        start = max(earliest[row], free_at[p])
+        for begin, end in blocked[p]:
+            if begin < start + dwell[row] and start < end:
+                start = end
+        return start
+
+    for row in np.lexsort((table['priority'], earliest)).tolist():
+        if not timed[row] or fixed[row]:
+            continue
+        best = min(platforms, key=lambda p: (first_free(row, p), p != original[row], p))
+        starts[row] = first_free(row, best)
+        assigned[row] = best
+        free_at[best] = starts[row] + dwell[row]
+
+    holds = starts - earliest
+    return SolverResult(
+        order=_order_by_start(starts, table),
+        platforms=assigned,
+        holds=holds,
+        status='HEURISTIC',
+        objective=_objective(weights, holds, assigned, original, platform_change_penalty),
+        solve_time=time.perf_counter() - started
+    )
+
+
+def solve_schedule(table, platforms=DEFAULT_PLATFORMS, time_limit=5.0, max_hold=240,
+                   platform_change_penalty=1, num_workers=8, seed=None):
+    """Assign order and platform to minimize priority-weighted total delay with CP-SAT
+
+    Each train occupies its platform for its scheduled dwell, starting no
+    earlier than scheduled arrival plus predicted delay; trains on the same
+    platform may not overlap. Holding a train adds to its delay, and moving it
+    off its timetabled platform costs ``platform_change_penalty``. Committed
+    trains (a true ``committed`` column) are fixed intervals on their own
+    platform that the others must fit around. The solver stops after
+    ``time_limit`` seconds and returns its best incumbent. Without OR-Tools,
+    or if no solution is found in time, the greedy schedule is used.
+
+    With a ``seed`` the search is reproducible: one worker with that random
+    seed, stopped after DETERMINISTIC_UNITS_PER_SECOND units of CP-SAT's
+    deterministic time per second of ``time_limit``. ``time_limit`` still
+    caps the wall-clock time, counted from the call, so a problem too large
+    for the deterministic budget to finish in time is cut off there and may
+    then differ between runs.
+    """
+    started = time.perf_counter()
+    incumbent = greedy_schedule(table, platforms, platform_change_penalty)
+    if cp_model is None:
+        logger.warning("OR-Tools is not installed; using greedy platform schedule")
+        return incumbent
+
+    earliest, dwell, weights = _problem(table)
+    original = table['platform_no'].tolist()
+    timed = _timed_rows(table)
+    fixed = _fixed_rows(table)
+    model = cp_model.CpModel()
+
+    starts, presence = [], []
+    # Committed trains hold their platforms as fixed intervals, merged where they already overlap
+    by_platform = {
+        p: [model.NewFixedSizeIntervalVar(begin, end - begin, f'committed_{p}_{i}') for i, (begin, end) in enumerate(blocked)]
+        for p, blocked in _blocked(table, earliest, dwell, platforms).items()
+    }
+    for row in range(len(table)):
+        if not timed[row] or fixed[row]:
+            starts.append(int(earliest[row]))
+            presence.append(None)
+            continue
+        # Allow at least the greedy hold so the incumbent stays feasible
+        latest = int(earliest[row] + max(max_hold, incumbent.holds[row]))
+        start = model.NewIntVar(int(earliest[row]), latest, f'start_{row}')
+        model.AddHint(start, int(earliest[row] + incumbent.holds[row]))
+        starts.append(start)
+
+        literals = {}
+        for p in platforms:
+            literal = model.NewBoolVar(f'on_{row}_{p}')
+            model.AddHint(literal, p == incumbent.platforms[row])
+            interval = model.NewOptionalFixedSizeIntervalVar(start, int(dwell[row]), literal, f'occupy_{row}_{p}')
+            by_platform[p].append(interval)
+            literals[p] = literal
+        model.AddExactlyOne(literals.values())
+        presence.append(literals)
+
+    for intervals in by_platform.values():
+        model.AddNoOverlap(intervals)
+
+    objective = []
+    for row in range(len(table)):
+        if presence[row] is None:
+            continue
+        objective.append(int(weights[row]) * (starts[row] - int(earliest[row])))
+        if original[row] in presence[row]:
+            objective.append(platform_change_penalty * (1 - presence[row][original[row]]))
+    model.Minimize(sum(objective))
+
+    solver = cp_model.CpSolver()
+    # The greedy incumbent and building the model count against the limit
+    solver.parameters.max_time_in_seconds = max(0.0, float(time_limit) - (time.perf_counter() - started))
+    if seed is None:
+        solver.parameters.num_workers = num_workers
+    else:
+        solver.parameters.max_deterministic_time = float(time_limit) * DETERMINISTIC_UNITS_PER_SECOND
+        solver.parameters.num_workers = 1
+        solver.parameters.random_seed = seed
+    status = solver.Solve(model)
+
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        logger.warning(f"CP-SAT returned {solver.StatusName(status)}; using greedy platform schedule")
+        return incumbent
+
+    solved_starts = np.array([solver.Value(start) for start in starts], dtype=np.int64)
+    assigned = np.array([
+        original[row] if literals is None else next(p for p, literal in literals.items() if solver.Value(literal))
+        for row, literals in enumerate(presence)
+    ], dtype=np.int64)
+    holds = solved_starts - earliest
+    objective = _objective(weights, holds, assigned, original, platform_change_penalty)
+    solve_time = time.perf_counter() - started
+    logger.info(
+        f"CP-SAT {solver.StatusName(status)} for {len(table)} trains in {solve_time:.2f}s "
+        f"(objective {objective} vs greedy {incumbent.objective})"
+    )
+    if objective > incumbent.objective:
+        return incumbent
+    return SolverResult(
+        order=_order_by_start(solved_starts, table),
+        platforms=assigned,
+        holds=holds,
+        status=solver.StatusName(status),
+        objective=objective,
+        solve_time=solve_time
+    )
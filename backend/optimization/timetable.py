@@ -0,0 +1,369 @@
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+
+from lazy import lazy_import
+from profiling import profiled
+
+pd = lazy_import('pandas')
+# Optional dependency, imported when the timetable cache is first used
+pa = lazy_import('pyarrow', submodules=('ipc',), optional=True)
+
+logger = logging.getLogger(__name__)
+
+# Columns prepare_train_data reads, with the dtypes they are loaded as
+DATASET_DTYPES = {
+    'Train No': 'int64',
+    'Train Name': 'category',
+    'Arrival time': 'str',
+    'Departure Time': 'str',
+    'Distance': 'float64',
+    'Source Station': 'category',
+    'Source Station Name': 'category',
+    'Destination Station': 'category',
+    'Destination Station Name': 'category',
+    'Train Type': 'category',
+    'Weather': 'category',
+    'IsHoliday': 'Int8',
+    'Congestion': 'category',
+    'Platform No': 'Int16',
+}
+
+
+# 'HH:MM', 'H:MM' or 'HH:MM:SS' (seconds ignored); 'HHMM'/'HMM' are zero-padded first
+_COLON_TIME = r'^(\d*):(\d*)(?::\d*)?$'
+_COMPACT_TIME = r'^(\d{2})(\d{2})$'
+
+
+def parse_times(values, missing=-1):
+    """Vectorized parse_time: a Series of time strings to minutes since midnight
+
+    Accepts the same 'HH:MM', 'HHMM' and 'H:MM' forms as parse_time. Hours of
+    24 and above are kept as times past midnight (e.g. '25:10' is 1510), so
+    overnight timetables stay on one increasing scale. Returns ``(minutes,
+    invalid)``: missing values become ``missing``, while text that cannot be
+    parsed, or has minutes outside 0-59 or hours beyond 47, is flagged in the
+    boolean ``invalid`` mask (its minutes are -1) instead of being defaulted.
+    """
+    values = pd.Series(values)
+    codes, uniques = pd.factorize(values)
+    if len(uniques) < len(values):
+        # A timetable repeats a few thousand distinct times; parse each one once
+        minutes, invalid = parse_times(np.asarray(uniques, dtype=object), missing)
+        is_missing = codes < 0
+        return np.where(is_missing, missing, minutes[codes]), np.where(is_missing, False, invalid[codes])
+
+    is_missing = values.isna().to_numpy()
+    text = values.astype(object).where(~is_missing, '').astype(str).str.strip()
+
+    colon = text.str.extract(_COLON_TIME)
+    # Without a colon, zero-pad to HHMM exactly as parse_time does
+    compact = text.str.zfill(4).str.extract(_COMPACT_TIME)
+    has_colon = text.str.contains(':', regex=False)
+
+    hour_text = colon[0].where(has_colon, compact[0])
+    minute_text = colon[1].where(has_colon, compact[1])
+    parsed = hour_text.notna() & minute_text.notna()
+    hours = pd.to_numeric(hour_text.where(hour_text != '', '0'), errors='coerce').fillna(-1).to_numpy(dtype=np.int64)
+    minutes = pd.to_numeric(minute_text.where(minute_text != '', '0'), errors='coerce').fillna(-1).to_numpy(dtype=np.int64)
+
+    invalid = ~parsed.to_numpy() | (hours < 0) | (hours > 47) | (minutes < 0) | (minutes > 59)
+    invalid &= ~is_missing
+    result = np.where(invalid, -1, hours * 60 + minutes)
+    result[is_missing] = missing
+    return result, invalid
+
+
+# Missing arrival/departure times are taken as 12:00/13:00
+MISSING_ARRIVAL = 12 * 60
+MISSING_DEPARTURE = 13 * 60
+
+
+def timetable_minutes(df):
+    """``(arrival minutes, departure minutes, invalid)`` of a frame's 'Arrival time'/'Departure Time'
+
+    The one normalization every loader applies, so the CSV and cache paths
+    select and prepare the same trains: missing times become MISSING_ARRIVAL
+    and MISSING_DEPARTURE, and unparseable ones -1 with ``invalid`` set.
+    """
+    arrival, arrival_invalid = parse_times(df['Arrival time'], MISSING_ARRIVAL)
+    departure, departure_invalid = parse_times(df['Departure Time'], MISSING_DEPARTURE)
+    return arrival, departure, arrival_invalid | departure_invalid
+
+
+@profiled('load_csv')
+def load_data(dataset_path, num_trains=8, train_numbers=None, time_window=None,
+              chunksize=100_000, contiguous=True, station=None):
+    """Load dataset and extract subset of trains
+
+    Only the columns prepare_train_data uses are read, with explicit dtypes,
+    and the CSV is streamed in chunks so only the selected rows are kept.
+    Trains are taken in file order and can be narrowed to ``train_numbers``
+    and/or a ``time_window`` of (start, end) minutes since midnight on the
+    train's first arrival time, and to trains starting or ending at the
+    ``station`` code; ``num_trains`` caps how many are selected (None for no
+    cap). With ``contiguous`` (each train's rows are adjacent, as
+    in final_dataset.csv), reading stops as soon as the selection is complete
+    and the last selected train's rows have ended.
+    """
+    wanted = set(train_numbers) if train_numbers is not None else None
+    selected = []
+    selected_set = set()
+    seen = set()
+    parts = []
+    rows_read = 0
+
+    reader = pd.read_csv(
+        dataset_path,
+        usecols=lambda column: column in DATASET_DTYPES,
+        dtype=DATASET_DTYPES,
+        chunksize=chunksize
+    )
+    with reader:
+        for chunk in reader:
+            rows_read += len(chunk)
+
+            # A train is considered at its first row in the file
+            firsts = chunk.drop_duplicates('Train No')
+            firsts = firsts[~firsts['Train No'].isin(seen)]
+            seen.update(firsts['Train No'].tolist())
+
+            candidates = firsts
+            if wanted is not None:
+                candidates = candidates[candidates['Train No'].isin(wanted)]
+            if time_window is not None:
+                minutes, _, _ = timetable_minutes(candidates)
+                candidates = candidates[(minutes >= time_window[0]) & (minutes <= time_window[1])]
+            if station is not None:
+                candidates = candidates[
+                    (candidates['Source Station'] == station) | (candidates['Destination Station'] == station)
+                ]
+            if num_trains is not None:
+                candidates = candidates.head(max(0, num_trains - len(selected)))
+            new_trains = candidates['Train No'].tolist()
+            selected.extend(new_trains)
+            selected_set.update(new_trains)
+
+            in_selection = chunk['Train No'].isin(selected_set)
+            if in_selection.any():
+                parts.append(chunk[in_selection])
+
+            complete = (
+                (num_trains is not None and len(selected) >= num_trains) or
+                (wanted is not None and selected_set >= wanted)
+            )
+            if contiguous and complete and not in_selection.iat[-1]:
+                break
+
+    if parts:
+        subset_df = pd.concat(parts)
+    else:
+        subset_df = pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in DATASET_DTYPES.items()})
+    # Only the selected rows' categories, so the result does not depend on the chunk size
+    for column, dtype in DATASET_DTYPES.items():
+        if dtype == 'category' and column in subset_df:
+            subset_df[column] = subset_df[column].astype('category').cat.remove_unused_categories()
+
+    logger.info(f"Scanned {rows_read} rows of dataset")
+    logger.info(f"Selected {len(subset_df)} rows for {len(selected)} trains")
+    return subset_df
+
+
+def parse_time(time_str):
+    """Parse time in either 'HH:MM', 'HHMM', or 'H:MM' format"""
+    time_str = str(time_str).strip()
+
+    if ':' in time_str:
+        parts = time_str.split(':')
+        hour = int(parts[0]) if parts[0] else 0
+        minute = int(parts[1]) if len(parts) > 1 and parts[1] else 0
+    else:
+        if len(time_str) == 3:
+            time_str = '0' + time_str
+        time_str = time_str.zfill(4)
+        hour = int(time_str[:2]) if len(time_str) >= 2 else 0
+        minute = int(time_str[2:4]) if len(time_str) >= 4 else 0
+
+    return hour, minute
+
+
+CACHE_FORMAT_VERSION = 2
+
+# Arrival/departure are stored as minutes since midnight instead of text
+CACHE_TIME_COLUMNS = {'Arrival time': 'Arrival Minute', 'Departure Time': 'Departure Minute'}
+
+_STORES = {}
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class TimetableStore:
+    """Memory-mapped Arrow cache of the timetable CSV
+
+    The CSV is parsed once into an uncompressed Arrow IPC file with arrival
+    and departure pre-normalized by timetable_minutes to minutes since
+    midnight (-1 where the text cannot be parsed), stations, names and train
+    types dictionary-encoded, and rows sorted by Train No next to their
+    original file position. Later loads memory-map that file instead of
+    parsing text. A JSON sidecar records the CSV's size, mtime and SHA-256;
+    the cache is rebuilt when the size changes, or the mtime changes and the
+    content hash no longer matches. ``table()`` checks the CSV's size and
+    mtime on every call, so a long-running process picks up an edited CSV.
+    """
+
+    def __init__(self, dataset_path, cache_path=None):
+        self.dataset_path = dataset_path
+        self.cache_path = cache_path or os.path.splitext(dataset_path)[0] + '.timetable.arrow'
+        self.meta_path = self.cache_path + '.json'
+        self._table = None
+        self._runs = None
+        # (size, mtime) of the CSV when the mapped table was last checked against it
+        self._source = None
+
+    def _read_meta(self):
+        try:
+            with open(self.meta_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, meta):
+        tmp_path = self.meta_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.meta_path)
+
+    def is_fresh(self):
+        """True if the cache exists and matches the current CSV"""
+        meta = self._read_meta()
+        if not meta or meta.get('format_version') != CACHE_FORMAT_VERSION or not os.path.exists(self.cache_path):
+            return False
+        stat = os.stat(self.dataset_path)
+        if stat.st_size != meta['source_size']:
+            return False
+        if stat.st_mtime_ns == meta['source_mtime_ns']:
+            return True
+        # Touched but possibly unchanged: compare contents before rebuilding
+        if _file_sha256(self.dataset_path) != meta['source_sha256']:
+            return False
+        self._write_meta(dict(meta, source_mtime_ns=stat.st_mtime_ns))
+        return True
+
+    def build(self, chunksize=100_000):
+        """Parse the CSV once and write the Arrow cache"""
+        logger.info(f"Building timetable cache {self.cache_path}...")
+        stat = os.stat(self.dataset_path)
+        parts = []
+        reader = pd.read_csv(
+            self.dataset_path,
+            usecols=lambda column: column in DATASET_DTYPES,
+            dtype=DATASET_DTYPES,
+            chunksize=chunksize
+        )
+        with reader:
+            for chunk in reader:
+                chunk = chunk.assign(Row=chunk.index.to_numpy())
+                arrival, departure, _ = timetable_minutes(chunk)
+                chunk = chunk.assign(**{'Arrival Minute': arrival, 'Departure Minute': departure})
+                parts.append(chunk.drop(columns=list(CACHE_TIME_COLUMNS)))
+
+        df = pd.concat(parts, ignore_index=True)
+        for column, dtype in DATASET_DTYPES.items():
+            if dtype == 'category' and column in df:
+                df[column] = df[column].astype('category')
+        df = df.sort_values('Train No', kind='stable')
+        table = pa.Table.from_pandas(df, preserve_index=False).combine_chunks()
+
+        tmp_path = self.cache_path + '.tmp'
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, self.cache_path)
+        self._write_meta({
+            'format_version': CACHE_FORMAT_VERSION,
+            'source_size': stat.st_size,
+            'source_mtime_ns': stat.st_mtime_ns,
+            'source_sha256': _file_sha256(self.dataset_path),
+        })
+        self._table = None
+        self._runs = None
+        logger.info(f"Cached {table.num_rows} timetable rows")
+
+    def table(self):
+        """The cached timetable as a memory-mapped Arrow table, rebuilt and mapped again if the CSV changed"""
+        stat = os.stat(self.dataset_path)
+        source = (stat.st_size, stat.st_mtime_ns)
+        if self._table is None or source != self._source:
+            if not self.is_fresh():
+                self.build()
+            self._table = pa.ipc.open_file(pa.memory_map(self.cache_path, 'r')).read_all()
+            self._runs = None
+            self._source = source
+        return self._table
+
+    def _train_runs(self):
+        """(train numbers, run starts, run ends) with runs in file order of first appearance"""
+        if self._runs is None:
+            table = self.table()
+            train_no = table.column('Train No').to_numpy()
+            starts = np.flatnonzero(np.r_[True, train_no[1:] != train_no[:-1]]) if len(train_no) else np.array([], dtype=np.intp)
+            ends = np.r_[starts[1:], len(train_no)].astype(np.intp)
+            by_file_order = np.argsort(table.column('Row').to_numpy()[starts], kind='stable')
+            self._runs = (train_no[starts][by_file_order], starts[by_file_order], ends[by_file_order])
+        return self._runs
+
+    def select(self, num_trains=8, train_numbers=None, time_window=None, station=None):
+        """Rows for selected trains, with the same selection rules as load_data"""
+        table = self.table()
+        trains, starts, ends = self._train_runs()
+        keep = np.ones(len(trains), dtype=bool)
+        if train_numbers is not None:
+            keep &= np.isin(trains, list(train_numbers))
+        if time_window is not None:
+            first_arrival = table.column('Arrival Minute').to_numpy()[starts]
+            keep &= (first_arrival >= time_window[0]) & (first_arrival <= time_window[1])
+        if station is not None:
+            endpoints = [
+                table.column(column).take(starts).to_pandas().astype(str).to_numpy()
+                for column in ('Source Station', 'Destination Station')
+            ]
+            keep &= (endpoints[0] == station) | (endpoints[1] == station)
+        chosen = np.flatnonzero(keep)
+        if num_trains is not None:
+            chosen = chosen[:num_trains]
+
+        rows = np.concatenate([np.arange(starts[i], ends[i]) for i in chosen]) if len(chosen) else np.array([], dtype=np.intp)
+        subset_df = table.take(rows).to_pandas()
+        subset_df = subset_df.sort_values('Row').set_index('Row')
+        subset_df.index.name = None
+        logger.info(f"Selected {len(subset_df)} rows for {len(chosen)} trains from timetable cache")
+        return subset_df
+
+
+@profiled('load')
+def load_timetable(dataset_path, num_trains=8, train_numbers=None, time_window=None, cache_path=None, use_cache=True,
+                   station=None):
+    """Load trains from the Arrow timetable cache, falling back to streaming the CSV
+
+    The store is kept per dataset path so a long-running process memory-maps
+    the cache once. Without pyarrow, or if the cache cannot be written, this
+    is load_data.
+    """
+    if use_cache and pa is not None:
+        try:
+            store = _STORES.get(dataset_path)
+            if store is None or (cache_path and store.cache_path != cache_path):
+                store = _STORES[dataset_path] = TimetableStore(dataset_path, cache_path)
+            return store.select(num_trains, train_numbers, time_window, station)
+        except OSError as e:
+            logger.warning(f"Timetable cache unavailable ({e}); reading CSV")
+    return load_data(dataset_path, num_trains, train_numbers, time_window, station=station)
@@ -0,0 +1,189 @@
+"""Stage timings and peak memory of the scheduling pipeline on synthetic timetables
+
+    python benchmarks/bench_pipeline.py                    # compare against baseline.json
+    python benchmarks/bench_pipeline.py --sizes 10 100     # a subset of sizes
+    python benchmarks/bench_pipeline.py --update-baseline  # record a new baseline
+    python benchmarks/bench_pipeline.py --check            # exit 1 on a regression
+
+Each size gets a synthetic final_dataset.csv from benchmarks/synthetic.py
+(generated once into benchmarks/data/) and runs load, parse, predict,
+generate, rank and serialize in order, with the offline synthetic predictor.
+Stage times are the best of ``--repeat`` runs; peak memory comes from a
+separate run under tracemalloc so tracing does not distort the timings.
+Generate, rank and serialize keep one "goes first" scenario per train, so
+their memory grows with the square of the train count; sizes above
+``--max-scenario-trains`` skip them and record null.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BENCH_DIR, '..', 'backend', 'optimization'))
+from scheduler import ControlStationSimulator, prepare_train_data, rank_scenarios
+from timetable import load_data, parse_times
+from report import write_report
+from synthetic import SyntheticDelayPredictor, write_timetable
+
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+STAGES = ('load', 'parse', 'predict', 'generate', 'rank', 'serialize')
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+DATA_DIR = os.path.join(BENCH_DIR, 'data')
+
+# A stage this much slower (or hungrier) than its baseline is reported as a regression
+REGRESSION_RATIO = 1.25
+# ...unless the difference is below the noise of a run
+NOISE_SECONDS = 0.005
+NOISE_MB = 0.5
+
+
+def run_pipeline(dataset_path, num_trains, args, measure):
+    """Run every stage once, returning ``{stage: measure(fn)}``"""
+    results = {}
+    state = {}
+    simulator = ControlStationSimulator(solver_time_limit=args.solver_time_limit or None, local_search_budget=0)
+
+    def stage(name, fn):
+        results[name] = measure(fn)
+
+    stage('load', lambda: state.update(df=load_data(dataset_path, num_trains=None)))
+    stage('parse', lambda: [parse_times(state['df'][column]) for column in ('Arrival time', 'Departure Time')])
+    stage('predict', lambda: state.update(train_data=prepare_train_data(state['df'], SyntheticDelayPredictor())))
+    if num_trains > args.max_scenario_trains:
+        results.update({name: None for name in ('generate', 'rank', 'serialize')})
+        return results
+    stage('generate', lambda: state.update(scenarios=simulator.generate_all_scenarios(state['train_data'])))
+    stage('rank', lambda: state.update(rankings=rank_scenarios(state['scenarios'])))
+    with tempfile.TemporaryDirectory() as tmp:
+        stage('serialize', lambda: write_report(os.path.join(tmp, 'report.jsonl'), state['rankings']))
+    return results
+
+
+def _seconds(fn):
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def _peak_mb(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark(sizes, args):
+    results = {}
+    for num_trains in sizes:
+        dataset_path = write_timetable(os.path.join(DATA_DIR, f'timetable_{num_trains}_{args.seed}.csv'), num_trains, args.seed)
+        runs = [run_pipeline(dataset_path, num_trains, args, _seconds) for _ in range(args.repeat)]
+        memory = run_pipeline(dataset_path, num_trains, args, _peak_mb)
+        results[str(num_trains)] = {
+            name: None if memory[name] is None else {
+                'seconds': round(min(run[name] for run in runs), 6),
+                'peak_mb': round(memory[name], 3)
+            }
+            for name in STAGES
+        }
+        print(f"{num_trains:>6} trains: " + ", ".join(
+            f"{name} {stats['seconds']:.3f}s/{stats['peak_mb']:.1f}MB" if stats else f"{name} skipped"
+            for name, stats in results[str(num_trains)].items()
+        ))
+    return results
+
+
+def compare(results, baseline):
+    """Print each stage against the baseline; returns the regressed (size, stage, metric) triples"""
+    regressions = []
+    print(f"\n{'trains':>6}  {'stage':<10} {'seconds':>10} {'baseline':>10} {'ratio':>7}  {'peak MB':>9} {'baseline':>9} {'ratio':>7}")
+    for size, stages in results.items():
+        for name, stats in stages.items():
+            base = (baseline.get(size) or {}).get(name)
+            if stats is None or base is None:
+                continue
+            time_ratio = stats['seconds'] / base['seconds'] if base['seconds'] else 1.0
+            memory_ratio = stats['peak_mb'] / base['peak_mb'] if base['peak_mb'] else 1.0
+            flags = []
+            if time_ratio > REGRESSION_RATIO and stats['seconds'] - base['seconds'] > NOISE_SECONDS:
+                flags.append('SLOWER')
+                regressions.append((size, name, 'seconds'))
+            if memory_ratio > REGRESSION_RATIO and stats['peak_mb'] - base['peak_mb'] > NOISE_MB:
+                flags.append('MORE MEMORY')
+                regressions.append((size, name, 'peak_mb'))
+            print(f"{size:>6}  {name:<10} {stats['seconds']:>10.4f} {base['seconds']:>10.4f} {time_ratio:>7.2f}  "
+                  f"{stats['peak_mb']:>9.2f} {base['peak_mb']:>9.2f} {memory_ratio:>7.2f}  {' '.join(flags)}")
+    return regressions
+
+
+def source_commit():
+    """The checked-out git commit, suffixed '-dirty' with uncommitted changes; None outside a git checkout"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=BENCH_DIR, capture_output=True, text=True, check=True)
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=BENCH_DIR,
+                                capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit.stdout.strip() + ('-dirty' if status.stdout.strip() else '')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--solver-time-limit', type=float, default=0.0,
+                        help='seconds for the CP-SAT scenario (0 leaves it out, as its time is the limit)')
+    parser.add_argument('--max-scenario-trains', type=int, default=2000)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--check', action='store_true', help='exit with status 1 if any stage regressed')
+    args = parser.parse_args()
+    # Per-stage INFO logs would be timed along with the stages
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results = benchmark(args.sizes, args)
+
+    if args.update_baseline:
+        # Before the baseline file is rewritten, which would mark the checkout dirty
+        commit = source_commit()
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({
+                'environment': {
+                    'commit': commit,
+                    'python': platform.python_version(),
+                    'numpy': np.__version__,
+                    'machine': platform.machine(),
+                    'cpus': os.cpu_count()
+                },
+                'results': results
+            }, f, indent=2)
+            f.write('\n')
+        print(f"\nBaseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("\nNo baseline yet; run with --update-baseline to record one")
+        return
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\nBaseline measured on commit {baseline['environment'].get('commit') or 'unknown'}")
+    regressions = compare(results, baseline['results'])
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {REGRESSION_RATIO:.2f}x baseline")
+        if args.check:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Import time of the scheduler and API entry points against fixed budgets
+
+    python benchmarks/bench_startup.py           # report
+    python benchmarks/bench_startup.py --check   # exit 1 if an entry point is over budget
+
+Each entry point is imported in a fresh interpreter under ``-X importtime``
+and the best of ``--repeat`` runs is compared with its budget. The heavy
+dependencies (pandas, pyarrow, OR-Tools, SimPy, scikit-learn) are loaded on
+first use, so importing an entry point must not pull them in; any that are
+imported anyway are listed as a failure too.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# (entry point, directory it is imported from, module, budget in seconds)
+ENTRY_POINTS = [
+    ('scheduler CLI', os.path.join(ROOT, 'backend', 'optimization'), 'scheduler', 0.35),
+    ('Flask API', ROOT, 'run', 0.6),
+]
+LAZY_DEPENDENCIES = ('pandas', 'pyarrow', 'ortools', 'simpy', 'sklearn')
+
+_PROBE = (
+    "import sys; import {module}; "
+    "print(','.join(name for name in {lazy!r} if name in sys.modules))"
+)
+
+
+def import_time(directory, module):
+    """(seconds to import ``module`` in a fresh interpreter, lazy dependencies it imported)"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _PROBE.format(module=module, lazy=LAZY_DEPENDENCIES)],
+        cwd=directory, capture_output=True, text=True, check=True
+    )
+    # "import time: self [us] | cumulative | imported package"; the entry point is unindented
+    for line in result.stderr.splitlines():
+        fields = line.split('|')
+        if len(fields) == 3 and fields[2].rstrip() == f' {module}':
+            seconds = int(fields[1]) / 1e6
+            break
+    else:
+        raise RuntimeError(f"No import time reported for {module}")
+    loaded = [name for name in result.stdout.strip().split(',') if name]
+    return seconds, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--check', action='store_true', help='exit with status 1 if any entry point is over budget')
+    args = parser.parse_args()
+
+    failures = 0
+    for name, directory, module, budget in ENTRY_POINTS:
+        runs = [import_time(directory, module) for _ in range(args.repeat)]
+        seconds = min(seconds for seconds, _ in runs)
+        loaded = sorted({dependency for _, dependencies in runs for dependency in dependencies})
+        over = seconds > budget or loaded
+        failures += bool(over)
+        status = 'OVER BUDGET' if seconds > budget else 'ok'
+        print(f"{name:<14} import {module:<10} {seconds * 1000:7.1f}ms  budget {budget * 1000:5.0f}ms  {status}")
+        if loaded:
+            print(f"{'':<14} eagerly imported: {', '.join(loaded)}")
+    if failures and args.check:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""Synthetic final_dataset.csv-shaped timetables for benchmarking
+
+Distributions are chosen to look like the real dataset: a handful of busy
+terminals with skewed traffic, one to three timetable rows per train,
+morning and evening arrival peaks, dwell times by train type, platform use
+skewed toward the main platforms, and a small share of compact ('HHMM') and
+unparseable time strings. Everything is drawn from one seeded generator, so
+a (num_trains, seed) pair always produces the same file.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+STATIONS = [
+    ('NDLS', 'New Delhi'),
+    ('BCT', 'Mumbai Central'),
+    ('HWH', 'Howrah'),
+    ('MAS', 'Chennai Central'),
+    ('SBC', 'Bengaluru'),
+    ('SC', 'Secunderabad'),
+    ('PUNE', 'Pune'),
+    ('ADI', 'Ahmedabad'),
+]
+STATION_WEIGHTS = np.array([0.24, 0.2, 0.16, 0.12, 0.1, 0.08, 0.06, 0.04])
+
+TRAIN_TYPES = ['EXPRESS', 'SUPERFAST', 'MAIL', 'PASSENGER', 'LOCAL']
+TRAIN_TYPE_WEIGHTS = np.array([0.2, 0.15, 0.2, 0.2, 0.25])
+# (min, max) dwell minutes by train type
+DWELL_RANGES = {'EXPRESS': (2, 10), 'SUPERFAST': (2, 8), 'MAIL': (5, 20), 'PASSENGER': (2, 6), 'LOCAL': (1, 4)}
+
+PLATFORMS = np.arange(1, 7)
+PLATFORM_WEIGHTS = np.array([0.26, 0.22, 0.16, 0.14, 0.12, 0.1])
+
+WEATHER = ['Clear', 'Rain', 'Fog']
+WEATHER_WEIGHTS = np.array([0.55, 0.3, 0.15])
+
+COLUMNS = [
+    'Train No', 'Train Name', 'Arrival time', 'Departure Time', 'Distance',
+    'Source Station', 'Source Station Name', 'Destination Station', 'Destination Station Name',
+    'Train Type', 'Weather', 'IsHoliday', 'Congestion', 'Platform No', 'Delay'
+]
+
+
+def _arrival_minutes(rng, size):
+    """Morning and evening peaks over a uniform background"""
+    peak = rng.random(size) < 0.6
+    centre = np.where(rng.random(size) < 0.5, 8.5 * 60, 18.5 * 60)
+    minutes = np.where(peak, rng.normal(centre, 90), rng.uniform(0, 1440, size))
+    return np.mod(np.rint(minutes), 1440).astype(np.int64)
+
+
+def _format_times(rng, minutes, compact_share=0.1, invalid_share=0.01):
+    hours, mins = np.divmod(minutes, 60)
+    text = pd.Series(hours).map('{:02d}'.format) + ':' + pd.Series(mins).map('{:02d}'.format)
+    draw = rng.random(len(minutes))
+    compact = draw < compact_share
+    text[compact] = (pd.Series(hours[compact]).map(str) + pd.Series(mins[compact]).map('{:02d}'.format)).to_numpy()
+    text[draw > 1 - invalid_share] = '--'
+    return text.to_numpy()
+
+
+def generate_timetable(num_trains, seed=0):
+    """DataFrame with the final_dataset.csv columns for ``num_trains`` trains"""
+    rng = np.random.default_rng(np.random.SeedSequence([num_trains, seed]))
+    rows_per_train = rng.choice([1, 2, 3], size=num_trains, p=[0.5, 0.35, 0.15])
+    train_index = np.repeat(np.arange(num_trains), rows_per_train)
+    size = len(train_index)
+
+    source = rng.choice(len(STATIONS), size=num_trains, p=STATION_WEIGHTS)
+    # Destination from the same weights, shifted off the source station
+    offset = rng.choice(np.arange(1, len(STATIONS)), size=num_trains, p=STATION_WEIGHTS[1:] / STATION_WEIGHTS[1:].sum())
+    destination = (source + offset) % len(STATIONS)
+    codes = np.array([code for code, _ in STATIONS], dtype=object)
+    names = np.array([name for _, name in STATIONS], dtype=object)
+
+    train_type = np.array(TRAIN_TYPES, dtype=object)[rng.choice(len(TRAIN_TYPES), size=size, p=TRAIN_TYPE_WEIGHTS)]
+    low = np.array([DWELL_RANGES[t][0] for t in train_type])
+    high = np.array([DWELL_RANGES[t][1] for t in train_type])
+    arrival = _arrival_minutes(rng, size)
+    departure = (arrival + rng.integers(low, high + 1)) % 1440
+
+    df = pd.DataFrame({
+        'Train No': 10000 + train_index,
+        'Train Name': np.char.add('Train ', train_index.astype(str)),
+        'Arrival time': _format_times(rng, arrival),
+        'Departure Time': _format_times(rng, departure, compact_share=0.0),
+        'Distance': np.clip(np.rint(rng.lognormal(6.5, 0.7, size)), 10, 3000).astype(np.int64),
+        'Source Station': codes[source][train_index],
+        'Source Station Name': names[source][train_index],
+        'Destination Station': codes[destination][train_index],
+        'Destination Station Name': names[destination][train_index],
+        'Train Type': train_type,
+        'Weather': np.array(WEATHER, dtype=object)[rng.choice(len(WEATHER), size=size, p=WEATHER_WEIGHTS)],
+        'IsHoliday': (rng.random(size) < 0.3).astype(np.int64),
+        'Congestion': rng.integers(1, 4, size),
+        'Platform No': rng.choice(PLATFORMS, size=size, p=PLATFORM_WEIGHTS),
+        'Delay': np.rint(rng.gamma(2.0, 12.0, size)).astype(np.int64),
+    })
+    return df[COLUMNS]
+
+
+def write_timetable(path, num_trains, seed=0):
+    """Write a synthetic timetable CSV unless an identical one is already there"""
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp'
+        generate_timetable(num_trains, seed).to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    return path
+
+
+class SyntheticDelayPredictor:
+    """Deterministic stand-in for the trained model so benchmarks run offline
+
+    Predicts from train type, congestion, weather and hour with the same
+    batch (``predict_delays``) and single-row (``predict_delay``) interface
+    as the real predictor.
+    """
+
+    TYPE_DELAY = {'EXPRESS': 4.0, 'SUPERFAST': 3.0, 'MAIL': 6.0, 'PASSENGER': 8.0, 'LOCAL': 5.0}
+    WEATHER_DELAY = {'Clear': 0.0, 'Rain': 4.0, 'Fog': 9.0}
+
+    def predict_delays(self, features):
+        train_type = features['Train Type'].astype(str).map(self.TYPE_DELAY).fillna(5.0)
+        weather = features['Weather'].astype(str).map(self.WEATHER_DELAY).fillna(0.0)
+        congestion = pd.to_numeric(features['Congestion'], errors='coerce').fillna(1.0) * 3.0
+        peak = features['Arrival_Hour'].isin([7, 8, 9, 17, 18, 19]) * 5.0
+        return (train_type + weather + congestion + peak + features['Distance'].astype(float) * 0.002).round(2).tolist()
+
+    def predict_delay(self, input_data):
+        return self.predict_delays(pd.DataFrame([input_data]))[0]
@@ -0,0 +1,159 @@
+import * as React from "react";
+
+export interface LiveRanking {
+  scenario_id: string;
+  old_rank: number | null;
+  new_rank: number;
+  old_score: number | null;
+  new_score: number;
+}
+
+export interface LivePosition {
+  train_no: number;
+  order: number | null;
+  platform: number | null;
+}
+
+export interface LiveAlert {
+  level: "info" | "warning" | "critical";
+  message: string;
+  train_no?: number;
+  platform?: number;
+}
+
+export interface LiveDelta {
+  event: { type: string; [key: string]: unknown };
+  best: string | null;
+  rankings: LiveRanking[];
+  removed: string[];
+  positions: LivePosition[];
+  alerts: LiveAlert[];
+  elapsed_ms: number;
+}
+
+const STREAM_URL = "/api/stream";
+
+// Subscribes to the scheduler's server-sent deltas. Each tick carries every
+// delta since the previous one; when the server drops a slow client the hook
+// reconnects and the caller should refetch /api/session for a fresh snapshot.
+export function useLiveFeed(onDelta: (delta: LiveDelta) => void, onReconnect?: () => void) {
+  const [connected, setConnected] = React.useState(false);
+  const handlers = React.useRef({ onDelta, onReconnect });
+  handlers.current = { onDelta, onReconnect };
+
+  React.useEffect(() => {
+    let source: EventSource | null = null;
+    let closed = false;
+
+    const connect = () => {
+      source = new EventSource(STREAM_URL);
+      source.onopen = () => setConnected(true);
+      source.onerror = () => setConnected(false);
+      source.addEventListener("delta", (message) => {
+        const { deltas } = JSON.parse((message as MessageEvent).data) as { deltas: LiveDelta[] };
+        deltas.forEach((delta) => handlers.current.onDelta(delta));
+      });
+      source.addEventListener("dropped", () => {
+        source?.close();
+        setConnected(false);
+        if (!closed) {
+          handlers.current.onReconnect?.();
+          connect();
+        }
+      });
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      source?.close();
+    };
+  }, []);
+
+  return connected;
+}
+
+export interface SessionRanking {
+  scenario_id: string;
+  scenario_name: string;
+  rank: number;
+  overall_score: number;
+  avg_delay?: number;
+  platform_conflicts?: number;
+}
+
+interface SessionSnapshot {
+  rankings: SessionRanking[];
+  positions: LivePosition[];
+}
+
+export interface TimedAlert extends LiveAlert {
+  id: number;
+  time: string;
+}
+
+const SNAPSHOT_URL = "/api/session";
+const MAX_ALERTS = 20;
+
+function applyRankings(rankings: SessionRanking[], delta: LiveDelta): SessionRanking[] {
+  const byId = new Map(rankings.map((ranking) => [ranking.scenario_id, ranking]));
+  delta.removed.forEach((scenarioId) => byId.delete(scenarioId));
+  delta.rankings.forEach(({ scenario_id, new_rank, new_score }) => {
+    const current = byId.get(scenario_id);
+    byId.set(scenario_id, {
+      ...(current ?? { scenario_id, scenario_name: scenario_id }),
+      rank: new_rank,
+      overall_score: new_score,
+    });
+  });
+  return [...byId.values()].sort((a, b) => a.rank - b.rank);
+}
+
+function applyPositions(positions: Map<number, LivePosition>, delta: LiveDelta): Map<number, LivePosition> {
+  const next = new Map(positions);
+  delta.positions.forEach((position) => {
+    if (position.order === null) {
+      next.delete(position.train_no);
+    } else {
+      next.set(position.train_no, position);
+    }
+  });
+  return next;
+}
+
+// Live session state for dashboards: the /api/session snapshot kept current
+// by the stream's deltas, refetched whenever the stream reconnects.
+export function useLiveSession() {
+  const [rankings, setRankings] = React.useState<SessionRanking[]>([]);
+  const [positions, setPositions] = React.useState<Map<number, LivePosition>>(new Map());
+  const [alerts, setAlerts] = React.useState<TimedAlert[]>([]);
+  const [best, setBest] = React.useState<string | null>(null);
+  const nextAlertId = React.useRef(1);
+
+  const loadSnapshot = React.useCallback(() => {
+    fetch(SNAPSHOT_URL)
+      .then((response) => (response.ok ? (response.json() as Promise<SessionSnapshot>) : null))
+      .then((snapshot) => {
+        if (!snapshot) return;
+        setRankings(snapshot.rankings);
+        setBest(snapshot.rankings[0]?.scenario_id ?? null);
+        setPositions(new Map(snapshot.positions.map((position) => [position.train_no, position])));
+      })
+      .catch(() => undefined);
+  }, []);
+
+  React.useEffect(loadSnapshot, [loadSnapshot]);
+
+  const connected = useLiveFeed((delta) => {
+    setRankings((current) => applyRankings(current, delta));
+    setPositions((current) => applyPositions(current, delta));
+    setBest(delta.best);
+    if (delta.alerts.length) {
+      const time = new Date().toLocaleTimeString([], { hour: "2-digit", minute: "2-digit" });
+      const received = delta.alerts.map((alert) => ({ ...alert, id: nextAlertId.current++, time }));
+      setAlerts((current) => [...received.reverse(), ...current].slice(0, MAX_ALERTS));
+    }
+  }, loadSnapshot);
+
+  return { connected, rankings, positions, alerts, best };
+}
@@ -3,93 +3,35 @@ import Layout from '@/components/Layout';
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
 import { Button } from '@/components/ui/button';
 import { Badge } from '@/components/ui/badge';
-import { AlertTriangle, CheckCircle, Clock, Train, Zap, CloudRain, Construction } from 'lucide-react';
+import { AlertTriangle, CheckCircle, Clock, Train, Construction } from 'lucide-react';
 import { useToast } from '@/hooks/use-toast';
+import { useLiveSession } from '@/hooks/use-live-feed';
 
 const Alerts = () => {
   const { toast } = useToast();
   const [filter, setFilter] = useState('all');
 
-  const alerts = [
-    {
-      id: 'ALT_001',
-      type: 'critical',
-      category: 'signal',
-      title: 'Signal System Failure - Junction A3',
-      description: 'Automatic signaling failed. Manual control required for all movements through Junction A3.',
-      timestamp: '2024-01-15 14:32:15',
-      train: '12615',
-      location: 'Junction A3',
-      status: 'active',
-      priority: 1,
-      estimated_resolution: '30 minutes',
-      assigned_to: 'Signal Maintainer Team A'
-    },
-    {
-      id: 'ALT_002',
-      type: 'warning',
-      category: 'delay',
-      title: 'Train Running Late - 12951',
-      description: 'Mumbai Rajdhani delayed by 30 minutes due to late departure from previous station.',
-      timestamp: '2024-01-15 14:15:22',
-      train: '12951',
-      location: 'Agra Cantt',
-      status: 'active',
-      priority: 2,
-      estimated_resolution: '15 minutes',
-      assigned_to: 'Controller A1'
-    },
-    {
-      id: 'ALT_003',
-      type: 'info',
-      category: 'weather',
-      title: 'Weather Alert - Heavy Rain Expected',
-      description: 'Meteorological department predicts heavy rainfall in 2 hours. Prepare for speed restrictions.',
-      timestamp: '2024-01-15 13:20:45',
-      train: null,
-      location: 'Section A - All Stations',
-      status: 'active',
-      priority: 3,
-      estimated_resolution: '4 hours',
-      assigned_to: 'All Controllers'
-    },
-    {
-      id: 'ALT_004',
-      type: 'warning',
-      category: 'maintenance',
-      title: 'Planned Track Maintenance',
-      description: 'Platform 2 unavailable for train operations from 16:00 to 18:00 today.',
-      timestamp: '2024-01-15 13:45:10',
-      train: null,
-      location: 'Platform 2',
-      status: 'scheduled',
-      priority: 2,
-      estimated_resolution: '2 hours',
-      assigned_to: 'Maintenance Team B'
-    },
-    {
-      id: 'ALT_005',
-      type: 'critical',
-      category: 'safety',
-      title: 'Track Obstruction Detected',
-      description: 'Automated sensors detected obstruction on Track 1 between KM 45-46. Inspection required.',
-      timestamp: '2024-01-15 12:55:30',
-      train: null,
-      location: 'Track 1 (KM 45-46)',
-      status: 'resolved',
-      priority: 1,
-      estimated_resolution: 'Completed',
-      assigned_to: 'Track Patrol Team'
-    }
-  ];
+  // Alerts raised by live session events since this page connected; acknowledging
+  // and resolving are tracked locally, as the scheduler does not store alerts
+  const { connected, alerts: liveAlerts } = useLiveSession();
+  const [acknowledged, setAcknowledged] = useState<Set<number>>(new Set());
+  const [resolved, setResolved] = useState<Set<number>>(new Set());
+
+  const alerts = liveAlerts.map((alert) => ({
+    id: alert.id,
+    type: alert.level,
+    category: alert.platform !== undefined ? 'maintenance' : alert.train_no !== undefined ? 'delay' : 'schedule',
+    title: alert.message,
+    timestamp: alert.time,
+    train: alert.train_no !== undefined ? String(alert.train_no) : null,
+    location: alert.platform !== undefined ? `Platform ${alert.platform}` : 'Station',
+    status: resolved.has(alert.id) ? 'resolved' : acknowledged.has(alert.id) ? 'acknowledged' : 'active',
+  }));
 
   const getAlertIcon = (category: string) => {
     switch (category) {
-      case 'signal': return Zap;
       case 'delay': return Clock;
-      case 'weather': return CloudRain;
       case 'maintenance': return Construction;
-      case 'safety': return AlertTriangle;
       default: return AlertTriangle;
     }
   };
@@ -106,20 +48,22 @@ const Alerts = () => {
   const getStatusColor = (status: string) => {
     switch (status) {
       case 'active': return 'bg-destructive text-destructive-foreground';
-      case 'scheduled': return 'bg-warning text-warning-foreground';
+      case 'acknowledged': return 'bg-warning text-warning-foreground';
       case 'resolved': return 'bg-success text-success-foreground';
       default: return 'bg-muted text-muted-foreground';
     }
   };
 
-  const handleAcknowledge = (alertId: string) => {
+  const handleAcknowledge = (alertId: number) => {
+    setAcknowledged((current) => new Set(current).add(alertId));
     toast({
       title: "Alert Acknowledged",
-      description: `Alert ${alertId} has been acknowledged and assigned for resolution.`,
+      description: `Alert ${alertId} has been acknowledged.`,
     });
   };
 
-  const handleResolve = (alertId: string) => {
+  const handleResolve = (alertId: number) => {
+    setResolved((current) => new Set(current).add(alertId));
     toast({
       title: "Alert Resolved",
       description: `Alert ${alertId} has been marked as resolved.`,
@@ -129,7 +73,7 @@ const Alerts = () => {
   const filteredAlerts = alerts.filter(alert => {
     if (filter === 'all') return true;
     if (filter === 'critical') return alert.type === 'critical';
-    if (filter === 'active') return alert.status === 'active';
+    if (filter === 'active') return alert.status !== 'resolved';
     if (filter === 'resolved') return alert.status === 'resolved';
     return true;
   });
@@ -137,7 +81,7 @@ const Alerts = () => {
   const alertCounts = {
     total: alerts.length,
     critical: alerts.filter(a => a.type === 'critical').length,
-    active: alerts.filter(a => a.status === 'active').length,
+    active: alerts.filter(a => a.status !== 'resolved').length,
     resolved: alerts.filter(a => a.status === 'resolved').length
   };
 
@@ -156,8 +100,8 @@ const Alerts = () => {
             <div className="text-right">
               <p className="text-sm text-muted-foreground">Alert System</p>
               <div className="flex items-center space-x-2">
-                <div className="w-2 h-2 bg-success rounded-full animate-pulse"></div>
-                <span className="text-sm font-medium text-success">Online</span>
+                <div className={`w-2 h-2 rounded-full ${connected ? 'bg-success animate-pulse' : 'bg-muted-foreground'}`}></div>
+                <span className={`text-sm font-medium ${connected ? 'text-success' : 'text-muted-foreground'}`}>{connected ? 'Online' : 'Offline'}</span>
               </div>
             </div>
           </div>
@@ -256,18 +200,13 @@ const Alerts = () => {
                             {alert.status}
                           </Badge>
                         </div>
-                        <p className="text-sm text-muted-foreground">{alert.description}</p>
                       </div>
                     </div>
-                    <div className="text-right">
-                      <p className="text-sm text-muted-foreground">Priority</p>
-                      <p className="text-xl font-bold text-foreground">{alert.priority}</p>
-                    </div>
                   </div>
                 </CardHeader>
                 
                 <CardContent>
-                  <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-4 gap-4 mb-4">
+                  <div className="grid grid-cols-1 md:grid-cols-2 gap-4 mb-4">
                     <div>
                       <p className="text-sm text-muted-foreground">Location</p>
                       <p className="font-medium text-foreground">{alert.location}</p>
@@ -276,14 +215,6 @@ const Alerts = () => {
                       <p className="text-sm text-muted-foreground">Timestamp</p>
                       <p className="font-medium text-foreground">{alert.timestamp}</p>
                     </div>
-                    <div>
-                      <p className="text-sm text-muted-foreground">Resolution Time</p>
-                      <p className="font-medium text-foreground">{alert.estimated_resolution}</p>
-                    </div>
-                    <div>
-                      <p className="text-sm text-muted-foreground">Assigned To</p>
-                      <p className="font-medium text-foreground">{alert.assigned_to}</p>
-                    </div>
                   </div>
 
                   {alert.train && (
@@ -295,15 +226,17 @@ const Alerts = () => {
                     </div>
                   )}
 
-                  {alert.status === 'active' && (
+                  {alert.status !== 'resolved' && (
                     <div className="flex justify-end space-x-2">
-                      <Button 
-                        variant="outline" 
-                        size="sm"
-                        onClick={() => handleAcknowledge(alert.id)}
-                      >
-                        Acknowledge
-                      </Button>
+                      {alert.status === 'active' && (
+                        <Button 
+                          variant="outline" 
+                          size="sm"
+                          onClick={() => handleAcknowledge(alert.id)}
+                        >
+                          Acknowledge
+                        </Button>
+                      )}
                       <Button 
                         size="sm"
                         onClick={() => handleResolve(alert.id)}
@@ -323,7 +256,9 @@ const Alerts = () => {
           <Card>
             <CardContent className="pt-6 text-center">
               <AlertTriangle className="w-12 h-12 text-muted-foreground mx-auto mb-2" />
-              <p className="text-muted-foreground">No alerts found for the selected filter.</p>
+              <p className="text-muted-foreground">
+                {alerts.length === 0 ? 'No alerts since connecting to the live feed.' : 'No alerts found for the selected filter.'}
+              </p>
             </CardContent>
           </Card>
         )}
@@ -4,9 +4,15 @@ import MetricCard from '@/components/MetricCard';
 import TrainCard from '@/components/TrainCard';
 import StatusBadge from '@/components/StatusBadge';
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
-import { Train, Clock, AlertCircle, TrendingUp, Users, Zap } from 'lucide-react';
+import { Train, Clock, AlertCircle, TrendingUp, Users, Zap, ListOrdered } from 'lucide-react';
+import { useLiveSession } from '@/hooks/use-live-feed';
 
 const Dashboard = () => {
+  // Rankings, train positions and alerts from the scheduler's live feed
+  const { connected, rankings, positions, alerts, best } = useLiveSession();
+  const criticalAlerts = alerts.filter((alert) => alert.level === 'critical').length;
+  const warningAlerts = alerts.filter((alert) => alert.level === 'warning').length;
+
   // Mock data for the dashboard
   const metrics = [
     {
@@ -25,10 +31,9 @@ const Dashboard = () => {
     },
     {
       title: 'Active Alerts',
-      value: '3',
-      subtitle: '1 critical, 2 warnings',
-      icon: AlertCircle,
-      trend: { value: 2, direction: 'down' as const, isPositive: true }
+      value: alerts.length,
+      subtitle: `${criticalAlerts} critical, ${warningAlerts} warnings`,
+      icon: AlertCircle
     },
     {
       title: 'Throughput',
@@ -86,30 +91,6 @@ const Dashboard = () => {
     }
   ];
 
-  const recentAlerts = [
-    {
-      id: 1,
-      type: 'critical',
-      message: 'Signal failure at Junction A3 - Manual clearance required',
-      time: '14:32',
-      train: '12615'
-    },
-    {
-      id: 2,
-      type: 'warning',
-      message: 'Track maintenance scheduled - Platform 2 unavailable 16:00-18:00',
-      time: '13:45',
-      train: null
-    },
-    {
-      id: 3,
-      type: 'info',
-      message: 'Weather alert - Heavy rain expected in 2 hours',
-      time: '13:20',
-      train: null
-    }
-  ];
-
   return (
     <Layout activeSection="dashboard">
       <div className="space-y-6">
@@ -122,8 +103,8 @@ const Dashboard = () => {
             </p>
           </div>
           <div className="flex items-center space-x-2">
-            <div className="w-3 h-3 bg-success rounded-full animate-pulse"></div>
-            <span className="text-sm text-muted-foreground">System Online</span>
+            <div className={`w-3 h-3 rounded-full ${connected ? 'bg-success animate-pulse' : 'bg-muted-foreground'}`}></div>
+            <span className="text-sm text-muted-foreground">{connected ? 'Live Feed Connected' : 'Live Feed Offline'}</span>
           </div>
         </div>
 
@@ -150,8 +131,47 @@ const Dashboard = () => {
             </CardContent>
           </Card>
 
-          {/* Recent Alerts & System Status */}
+          {/* Live Plan, Recent Alerts & System Status */}
           <div className="space-y-6">
+            {/* Live Plan */}
+            <Card>
+              <CardHeader>
+                <CardTitle className="flex items-center space-x-2">
+                  <ListOrdered className="w-5 h-5" />
+                  <span>Live Scenario Rankings</span>
+                </CardTitle>
+              </CardHeader>
+              <CardContent className="space-y-3">
+                {rankings.length === 0 ? (
+                  <p className="text-sm text-muted-foreground">No live planning session</p>
+                ) : (
+                  rankings.slice(0, 5).map((ranking) => (
+                    <div key={ranking.scenario_id} className="flex justify-between items-center p-3 border border-border rounded-lg">
+                      <div>
+                        <p className="text-sm font-medium text-foreground">
+                          {ranking.rank}. {ranking.scenario_name}
+                        </p>
+                        {ranking.platform_conflicts !== undefined && (
+                          <p className="text-xs text-muted-foreground">
+                            {ranking.platform_conflicts} platform conflicts
+                          </p>
+                        )}
+                      </div>
+                      <div className="flex items-center space-x-2">
+                        {ranking.scenario_id === best && (
+                          <span className="text-xs bg-success text-success-foreground px-2 py-1 rounded">Best</span>
+                        )}
+                        <span className="text-sm text-foreground">{ranking.overall_score.toFixed(1)}</span>
+                      </div>
+                    </div>
+                  ))
+                )}
+                {positions.size > 0 && (
+                  <p className="text-xs text-muted-foreground">{positions.size} trains placed in the best plan</p>
+                )}
+              </CardContent>
+            </Card>
+
             {/* Recent Alerts */}
             <Card>
               <CardHeader>
@@ -161,19 +181,22 @@ const Dashboard = () => {
                 </CardTitle>
               </CardHeader>
               <CardContent className="space-y-3">
-                {recentAlerts.map((alert) => (
+                {alerts.length === 0 && (
+                  <p className="text-sm text-muted-foreground">No alerts since connecting</p>
+                )}
+                {alerts.map((alert) => (
                   <div key={alert.id} className="flex items-start space-x-3 p-3 border border-border rounded-lg">
                     <div className={`w-2 h-2 rounded-full mt-2 ${
-                      alert.type === 'critical' ? 'bg-destructive' :
-                      alert.type === 'warning' ? 'bg-warning' : 'bg-info'
+                      alert.level === 'critical' ? 'bg-destructive' :
+                      alert.level === 'warning' ? 'bg-warning' : 'bg-info'
                     }`} />
                     <div className="flex-1">
                       <p className="text-sm text-foreground">{alert.message}</p>
                       <div className="flex items-center space-x-2 mt-1">
                         <span className="text-xs text-muted-foreground">{alert.time}</span>
-                        {alert.train && (
+                        {alert.train_no !== undefined && (
                           <span className="text-xs bg-muted px-2 py-1 rounded">
-                            Train {alert.train}
+                            Train {alert.train_no}
                           </span>
                         )}
                       </div>
@@ -4,17 +4,31 @@ import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
 import { Badge } from '@/components/ui/badge';
 import { Map, Train, AlertTriangle, Radio } from 'lucide-react';
 import { useToast } from '@/hooks/use-toast';
+import { useLiveSession } from '@/hooks/use-live-feed';
 
 const SectionMap = () => {
   const { toast } = useToast();
   const [selectedJunction, setSelectedJunction] = useState('Junction A1');
   
-  const trackSections = [
-    { id: 'A1', name: 'New Delhi - Agra', status: 'clear', trains: ['12615'] },
-    { id: 'A2', name: 'Agra - Gwalior', status: 'occupied', trains: ['12951'] },
-    { id: 'A3', name: 'Gwalior - Jhansi', status: 'signal_failure', trains: [] },
-    { id: 'A4', name: 'Jhansi - Bhopal', status: 'clear', trains: ['22691'] },
-  ];
+  // Train positions in the best plan from the scheduler's live feed, one lane per platform
+  const { connected, positions, alerts, best } = useLiveSession();
+  const closedPlatforms = new Set(
+    alerts.filter((alert) => alert.level === 'critical' && alert.platform !== undefined).map((alert) => alert.platform)
+  );
+  const placed = [...positions.values()].sort((a, b) => (a.order ?? 0) - (b.order ?? 0));
+  const platformNumbers = [...new Set([...placed.map((position) => position.platform), ...closedPlatforms])]
+    .filter((platform): platform is number => platform !== null && platform !== undefined)
+    .sort((a, b) => a - b);
+  const trackSections = platformNumbers.map((platform) => {
+    const trains = placed.filter((position) => position.platform === platform).map((position) => String(position.train_no));
+    return {
+      id: `P${platform}`,
+      name: `Platform ${platform}`,
+      status: closedPlatforms.has(platform) ? 'closed' : trains.length ? 'occupied' : 'clear',
+      trains,
+    };
+  });
+  const nextTrains = placed.slice(0, 3);
 
   const signals = [
     { id: 'S1', position: 'Junction A1', status: 'green', aspect: 'PROCEED' },
@@ -27,7 +41,7 @@ const SectionMap = () => {
     switch (status) {
       case 'clear': return 'bg-success';
       case 'occupied': return 'bg-warning';
-      case 'signal_failure': return 'bg-destructive';
+      case 'closed': return 'bg-destructive';
       default: return 'bg-muted';
     }
   };
@@ -60,6 +74,10 @@ const SectionMap = () => {
             </p>
           </div>
           <div className="flex items-center space-x-4">
+            <div className="flex items-center space-x-2">
+              <div className={`w-3 h-3 rounded-full ${connected ? 'bg-success animate-pulse' : 'bg-muted-foreground'}`}></div>
+              <span className="text-sm text-muted-foreground">{connected ? 'Live' : 'Offline'}</span>
+            </div>
             <div className="flex items-center space-x-2">
               <div className="w-3 h-3 bg-success rounded-full"></div>
               <span className="text-sm">Clear</span>
@@ -81,7 +99,7 @@ const SectionMap = () => {
             <CardHeader>
               <CardTitle className="flex items-center space-x-2">
                 <Map className="w-5 h-5" />
-                <span>Track Layout - Section A</span>
+                <span>Platform Layout - Best Plan</span>
               </CardTitle>
             </CardHeader>
             <CardContent>
@@ -89,11 +107,14 @@ const SectionMap = () => {
                 {/* Track visualization */}
                 <div className="relative">
                   <div className="flex items-center justify-between">
-                    <div className="text-sm font-medium text-muted-foreground">New Delhi</div>
-                    <div className="text-sm font-medium text-muted-foreground">Bhopal</div>
+                    <div className="text-sm font-medium text-muted-foreground">{best ?? 'Waiting for the live session'}</div>
+                    <div className="text-sm font-medium text-muted-foreground">{placed.length} trains</div>
                   </div>
                   
                   <div className="mt-4 space-y-4">
+                    {trackSections.length === 0 && (
+                      <p className="text-sm text-muted-foreground">No live train positions yet</p>
+                    )}
                     {trackSections.map((section, index) => (
                       <div key={section.id} className="relative">
                         <div className="flex items-center space-x-2">
@@ -110,12 +131,12 @@ const SectionMap = () => {
                               </span>
                             </div>
                             
-                            {/* Train positions */}
-                            {section.trains.map((train, trainIndex) => (
+                            {/* Train positions, in schedule order; only the first four fit the lane */}
+                            {section.trains.slice(0, 4).map((train, trainIndex) => (
                               <div 
                                 key={train} 
                                 className="absolute top-1 bottom-1 w-16 bg-primary rounded flex items-center justify-center"
-                                style={{ left: `${20 + (trainIndex * 70)}%` }}
+                                style={{ left: `${5 + (trainIndex * 24)}%` }}
                               >
                                 <Train className="w-3 h-3 text-primary-foreground" />
                                 <span className="text-xs text-primary-foreground ml-1">
@@ -126,10 +147,10 @@ const SectionMap = () => {
                           </div>
                         </div>
                         
-                        {section.status === 'signal_failure' && (
+                        {section.status === 'closed' && (
                           <div className="mt-1 flex items-center space-x-2 text-destructive">
                             <AlertTriangle className="w-4 h-4" />
-                            <span className="text-xs">Signal system failure detected</span>
+                            <span className="text-xs">Platform closed; its trains were moved</span>
                           </div>
                         )}
                       </div>
@@ -220,25 +241,18 @@ const SectionMap = () => {
                 </CardTitle>
               </CardHeader>
               <CardContent className="space-y-3">
-                <div className="p-3 border border-border rounded">
-                  <div className="flex justify-between items-center mb-2">
-                    <span className="font-medium">12615</span>
-                    <Badge className="bg-success text-success-foreground">Running</Badge>
+                {nextTrains.length === 0 && (
+                  <p className="text-sm text-muted-foreground">No live train positions yet</p>
+                )}
+                {nextTrains.map((position) => (
+                  <div key={position.train_no} className="p-3 border border-border rounded">
+                    <div className="flex justify-between items-center mb-2">
+                      <span className="font-medium">{position.train_no}</span>
+                      <Badge className="bg-success text-success-foreground">#{position.order}</Badge>
+                    </div>
+                    <p className="text-xs text-muted-foreground mt-1">Current: Platform {position.platform}</p>
                   </div>
-                  <p className="text-sm text-muted-foreground">Grand Trunk Express</p>
-                  <p className="text-xs text-muted-foreground mt-1">Current: Section A1</p>
-                  <p className="text-xs text-muted-foreground">Speed: 85 km/h</p>
-                </div>
-
-                <div className="p-3 border border-border rounded">
-                  <div className="flex justify-between items-center mb-2">
-                    <span className="font-medium">12951</span>
-                    <Badge className="bg-warning text-warning-foreground">Delayed</Badge>
-                  </div>
-                  <p className="text-sm text-muted-foreground">Mumbai Rajdhani</p>
-                  <p className="text-xs text-muted-foreground mt-1">Current: Section A2</p>
-                  <p className="text-xs text-muted-foreground">Speed: 65 km/h</p>
-                </div>
+                ))}
               </CardContent>
             </Card>
           </div>
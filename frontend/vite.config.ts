@@ -4,6 +4,12 @@ import path from "path";
 
 // https://vitejs.dev/config/
 export default defineConfig(({ mode }) => ({
+  server: {
+    // Flask API (run.py) during development
+    proxy: {
+      "/api": "http://localhost:5000",
+    },
+  },
   plugins: [react()].filter(Boolean),
   resolve: {
     alias: {
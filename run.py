@@ -1 +1,41 @@
-"from flask import Flask\n\napp = Flask(__name__)\n\n@app.route('/')\ndef home():\n    return 'Train Traffic Control AI - Flask API Running'\n\nif __name__ == '__main__':\n    app.run(debug=True)" 
+import logging
+import os
+
+from flask import Flask
+
+from api.routes import api
+from api.service import SchedulingService
+
+try:
+    from flask_cors import CORS
+except ImportError:  # pragma: no cover - optional dependency
+    CORS = None
+
+
+def create_app(service=None):
+    """Flask app serving the scheduling API with one warm SchedulingService"""
+    app = Flask(__name__)
+    if CORS is not None:
+        CORS(app)
+    app.extensions['scheduling'] = service or SchedulingService(
+        workers=int(os.environ.get('SCHEDULER_WORKERS', 2)),
+        max_pending=int(os.environ.get('SCHEDULER_MAX_PENDING', 8))
+    )
+    app.register_blueprint(api)
+    if os.environ.get('SCHEDULER_PRELOAD', '').lower() in ('1', 'true', 'yes'):
+        # With gunicorn --preload this runs once in the master, before workers fork
+        app.extensions['scheduling'].warm()
+
+    @app.route('/')
+    def home():
+        return 'Train Traffic Control AI - Flask API Running'
+
+    return app
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    app = create_app()
+    # Load the model and timetable before the first request instead of during it
+    app.extensions['scheduling'].warm()
+    app.run(threaded=True)
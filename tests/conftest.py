@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+for path in ('', 'backend/optimization', 'backend/ml', 'backend/simulation', 'benchmarks'):
+    sys.path.insert(0, os.path.join(ROOT, path))
+
+from scheduler import prepare_train_data
+from synthetic import SyntheticDelayPredictor, generate_timetable
+
+
+@pytest.fixture(scope='session')
+def make_trains():
+    """Prepared trains for a synthetic timetable of ``num_trains`` trains, with the offline predictor"""
+    def make(num_trains, seed=0):
+        return prepare_train_data(generate_timetable(num_trains, seed), SyntheticDelayPredictor())
+    return make
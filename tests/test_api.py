@@ -0,0 +1,71 @@
+import pytest
+
+from api.service import SchedulingService
+from run import create_app
+from synthetic import SyntheticDelayPredictor
+
+FEATURES = {
+    'Arrival_Hour': 8, 'Departure_Hour': 8, 'Distance': 120.0,
+    'Source Station': 'NDLS', 'Source Station Name': 'New Delhi',
+    'Destination Station': 'BCT', 'Destination Station Name': 'Mumbai Central',
+    'Train Type': 'EXPRESS', 'Weather': 'Clear', 'IsHoliday': 0, 'Congestion': '2',
+}
+
+
+@pytest.fixture
+def service(make_trains):
+    service = SchedulingService(solver_time_limit=0.2)
+    # Offline stand-ins for warm(): the synthetic predictor and a session over synthetic trains
+    service._warm = True
+    service.simulator.predictor = SyntheticDelayPredictor()
+    service._session = service.simulator.start_session(make_trains(20))
+    yield service
+    service.close()
+
+
+@pytest.fixture
+def client(service):
+    return create_app(service).test_client()
+
+
+def test_valid_event_is_applied(client, service):
+    train_no = service._session.table['train_no'][0].item()
+    response = client.post('/api/events', json={'type': 'train_delayed', 'train_no': train_no, 'delay': 25})
+    assert response.status_code == 200
+    assert response.get_json()['event']['delay'] == 25.0
+
+
+@pytest.mark.parametrize('event, status', [
+    (['train_delayed'], 400),
+    ({'type': 'train_teleported', 'train_no': 1}, 400),
+    ({'type': 'train_delayed', 'delay': 5}, 400),
+    ({'type': 'train_delayed', 'train_no': 'first', 'delay': 5}, 404),
+    ({'type': 'train_cancelled', 'train_no': -1}, 404),
+    ({'type': 'platform_closed', 'platform': 99}, 404),
+])
+def test_invalid_events_are_rejected(client, event, status):
+    assert client.post('/api/events', json=event).status_code == status
+
+
+@pytest.mark.parametrize('delay', ['late', None, -5, True])
+def test_event_delay_must_be_a_number(client, service, delay):
+    train_no = service._session.table['train_no'][0].item()
+    response = client.post('/api/events', json={'type': 'train_delayed', 'train_no': train_no, 'delay': delay})
+    assert response.status_code == 400
+
+
+def test_predict_validates_features(client):
+    assert client.post('/api/predict', json=FEATURES).status_code == 200
+    assert client.post('/api/predict', json=[FEATURES, FEATURES]).get_json()['predicted_delays'][0] > 0
+    assert client.post('/api/predict', json={'Weather': 'Fog'}).status_code == 400
+    assert client.post('/api/predict', json=dict(FEATURES, Distance='far')).status_code == 400
+    assert client.post('/api/predict', json=[]).status_code == 400
+    assert client.post('/api/predict', data='not json').status_code == 400
+
+
+def test_internal_errors_are_not_client_errors(client, service, monkeypatch):
+    def broken(event):
+        raise KeyError('predicted_delay')
+    monkeypatch.setattr(service, 'apply_event', broken)
+    response = client.post('/api/events', json={'type': 'train_cancelled', 'train_no': 1})
+    assert response.status_code == 500
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from delay_model import DelayModel, training_features
+from delay_predictor import DEFAULT_DELAY, predict_delays
+from synthetic import SyntheticDelayPredictor, generate_timetable
+
+
+@pytest.fixture(scope='module')
+def data():
+    """Features of 2000 synthetic trains with delays the model can learn, plus noise"""
+    features, _ = training_features(generate_timetable(2000, seed=3))
+    noise = np.random.default_rng(0).normal(0.0, 1.0, len(features))
+    return features, np.asarray(SyntheticDelayPredictor().predict_delays(features)) + noise
+
+
+def test_fit_learns_the_delays(data):
+    features, delays = data
+    model = DelayModel(n_features=2 ** 12).fit(features, delays, epochs=10)
+    mae = np.abs(model.predict(features) - delays).mean()
+    assert mae < 0.5 * np.abs(delays - delays.mean()).mean()
+    batch = model.predict_delays(features.head(20))
+    single = [model.predict_delay(record) for record in features.head(20).to_dict('records')]
+    assert batch == pytest.approx(single)
+
+
+def test_residuals_come_from_held_out_rows(data):
+    features, delays = data
+    model = DelayModel(n_features=2 ** 12).fit(features, delays, epochs=10, holdout=0.2)
+    assert 0.1 * len(delays) < len(model.residuals) < 0.3 * len(delays)
+    assert model.rows_seen == len(delays) - len(model.residuals)
+    assert DelayModel(n_features=2 ** 12).fit(features, delays, holdout=0).residuals.size == 0
+
+
+def test_artifact_round_trip(data, tmp_path):
+    features, delays = data
+    model = DelayModel(n_features=2 ** 12).fit(features, delays, epochs=2)
+    loaded = DelayModel.load(model.save(str(tmp_path / 'model.npz')))
+    assert loaded.rows_seen == model.rows_seen
+    assert loaded.predict(features) == pytest.approx(model.predict(features), abs=1e-3)
+    np.testing.assert_allclose(loaded.residuals, model.residuals, atol=1e-3)
+
+    # A refit continues from the saved AdaGrad state
+    refit = DelayModel.load(str(tmp_path / 'model.npz')).partial_fit(features, delays)
+    assert refit.rows_seen > model.rows_seen
+
+
+@pytest.mark.filterwarnings('ignore:invalid value:RuntimeWarning')
+def test_unknown_and_unpredictable_rows(data):
+    features, delays = data
+    model = DelayModel(n_features=2 ** 12).fit(features, delays, epochs=2)
+    unseen = features.head(3).copy()
+    unseen['Source Station'] = 'NOWHERE'
+    unseen['Train Type'] = 'HOVERCRAFT'
+    assert all(np.isfinite(model.predict_delays(unseen)))
+
+    # A row the model cannot give a finite delay for gets the default; the others keep theirs
+    broken = features.head(3).copy()
+    broken.loc[broken.index[1], 'Distance'] = np.inf
+    predicted = predict_delays(model, broken)
+    assert predicted[1] == DEFAULT_DELAY
+    assert predicted[0] == pytest.approx(model.predict_delays(features.head(1))[0])
@@ -0,0 +1,18 @@
+from scheduler import ControlStationSimulator
+
+
+def _ranked_orders(train_data, seed):
+    simulator = ControlStationSimulator(solver_time_limit=0.5, local_search_budget=0.3, seed=seed)
+    return [
+        (ranking['scenario'].scenario_id, ranking['overall_score'], ranking['scenario'].order.tolist(),
+         ranking['scenario'].column('platform_no').tolist())
+        for ranking in simulator.rank_all(train_data)
+    ]
+
+
+def test_seeded_rankings_are_reproducible(make_trains):
+    train_data = make_trains(60)
+    first = _ranked_orders(train_data, seed=7)
+    assert any(scenario_id.endswith('_LOCAL_SEARCH') for scenario_id, *_ in first)
+    assert _ranked_orders(train_data, seed=7) == first
+    assert _ranked_orders(train_data, seed=7) == first
@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+
+import lazy
+from lazy import LazyModule, lazy_import
+
+
+def _package(tmp_path, name):
+    """A package that records its own import in a module attribute of ``sys``"""
+    package = tmp_path / name
+    package.mkdir()
+    (package / '__init__.py').write_text(f"import sys\nsys.imported_{name} = True\nVALUE = 42\n")
+    (package / 'extra.py').write_text("ANSWER = 7\n")
+    return name
+
+
+def test_lazy_module_imports_on_first_attribute_access(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(tmp_path))
+    name = _package(tmp_path, 'lazy_probe')
+    monkeypatch.setattr(lazy, '_REGISTRY', {})
+    try:
+        module = lazy_import(name, submodules=('extra',))
+        assert isinstance(module, LazyModule) and not module.loaded
+        assert name not in sys.modules and not hasattr(sys, f'imported_{name}')
+        assert lazy_import(name, submodules=('extra',)) is module
+
+        assert module.VALUE == 42
+        assert module.loaded and f'{name}.extra' in sys.modules
+        assert module.extra.ANSWER == 7
+        # Once imported, later lookups get the module itself
+        assert lazy_import(name, submodules=('extra',)) is sys.modules[name]
+    finally:
+        for key in (name, f'{name}.extra'):
+            sys.modules.pop(key, None)
+        if hasattr(sys, f'imported_{name}'):
+            delattr(sys, f'imported_{name}')
+
+
+def test_optional_lazy_import_of_a_missing_package_is_none(monkeypatch):
+    monkeypatch.setattr(lazy, '_REGISTRY', {})
+    assert lazy_import('no_such_package_for_lazy_tests', optional=True) is None
+    assert lazy.load_all() == []
+
+
+def test_importing_the_scheduler_defers_heavy_dependencies():
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    code = (
+        "import sys; import scheduler, solver, timetable; "
+        "print(','.join(m for m in ('pandas', 'pyarrow', 'ortools') if m in sys.modules))"
+    )
+    paths = [os.path.join(root, path) for path in ('backend/optimization', 'backend/ml', 'backend/simulation')]
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(paths))
+    output = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == ''
@@ -0,0 +1,21 @@
+import numpy as np
+
+from local_search import improve_schedules
+from scheduler import ControlStationSimulator, rank_scenarios
+
+
+def test_improved_views_use_the_simulator_platforms_and_current_labels(make_trains):
+    simulator = ControlStationSimulator(solver_time_limit=0, platforms=(1, 2, 3, 4), seed=3)
+    scenario_rankings = rank_scenarios(simulator.generate_all_scenarios(make_trains(40)))
+    seeds = [ranking for ranking in scenario_rankings if ranking['scenario'].scenario_id.startswith(('TRAIN_', 'ALTERNATIVE_'))][:3]
+    improved = improve_schedules(seeds, time_budget=0.5, platforms=simulator.platforms, seed=3)
+    assert improved
+
+    for view in improved:
+        table = view.table
+        platforms = view.column('platform_no')
+        moved = np.flatnonzero(platforms != table['platform_no']).tolist()
+        assert set(platforms[moved].tolist()) <= set(simulator.platforms)
+        assert sorted(view.overlay['platform_changed']) == moved
+        assert 'alternative_platform' not in view.overlay and 'platform_reassigned' not in view.overlay
+        assert all(row == view.order[0] for row in view.overlay.get('forced_first', {}))
@@ -0,0 +1,53 @@
+import network
+from network import NetworkConfig, NetworkScheduler, partition_trains, station_codes
+from scheduler import ControlStationSimulator, prepare_train_data
+from synthetic import SyntheticDelayPredictor, generate_timetable
+
+
+def _network(num_trains):
+    df = generate_timetable(num_trains)
+    config = NetworkConfig(stations={'NDLS': {'platforms': [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]}}, headway_minutes=30)
+    return prepare_train_data(df, SyntheticDelayPredictor()), station_codes(df), config
+
+
+def test_partitions_place_copies_on_their_own_platforms_and_tracks():
+    train_data, codes, config = _network(120)
+    stations, sections, crossings = partition_trains(train_data, codes, config)
+
+    assert set(sections) == {(source, destination) for source, destination, _ in crossings.values()}
+    for station, records in stations.items():
+        for train in records:
+            if train['network_role'] == 'terminating':
+                assert train['platform_no'] in config.platforms(station)
+    for records in sections.values():
+        assert {train['platform_no'] for train in records} == {1}
+        assert all(train['network_role'] == 'section' for train in records)
+
+
+def test_section_holds_reach_the_destination():
+    train_data, codes, config = _network(80)
+    simulator = ControlStationSimulator(solver_time_limit=0.2, local_search_budget=0)
+    network = NetworkScheduler(simulator, config, workers=1).schedule(train_data, codes)
+
+    assert network['converged']
+    held = [crossing for crossing in network['boundary'] if crossing['section_hold'] > 0]
+    assert held
+    for crossing in network['boundary']:
+        recovery = config.recovery_minutes(crossing['source'], crossing['destination'], crossing['running_minutes'])
+        expected = max(0.0, crossing['departure_delay'] + crossing['section_hold'] - recovery)
+        assert abs(crossing['arrival_delay'] - expected) < 1e-6
+
+
+def test_sections_are_not_route_spaced():
+    train_data, codes, config = _network(80)
+    _, sections, _ = partition_trains(train_data, codes, config)
+    network._init_worker(ControlStationSimulator(solver_time_limit=0, local_search_budget=0))
+    section, records = max(sections.items(), key=lambda item: len(item[1]))
+    platforms = config.tracks(*section)
+
+    # Every train in a section shares its one route, so spacing them by route is never ranked
+    ranked = network._schedule_partition((section, records, platforms, None))
+    assert 'ROUTE_SPACED' not in {ranking['scenario']['scenario_id'] for ranking in ranked['scenario_rankings']}
+    # while the same trains ranked as a station still are
+    ranked = network._schedule_partition(('NDLS', records, platforms, None))
+    assert 'ROUTE_SPACED' in {ranking['scenario']['scenario_id'] for ranking in ranked['scenario_rankings']}
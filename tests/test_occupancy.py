@@ -0,0 +1,66 @@
+import random
+
+from occupancy import PlatformOccupancy
+
+
+def _brute_force(occupancy):
+    """Pairs of active trains on the same platform whose [start, end) intervals overlap"""
+    rows = [row for row, active in enumerate(occupancy.active) if active]
+    return sum(
+        occupancy.platforms[a] == occupancy.platforms[b]
+        and occupancy.starts[a] < occupancy.ends[b] and occupancy.starts[b] < occupancy.ends[a]
+        for i, a in enumerate(rows) for b in rows[i + 1:]
+    )
+
+
+def _random_interval(rng):
+    # Whole minutes on a short day, so shared and touching endpoints are common
+    start = rng.randrange(120)
+    return start, start + rng.choice([1, 2, 5, 10, 30])
+
+
+def _random_occupancy(rng, num_trains, platforms):
+    intervals = [_random_interval(rng) for _ in range(num_trains)]
+    return PlatformOccupancy(
+        [start for start, _ in intervals],
+        [end for _, end in intervals],
+        [rng.randint(1, platforms) for _ in range(num_trains)],
+        [rng.random() > 0.1 for _ in range(num_trains)]
+    )
+
+
+def test_conflicts_match_brute_force():
+    rng = random.Random(0)
+    for _ in range(200):
+        occupancy = _random_occupancy(rng, rng.randint(1, 40), rng.randint(1, 4))
+        assert occupancy.conflicts == _brute_force(occupancy)
+
+
+def test_touching_intervals_do_not_conflict():
+    assert PlatformOccupancy([0, 10], [10, 20], [1, 1]).conflicts == 0
+    assert PlatformOccupancy([0, 10], [10.5, 20], [1, 1]).conflicts == 1
+
+
+def test_moves_keep_conflicts_exact():
+    rng = random.Random(1)
+    occupancy = _random_occupancy(rng, 50, 3)
+    for _ in range(500):
+        row = rng.randrange(50)
+        before = occupancy.conflicts
+        start, end = _random_interval(rng)
+        delta = occupancy.move(row, rng.randint(1, 3), start, end)
+        assert occupancy.conflicts == _brute_force(occupancy)
+        assert delta == occupancy.conflicts - before
+
+
+def test_conflicts_for_leaves_index_unchanged():
+    rng = random.Random(2)
+    occupancy = _random_occupancy(rng, 50, 3)
+    state = (occupancy.conflicts, list(occupancy.platforms), list(occupancy.starts), list(occupancy.ends))
+    for _ in range(100):
+        moves = {row: (rng.randint(1, 3), *_random_interval(rng)) for row in rng.sample(range(50), 5)}
+        moved = PlatformOccupancy(occupancy.starts, occupancy.ends, occupancy.platforms, occupancy.active)
+        for row, (platform, start, end) in moves.items():
+            moved.move(row, platform, start, end)
+        assert occupancy.conflicts_for(moves) == _brute_force(moved)
+        assert (occupancy.conflicts, occupancy.platforms, occupancy.starts, occupancy.ends) == state
@@ -0,0 +1,21 @@
+from scheduler import ControlStationSimulator, rank_scenarios
+
+
+def _summary(view):
+    return view.scenario_id, view.order.tolist(), view.overlay
+
+
+def test_pool_builds_the_serial_scenarios(make_trains):
+    train_data = make_trains(60)
+    serial = ControlStationSimulator(solver_time_limit=0.2, workers=1).generate_all_scenarios(train_data)
+    pooled = ControlStationSimulator(solver_time_limit=0.2, workers=3).generate_all_scenarios(train_data)
+    assert [_summary(view) for view in pooled] == [_summary(view) for view in serial]
+    assert all(view.table is pooled[0].table for view in pooled)
+
+
+def test_pool_ranks_like_serial(make_trains):
+    scenarios = ControlStationSimulator(solver_time_limit=0.2).generate_all_scenarios(make_trains(60))
+    serial = rank_scenarios(scenarios)
+    pooled = rank_scenarios(scenarios, workers=3)
+    assert [(r['scenario'].scenario_id, r['metrics'], r['overall_score'], r['rank']) for r in pooled] == \
+        [(r['scenario'].scenario_id, r['metrics'], r['overall_score'], r['rank']) for r in serial]
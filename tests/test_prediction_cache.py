@@ -0,0 +1,92 @@
+import pandas as pd
+import pytest
+
+from delay_predictor import DEFAULT_DELAY, FEATURE_COLUMNS, CachedDelayPredictor
+
+
+class CountingPredictor:
+    """Predicts the distance in minutes and records every row it is asked for"""
+
+    def __init__(self):
+        self.rows = 0
+        self.loaded = None
+
+    def load_model(self, path):
+        self.loaded = path
+
+    def predict_delays(self, features):
+        self.rows += len(features)
+        return features['Distance'].astype(float).tolist()
+
+
+def _features(distances):
+    return pd.DataFrame([{
+        'Arrival_Hour': 8, 'Departure_Hour': 8, 'Distance': distance,
+        'Source Station': 'NDLS', 'Source Station Name': 'New Delhi',
+        'Destination Station': 'BCT', 'Destination Station Name': 'Mumbai Central',
+        'Train Type': 'EXPRESS', 'Weather': 'Clear', 'IsHoliday': 0, 'Congestion': '2',
+    } for distance in distances], columns=FEATURE_COLUMNS)
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    path = tmp_path / 'model.bin'
+    path.write_bytes(b'weights v1')
+    return str(path)
+
+
+def test_duplicate_keys_are_counted_and_predicted_once():
+    cache = CachedDelayPredictor(CountingPredictor(), distance_bucket=10.0)
+    # 100 and 105 share a distance bucket, so the model sees 100 and 300 once each
+    assert cache.predict_delays(_features([100, 105, 300, 100])) == [100.0, 100.0, 300.0, 100.0]
+    assert cache.predictor.rows == 2
+    assert cache.stats()['misses'] == 2 and cache.stats()['hits'] == 0
+
+    assert cache.predict_delays(_features([300, 100, 100])) == [300.0, 100.0, 100.0]
+    assert cache.predictor.rows == 2
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['hit_rate'], stats['size']) == (2, 2, 0.5, 2)
+
+
+def test_lru_evicts_the_least_recently_used_key():
+    cache = CachedDelayPredictor(CountingPredictor(), maxsize=2)
+    cache.predict_delays(_features([100, 200]))
+    cache.predict_delay(_features([100]).iloc[0].to_dict())
+    cache.predict_delays(_features([300]))
+    assert cache.stats()['size'] == 2
+    rows = cache.predictor.rows
+    cache.predict_delays(_features([100, 300]))
+    assert cache.predictor.rows == rows
+    cache.predict_delays(_features([200]))
+    assert cache.predictor.rows == rows + 1
+
+
+def test_disk_cache_survives_a_new_instance(tmp_path, model_path):
+    cache_path = str(tmp_path / 'predictions.sqlite')
+    first = CachedDelayPredictor(CountingPredictor(), cache_path=cache_path)
+    first.load_model(model_path)
+    first.predict_delays(_features([100, 200]))
+
+    second = CachedDelayPredictor(CountingPredictor(), cache_path=cache_path)
+    second.load_model(model_path)
+    assert second.predict_delays(_features([100, 200])) == [100.0, 200.0]
+    assert second.predictor.rows == 0
+    assert second.stats()['disk_hits'] == 2
+
+    # A changed model file invalidates what the old one predicted
+    with open(model_path, 'wb') as f:
+        f.write(b'weights v2')
+    second.load_model(model_path)
+    second.predict_delays(_features([100]))
+    assert second.predictor.rows == 1
+
+
+def test_failed_predictions_get_the_default_and_are_not_cached():
+    class Failing(CountingPredictor):
+        def predict_delays(self, features):
+            self.rows += len(features)
+            return [float('nan')] * len(features)
+
+    cache = CachedDelayPredictor(Failing())
+    assert cache.predict_delays(_features([100, 100])) == [DEFAULT_DELAY, DEFAULT_DELAY]
+    assert cache.stats()['size'] == 0
@@ -0,0 +1,70 @@
+import json
+
+import profiling
+from profiling import Profiler
+from scheduler import prepare_train_data
+from synthetic import SyntheticDelayPredictor, generate_timetable
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = Profiler()
+    with profiler.stage('solve'):
+        profiler.count('predictions', 5)
+    assert profiler.stage('solve') is profiling._NULL_STAGE
+    assert profiler.summary() == {'stages': {}, 'counters': {}}
+    assert profiler.chrome_trace()['traceEvents'] == []
+
+
+def test_stages_and_counters_export_as_prometheus_and_chrome_trace(tmp_path):
+    profiler = Profiler(enabled=True, memory=True)
+    try:
+        @profiler.profiled('rank')
+        def rank():
+            with profiler.stage('score', scenarios=3):
+                return bytearray(1 << 20)
+
+        rank()
+        rank()
+        profiler.count('predictions', 40)
+        profiler.count('predictions', 2)
+    finally:
+        profiler.disable()
+
+    summary = profiler.summary()
+    assert summary['counters'] == {'predictions': 42}
+    assert {name: stats['calls'] for name, stats in summary['stages'].items()} == {'rank': 2, 'score': 2}
+    assert summary['stages']['score']['peak_bytes'] >= 1 << 20
+    assert summary['stages']['rank']['seconds'] >= summary['stages']['score']['seconds']
+
+    metrics = profiler.prometheus()
+    assert 'scheduler_stage_seconds_count{stage="rank"} 2' in metrics
+    assert 'scheduler_predictions_total 42' in metrics
+
+    events = profiler.chrome_trace()['traceEvents']
+    spans = [event for event in events if event['ph'] == 'X']
+    assert [event['name'] for event in spans] == ['score', 'rank', 'score', 'rank']
+    # Each score span lies inside the rank span that called it
+    for inner, outer in zip(spans[::2], spans[1::2]):
+        assert outer['ts'] <= inner['ts'] and inner['ts'] + inner['dur'] <= outer['ts'] + outer['dur']
+    assert spans[0]['args']['scenarios'] == 3
+    assert events[-1] == dict(events[-1], ph='C', args={'predictions': 42})
+
+    metrics_path, trace_path = profiler.write(tmp_path)
+    with open(trace_path, encoding='utf-8') as f:
+        assert json.load(f)['traceEvents'] == json.loads(json.dumps(events))
+    with open(metrics_path, encoding='utf-8') as f:
+        assert f.read() == metrics
+
+
+def test_pipeline_stages_report_to_the_shared_profiler():
+    profiling.profiler.reset()
+    profiling.profiler.enable()
+    try:
+        prepare_train_data(generate_timetable(30, seed=2), SyntheticDelayPredictor())
+    finally:
+        profiling.profiler.disable()
+        summary = profiling.profiler.summary()
+        profiling.profiler.reset()
+
+    assert {'prepare', 'predict'} <= set(summary['stages'])
+    assert summary['counters']['predictions'] == 30
@@ -0,0 +1,33 @@
+import pytest
+
+from report import ReportReader, write_report
+from scenarios import ScenarioView
+from scheduler import ControlStationSimulator, rank_scenarios
+
+
+def _entry(ranking):
+    view = ranking['scenario']
+    scenario = view.to_dict() if isinstance(view, ScenarioView) else view
+    return dict(ranking, scenario=scenario)
+
+
+def test_report_round_trip(make_trains, tmp_path):
+    scenarios = ControlStationSimulator(solver_time_limit=0.2).generate_all_scenarios(make_trains(30))
+    # A scenario over another table is stored whole, as a dict
+    other = ControlStationSimulator(solver_time_limit=0).generate_all_scenarios(make_trains(5, seed=1))[0]
+    scenario_rankings = rank_scenarios(scenarios + [dict(other.to_dict(), scenario_id='OTHER_TABLE')])
+    path = write_report(str(tmp_path / 'report.jsonl'), scenario_rankings, {'trains': 30})
+
+    reader = ReportReader(path)
+    assert reader.metadata == {'trains': 30}
+    assert len(reader) == len(scenario_rankings)
+    assert reader.scenario_ids == [r['scenario']['scenario_id'] for r in scenario_rankings]
+    table = scenarios[0].table
+    assert all(reader.table()[name].tolist() == table[name].tolist() for name in table.fields)
+
+    assert [_entry(r) for r in reader.top(len(reader))] == [_entry(r) for r in scenario_rankings]
+    assert [_entry(r) for r in reader.top(3)] == [_entry(r) for r in scenario_rankings[:3]]
+    for ranking in scenario_rankings:
+        assert _entry(reader.scenario(ranking['scenario']['scenario_id'])) == _entry(ranking)
+    with pytest.raises(KeyError):
+        reader.scenario('MISSING')
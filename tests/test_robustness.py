@@ -0,0 +1,30 @@
+import numpy as np
+
+from robustness import robustness_scores, sample_perturbations
+from scheduler import ControlStationSimulator
+
+METRICS = ('mean_score', 'p10_score', 'mean_delay', 'p90_delay', 'clash_probability')
+
+
+def test_robustness_scores_one_value_per_scenario_and_follow_the_seed(make_trains):
+    views = ControlStationSimulator(solver_time_limit=0, local_search_budget=0).generate_all_scenarios(make_trains(40))
+    num_trains = len(views[0].table)
+    assert sample_perturbations(num_trains, samples=200, seed=4).shape == (200, num_trains)
+
+    scores = robustness_scores(views, samples=200, seed=4)
+    assert set(scores) == set(METRICS)
+    for values in scores.values():
+        assert values.shape == (len(views),)
+    assert ((scores['clash_probability'] >= 0) & (scores['clash_probability'] <= 1)).all()
+
+    again = robustness_scores(views, samples=200, seed=4)
+    given = robustness_scores(views, perturbations=sample_perturbations(num_trains, samples=200, seed=4))
+    other = robustness_scores(views, samples=200, seed=5)
+    for name in METRICS:
+        np.testing.assert_array_equal(again[name], scores[name])
+        np.testing.assert_array_equal(given[name], scores[name])
+    assert not np.array_equal(other['mean_delay'], scores['mean_delay'])
+
+    residuals = np.array([-3.0, 0.0, 4.0, 12.0])
+    drawn = sample_perturbations(num_trains, samples=50, residuals=residuals, seed=4)
+    assert set(np.unique(drawn)) <= set(residuals)
@@ -0,0 +1,44 @@
+import numpy as np
+
+from occupancy import PlatformOccupancy
+from rolling import RollingHorizonScheduler
+from scenarios import TrainTable
+from scheduler import ControlStationSimulator
+from solver import greedy_schedule, solve_schedule
+
+
+def test_committed_trains_keep_their_slot_and_platform(make_trains):
+    simulator = ControlStationSimulator(solver_time_limit=0.5, local_search_budget=0)
+    rolling = RollingHorizonScheduler(simulator, horizon=90, freeze=15)
+    rolling.add_trains(make_trains(150))
+
+    slots = {}
+    for result in rolling.run(360, 720, 15):
+        carried = [entry['train_no'] in slots for entry in result['plan']]
+        # Trains committed in earlier cycles come first, in their committed slot
+        assert carried == sorted(carried, reverse=True)
+        for entry in result['plan']:
+            if entry['train_no'] in slots:
+                assert entry['committed']
+                assert (entry['platform'], entry['start_minute']) == slots[entry['train_no']]
+        for entry in result['plan']:
+            if entry['committed']:
+                slots.setdefault(entry['train_no'], (entry['platform'], entry['start_minute']))
+    assert len(slots) > 20
+
+
+def test_solver_schedules_around_committed_trains(make_trains):
+    table = TrainTable.from_records(make_trains(80))
+    committed = np.zeros(len(table), dtype=bool)
+    committed[np.argsort(table.arrival_minutes, kind='stable')[:20]] = True
+    table = TrainTable(dict({name: table[name] for name in table.fields}, committed=committed))
+    fixed = committed & table['time_valid']
+    timed_free = np.flatnonzero(~committed & table['time_valid'])
+
+    for result in (greedy_schedule(table), solve_schedule(table, time_limit=1.0, num_workers=1)):
+        assert (result.holds[fixed] == 0).all()
+        assert (result.platforms[fixed] == table['platform_no'][fixed]).all()
+
+        delays = np.asarray(table['predicted_delay'], dtype=float) + result.holds
+        occupancy = PlatformOccupancy.from_table(table, delays=delays, platforms=result.platforms)
+        assert not any(occupancy.overlaps(row) for row in timed_free.tolist())
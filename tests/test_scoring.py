@@ -0,0 +1,60 @@
+from scenarios import ScenarioView, TrainTable
+from scheduler import ControlStationSimulator, calculate_overall_score, calculate_scenario_performance
+from scoring import metrics_at, scenario_matrices, score_scenarios
+
+
+def _train(train_no, arrival, departure, platform, priority, delay, time_valid=True):
+    return {
+        'train_no': train_no,
+        'scheduled_arrival_hour': arrival // 60,
+        'scheduled_arrival_minute': arrival % 60,
+        'scheduled_departure_hour': departure // 60,
+        'scheduled_departure_minute': departure % 60,
+        'platform_no': platform,
+        'priority': priority,
+        'predicted_delay': delay,
+        'time_valid': time_valid,
+    }
+
+
+# Overlapping dwells on platforms 1 and 2, an overnight stop and a train without usable times
+TRAINS = [
+    _train(101, 8 * 60, 8 * 60 + 10, 1, 1, 2.5),
+    _train(102, 8 * 60 + 5, 8 * 60 + 20, 1, 2, 0.0),
+    _train(103, 8 * 60 + 15, 8 * 60 + 25, 2, 3, 7.25),
+    _train(104, 8 * 60 + 18, 8 * 60 + 30, 2, 1, 1.0),
+    _train(105, 23 * 60 + 55, 5, 3, 2, 12.0),
+    _train(106, 12 * 60, 13 * 60, 1, 3, 5.0, time_valid=False),
+]
+
+
+def _views(table):
+    def view(order, scenario_id, overlay=None):
+        return ScenarioView(table, order, scenario_id, scenario_id, '', '', overlay)
+
+    return [
+        view(range(len(table)), 'TIMETABLE'),
+        view([3, 0, 5, 4, 1, 2], 'REORDERED'),
+        view([0, 1, 2, 3, 4, 5], 'REPLATFORMED', {'platform_no': {1: 3, 3: 4}}),
+        view([5, 4, 3, 2, 1, 0], 'DELAYED', {'predicted_delay': {0: 30.0, 2: 0.5}}),
+        view([1, 0, 2, 3, 4, 5], 'BOTH', {'platform_no': {4: 1}, 'predicted_delay': {4: 0.0, 1: 9.5}}),
+    ]
+
+
+def _assert_matches_scalar_path(views):
+    scores = score_scenarios(*scenario_matrices(views))
+    for i, view in enumerate(views):
+        metrics = calculate_scenario_performance(view.schedule())
+        assert metrics_at(scores, i) == metrics, view.scenario_id
+        assert scores['overall_score'][i].item() == calculate_overall_score(metrics), view.scenario_id
+
+
+def test_vectorized_scores_match_dict_schedules():
+    views = _views(TrainTable.from_records(TRAINS))
+    assert calculate_scenario_performance(views[0].schedule())['platform_conflicts'] > 0
+    _assert_matches_scalar_path(views)
+
+
+def test_generated_scenarios_match_dict_schedules(make_trains):
+    simulator = ControlStationSimulator(solver_time_limit=0.2, local_search_budget=0)
+    _assert_matches_scalar_path(simulator.generate_all_scenarios(make_trains(40)))
@@ -0,0 +1,64 @@
+import copy
+
+import pytest
+
+from scheduler import ControlStationSimulator, rank_scenarios
+
+
+def _summary(rankings):
+    return [(r['scenario'].scenario_id, r['metrics'], r['overall_score'], r['rank']) for r in rankings]
+
+
+def _assert_matches_fresh(session):
+    """Incremental rankings equal ranking the session's scenarios from scratch, and rebuilt builders match"""
+    assert _summary(session.rankings) == _summary(rank_scenarios(session.scenarios))
+    rebuilder = copy.copy(session.simulator)
+    rebuilder.solver_time_limit = 0
+    fresh = rebuilder.generate_all_scenarios(session.table)
+    built = [view for view in session.scenarios if view.scenario_id != 'SOLVER_OPTIMIZED']
+    assert [(v.scenario_id, v.order.tolist(), v.overlay) for v in built] == \
+        [(v.scenario_id, v.order.tolist(), v.overlay) for v in fresh]
+
+
+@pytest.fixture
+def session(make_trains):
+    return ControlStationSimulator(solver_time_limit=0.2, local_search_budget=0).start_session(make_trains(40))
+
+
+def test_events_keep_rankings_exact(session):
+    _assert_matches_fresh(session)
+    train_no = session.table['train_no'][3].item()
+    diff = session.apply({'type': 'train_delayed', 'train_no': train_no, 'delay': 45.0})
+    assert diff['event']['type'] == 'train_delayed'
+    _assert_matches_fresh(session)
+
+    platform = session.table['platform_no'][0].item()
+    diff = session.apply({'type': 'platform_closed', 'platform': platform})
+    assert diff['event']['moved_trains'] > 0
+    assert platform not in session.table['platform_no'].tolist()
+    assert all(platform not in view.column('platform_no').tolist() for view in session.scenarios)
+    _assert_matches_fresh(session)
+
+    session.apply({'type': 'train_cancelled', 'train_no': train_no})
+    assert train_no not in session.table['train_no'].tolist()
+    assert all(len(view) == 39 for view in session.scenarios)
+    _assert_matches_fresh(session)
+
+
+def test_unknown_train_and_event_raise(session):
+    with pytest.raises(KeyError):
+        session.apply({'type': 'train_cancelled', 'train_no': -1})
+    with pytest.raises(ValueError):
+        session.apply({'type': 'train_teleported'})
+
+
+def test_reoptimize_replaces_the_solver_plan(session):
+    train_no = session.table['train_no'][0].item()
+    session.delay_train(train_no, 60.0)
+    diff = session.reoptimize()
+    assert diff['event']['type'] == 'reoptimized'
+    plan = next(view for view in session.scenarios if view.scenario_id == 'SOLVER_OPTIMIZED')
+    solved = session.simulator._create_solver_schedule(session.table)
+    assert plan.table is session.table
+    assert (plan.order.tolist(), plan.overlay) == (solved.order.tolist(), solved.overlay)
+    assert _summary(session.rankings) == _summary(rank_scenarios(session.scenarios))
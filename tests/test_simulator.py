@@ -0,0 +1,28 @@
+import pytest
+
+from scheduler import ControlStationSimulator
+from simulator import StationSimulator
+
+pytest.importorskip('simpy')
+
+
+def test_batch_matches_simpy_replay(make_trains):
+    views = ControlStationSimulator(solver_time_limit=0.2).generate_all_scenarios(make_trains(40))[:8]
+    station = StationSimulator()
+    batch = station.batch(views, replications=3, seed=5)
+    noise = station.sample_noise(len(views[0].table), 3, seed=5)
+    for i, view in enumerate(views):
+        for run in range(3):
+            replayed = station.replay(view, noise[run])
+            assert batch['avg_delay'][i, run] == pytest.approx(replayed.realized_delay.mean(), rel=1e-12)
+            assert batch['knock_on'][i, run] == pytest.approx(replayed.knock_on.sum(), rel=1e-12, abs=1e-9)
+    assert batch['knock_on'].any()
+
+
+def test_deterministic_batch_replays_predicted_delays(make_trains):
+    views = ControlStationSimulator(solver_time_limit=0).generate_all_scenarios(make_trains(40))[:8]
+    station = StationSimulator()
+    batch = station.batch(views, replications=0)
+    for i, view in enumerate(views):
+        replayed = station.replay(view)
+        assert batch['realized_delay'][i].tolist() == pytest.approx(replayed.realized_delay.tolist())
@@ -0,0 +1,46 @@
+import time
+
+import numpy as np
+
+from scenarios import TrainTable
+from scheduler import ControlStationSimulator
+from solver import _problem, _timed_rows, greedy_schedule, solve_schedule
+
+PLATFORMS = (1, 2, 3, 4, 5, 6)
+
+# Seconds allowed past the solver time limit for extracting the result and building the view
+SOLVER_MARGIN = 1.0
+
+
+def test_solver_scenario_stays_within_its_time_limit(make_trains):
+    simulator = ControlStationSimulator()
+    table = TrainTable.from_records(make_trains(250))
+    started = time.perf_counter()
+    view = simulator._create_solver_schedule(table)
+    elapsed = time.perf_counter() - started
+    assert view.scenario_id == 'SOLVER_OPTIMIZED'
+    assert elapsed <= simulator.solver_time_limit + SOLVER_MARGIN
+
+
+def _assert_valid(result, table, platforms):
+    """Every train is scheduled once, never early, and timed trains never overlap on their platforms"""
+    earliest, dwell, _ = _problem(table)
+    timed = _timed_rows(table)
+    assert sorted(result.order.tolist()) == list(range(len(table)))
+    assert (result.holds >= 0).all()
+    assert set(result.platforms[timed].tolist()) <= set(platforms)
+    starts = earliest + result.holds
+    for p in platforms:
+        rows = np.flatnonzero(timed & (result.platforms == p))
+        rows = rows[np.argsort(starts[rows], kind='stable')]
+        assert (starts[rows][1:] >= (starts + dwell)[rows][:-1]).all()
+
+
+def test_solver_schedule_is_valid_and_no_worse_than_greedy(make_trains):
+    for num_trains, seed in ((40, 0), (120, 1)):
+        table = TrainTable.from_records(make_trains(num_trains, seed))
+        greedy = greedy_schedule(table, PLATFORMS)
+        solved = solve_schedule(table, PLATFORMS, time_limit=2.0, seed=0)
+        _assert_valid(greedy, table, PLATFORMS)
+        _assert_valid(solved, table, PLATFORMS)
+        assert solved.objective <= greedy.objective
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+from scenarios import TrainTable
+from scheduler import prepare_train_data
+from synthetic import SyntheticDelayPredictor, generate_timetable
+from timetable import MISSING_ARRIVAL, load_data, load_timetable, parse_time, parse_times
+
+
+def _write(path, df):
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def test_cache_and_csv_select_the_same_trains_with_missing_times(tmp_path):
+    df = generate_timetable(200, seed=1)
+    df.loc[df.index[::7], 'Arrival time'] = np.nan
+    df.loc[df.index[::11], 'Departure Time'] = np.nan
+    path = _write(tmp_path / 'timetable.csv', df)
+
+    for time_window in (None, (600, 800), (0, 300)):
+        cached = load_timetable(path, num_trains=None, time_window=time_window)
+        streamed = load_data(path, num_trains=None, time_window=time_window)
+        assert cached['Train No'].tolist() == streamed['Train No'].tolist()
+
+
+def test_store_follows_an_edited_csv(tmp_path):
+    df = generate_timetable(60, seed=2)
+    path = _write(tmp_path / 'timetable.csv', df)
+    assert load_timetable(path, num_trains=None)['Train No'].nunique() == 60
+
+    _write(path, df[df['Train No'] < df['Train No'].min() + 40])
+    assert load_timetable(path, num_trains=None)['Train No'].nunique() == 40
+
+
+def test_chunked_load_matches_a_single_chunk(tmp_path):
+    df = generate_timetable(120, seed=3)
+    # Give every train several adjacent rows so trains straddle chunk boundaries
+    df = df.loc[df.index.repeat(3)].reset_index(drop=True)
+    path = _write(tmp_path / 'timetable.csv', df)
+
+    for kwargs in ({'num_trains': None}, {'num_trains': 25}, {'num_trains': None, 'time_window': (300, 900)}):
+        whole = load_data(path, chunksize=len(df) + 1, **kwargs)
+        for chunksize in (5, 64):
+            pd.testing.assert_frame_equal(load_data(path, chunksize=chunksize, **kwargs), whole)
+
+
+def test_parse_times_flags_invalid_text_and_keeps_hours_past_midnight():
+    values = ['09:30', '930', '0930', '9:05', '23:59:30', '25:10', np.nan, 'ab:cd', '12:75', '48:00', 'noon']
+    minutes, invalid = parse_times(values, MISSING_ARRIVAL)
+
+    assert minutes.tolist() == [570, 570, 570, 545, 1439, 1510, MISSING_ARRIVAL, -1, -1, -1, -1]
+    assert invalid.tolist() == [False] * 7 + [True] * 4
+    for value, parsed in zip(values[:5], minutes):
+        hour, minute = parse_time(value)
+        assert parsed == hour * 60 + minute
+
+
+def test_prepared_trains_roll_overnight_and_flag_invalid_times():
+    df = generate_timetable(3, seed=0).drop_duplicates('Train No')
+    df['Arrival time'] = ['23:50', '10:00', '12:75']
+    df['Departure Time'] = ['00:20', '10:15', '13:00']
+    trains = prepare_train_data(df, SyntheticDelayPredictor())
+
+    assert [train['time_valid'] for train in trains] == [True, True, False]
+    overnight = trains[0]
+    assert (overnight['scheduled_departure_hour'], overnight['scheduled_departure_minute']) == (24, 20)
+    assert TrainTable.from_records(trains).dwell_minutes.tolist()[:2] == [30, 15]